@@ -0,0 +1,108 @@
+""" Pure NumPy approximate nearest-neighbour index (IVF: inverted file over k-means cells). """
+
+import numpy as np
+
+
+def pairwise_distances(X, query, metric="manhattan"):
+    """Distances from one query vector to every row of X."""
+    diff = X - query
+    if metric == "manhattan":
+        return np.abs(diff).sum(axis=1)
+    if metric == "euclidean":
+        return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+    if metric == "cosine":
+        norms = np.linalg.norm(X, axis=1) * np.linalg.norm(query)
+        return 1 - (X @ query) / np.where(norms > 0, norms, 1)
+    raise ValueError(f"Unsupported metric for the IVF index: {metric}")
+
+
+def assign_to_centroids(X, centroids, chunk_size=65536):
+    """Index of the nearest (L2) centroid of every row, computed in chunks."""
+    centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(X.shape[0], dtype=np.int32)
+    for start in range(0, X.shape[0], chunk_size):
+        chunk = np.asarray(X[start:start + chunk_size], dtype=np.float32)
+        distances = centroid_norms - 2 * chunk @ centroids.T
+        labels[start:start + len(chunk)] = distances.argmin(axis=1)
+    return labels
+
+
+def train_kmeans(X, n_clusters, n_iter=10, sample_size=None, seed=0):
+    """Lloyd's k-means on a random sample of X; returns float32 centroids."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(X.shape[0], sample_size or 256 * n_clusters)
+    sample = np.asarray(X[np.sort(rng.choice(X.shape[0], sample_size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        labels = assign_to_centroids(sample, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Cellules vides : réinitialisées sur des points aléatoires.
+        if (~filled).any():
+            centroids[~filled] = sample[rng.choice(len(sample), (~filled).sum(), replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index: rows are bucketed by their nearest k-means centroid.
+
+    A query scans the ``n_probe`` closest cells and ranks their rows with the
+    exact metric, so recall grows with ``n_probe`` at the cost of latency.
+    """
+
+    def __init__(self, X, centroids, list_offsets, list_ids, metric="manhattan", n_probe=8):
+        self.X = X
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.metric = metric
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(cls, X, n_lists=None, n_probe=8, metric="manhattan", n_iter=10, seed=0):
+        """Train the coarse quantizer and bucket every row of X."""
+        n_lists = n_lists or max(1, int(np.sqrt(X.shape[0])))
+        n_lists = min(n_lists, X.shape[0])
+        centroids = train_kmeans(X, n_lists, n_iter=n_iter, seed=seed)
+        labels = assign_to_centroids(X, centroids)
+        list_ids = np.argsort(labels, kind="stable").astype(np.int32)
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=list_offsets[1:])
+        return cls(X, centroids, list_offsets, list_ids, metric=metric, n_probe=n_probe)
+
+    def candidates(self, query):
+        """Row ids stored in the n_probe cells closest to the query."""
+        centroid_distances = ((self.centroids - query) ** 2).sum(axis=1)
+        n_probe = min(self.n_probe, len(self.centroids))
+        cells = np.argpartition(centroid_distances, n_probe - 1)[:n_probe]
+        return np.concatenate(
+            [self.list_ids[self.list_offsets[cell]:self.list_offsets[cell + 1]] for cell in cells]
+        )
+
+    def kneighbors(self, X_query, n_neighbors=10):
+        """Approximate (distances, indices) like NearestNeighbors.kneighbors."""
+        X_query = np.atleast_2d(np.asarray(X_query))
+        distances = np.full((len(X_query), n_neighbors), np.inf)
+        indices = np.full((len(X_query), n_neighbors), -1, dtype=np.int64)
+
+        for row, query in enumerate(X_query):
+            candidates = np.sort(self.candidates(query))
+            candidate_distances = pairwise_distances(self.X[candidates], query, self.metric)
+            k = min(n_neighbors, len(candidates))
+            top = np.argpartition(candidate_distances, k - 1)[:k]
+            top = top[np.lexsort((candidates[top], candidate_distances[top]))]
+            distances[row, :k] = candidate_distances[top]
+            indices[row, :k] = candidates[top]
+        return distances, indices
+
+    def arrays(self):
+        """Arrays to persist in the artifact bundle (X itself is stored separately)."""
+        return {
+            "ann_centroids": self.centroids,
+            "ann_list_offsets": self.list_offsets,
+            "ann_list_ids": self.list_ids,
+        }
@@ -0,0 +1,353 @@
+""" Standalone HTTP recommendation API, decoupled from the Streamlit app.
+
+Run with ``uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4``. Each worker
+loads the artifacts once; scoring runs in a thread pool (or a process pool with
+``RECOMMENDER_EXECUTOR=process``) so the event loop never blocks. With
+``RECOMMENDER_SHARED_DIR`` the workers map the generations of shared_state.py
+and switch to a newly published one without restarting.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Dict, List, Optional, Union
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from artifact_store import latest_version
+from artifact_store import load_artifacts
+from cache import ResultCache
+from cache import cache_from_env
+from images import MISSING
+from images import PLACEHOLDER_PATH
+from images import ThumbnailCache
+from metrics import REGISTRY
+from metrics import profile_requests
+from metrics import profiled_call
+from metrics import profiling_requested
+from recommender import batch_user_recommendations
+from recommender import hybrid_recommendations
+from recommender import session_recommendations
+from recommender import similar_books
+from recommender import user_recommendations
+from shared_state import serving_path
+
+ARTIFACTS_PATH = serving_path(os.environ.get("RECOMMENDER_ARTIFACTS", "artifacts"))
+# Intervalle minimal entre deux vérifications d'une nouvelle version publiée.
+SWAP_CHECK_INTERVAL = float(os.environ.get("RECOMMENDER_SWAP_CHECK_INTERVAL", 2))
+EXECUTOR_KIND = os.environ.get("RECOMMENDER_EXECUTOR", "thread")
+POOL_SIZE = int(os.environ.get("RECOMMENDER_POOL_SIZE", os.cpu_count() or 4))
+MAX_BATCH_USERS = 1000
+
+_artifacts = None
+_result_cache = None
+# Cache de la version précédente, pour les requêtes commencées avant un changement de version.
+_previous_cache = None
+_thumbnails = None
+_checked_at = 0.0
+_artifacts_lock = threading.Lock()
+
+
+def get_artifacts():
+    """Artifacts of the current process, loaded on first use.
+
+    At most every SWAP_CHECK_INTERVAL seconds, a newer published version
+    (bundle or shared generation) replaces them; requests in flight keep the
+    previous ones until they finish.
+    """
+    global _artifacts, _result_cache, _previous_cache, _checked_at
+    if _artifacts is not None and time.monotonic() - _checked_at < SWAP_CHECK_INTERVAL:
+        return _artifacts
+    with _artifacts_lock:
+        if _artifacts is None or time.monotonic() - _checked_at >= SWAP_CHECK_INTERVAL:
+            version = latest_version(ARTIFACTS_PATH)
+            if _artifacts is None or version not in (None, _artifacts.version):
+                artifacts = load_artifacts(ARTIFACTS_PATH)
+                _previous_cache, _result_cache = _result_cache, cache_from_env(artifacts.version)
+                _artifacts = artifacts
+            _checked_at = time.monotonic()
+    return _artifacts
+
+
+def get_result_cache(artifacts=None):
+    """Result cache of the current process matching ``artifacts`` (the current ones by default)."""
+    artifacts = artifacts or get_artifacts()
+    for cache in (_result_cache, _previous_cache):
+        if cache is not None and cache.version == artifacts.version:
+            return cache
+    # Requête en vol sur une version déjà remplacée deux fois : cache mémoire jetable, sans SQLite.
+    return ResultCache(artifacts.version)
+
+
+def get_thumbnails():
+    """Cover thumbnail cache of the current process (filled by ``python images.py``)."""
+    global _thumbnails
+    if _thumbnails is None:
+        with _artifacts_lock:
+            if _thumbnails is None:
+                _thumbnails = ThumbnailCache()
+    return _thumbnails
+
+
+def parse_user_id(user_id):
+    """User-IDs are integers in the dataset; keep other ids as strings."""
+    if isinstance(user_id, str) and user_id.lstrip("-").isdigit():
+        return int(user_id)
+    return user_id
+
+
+def book_items(catalog, titles, scores=None):
+    """JSON-ready book entries with their cover and description."""
+    items = []
+    for idx, title in enumerate(titles):
+        image_url, description = catalog.metadata(title)
+        item = {"title": title, "image_url": image_url, "description": description}
+        pos = catalog.title_to_pos.get(title)
+        if pos is not None:
+            item["cover_url"] = f"/cover/{catalog.cover_keys[pos]}"
+        if scores is not None:
+            item["score"] = float(scores[idx])
+        items.append(item)
+    return items
+
+
+# Tâches exécutées dans le pool : fonctions de module pour rester picklables.
+def user_task(user_id, n, hybrid=False, engine="svd"):
+    artifacts = get_artifacts()
+    if engine == "als":
+        if artifacts.als_scorer is None:
+            return None
+        kind = "user-als"
+        compute = lambda: user_recommendations(
+            user_id, artifacts.catalog, artifacts.als_scorer, artifacts.leaderboard, n
+        )
+    elif hybrid:
+        kind = "hybrid"
+        compute = lambda: hybrid_recommendations(
+            user_id, artifacts.catalog, artifacts.svd_scorer, artifacts.leaderboard, artifacts.X_final, n,
+            artifacts.recommendation_table,
+        )
+    else:
+        kind = "user"
+        compute = lambda: user_recommendations(
+            user_id, artifacts.catalog, artifacts.svd_scorer, artifacts.leaderboard, n,
+            artifacts.recommendation_table,
+        )
+    titles, scores, personalized = get_result_cache(artifacts).get_or_compute(kind, user_id, n, compute)
+    return {
+        "user_id": user_id,
+        "personalized": personalized,
+        "items": book_items(artifacts.catalog, titles, scores),
+    }
+
+
+def batch_task(user_ids, n):
+    artifacts = get_artifacts()
+    results = batch_user_recommendations(
+        user_ids, artifacts.catalog, artifacts.svd_scorer, artifacts.leaderboard, n,
+        artifacts.recommendation_table,
+    )
+    return [
+        {
+            "user_id": user_id,
+            "personalized": personalized,
+            "items": book_items(artifacts.catalog, titles, scores),
+        }
+        for user_id, (titles, scores, personalized) in results.items()
+    ]
+
+
+def session_task(user_id, ratings, n):
+    artifacts = get_artifacts()
+    titles, scores, personalized = session_recommendations(
+        ratings, artifacts.catalog, artifacts.svd_scorer, artifacts.leaderboard, n, user_id=user_id
+    )
+    return {
+        "user_id": user_id,
+        "personalized": personalized,
+        "items": book_items(artifacts.catalog, titles, scores),
+    }
+
+
+def book_task(title, n):
+    artifacts = get_artifacts()
+    try:
+        titles = get_result_cache(artifacts).get_or_compute(
+            "book", title, n + 1,
+            lambda: similar_books(title, artifacts.catalog, artifacts.book_neighbors, n + 1),
+        )
+    except KeyError:
+        return None
+    return {"title": title, "items": book_items(artifacts.catalog, titles[:n])}
+
+
+def search_task(query, limit):
+    artifacts = get_artifacts()
+    results = artifacts.search_index.results(query, limit)
+    return {
+        "query": query,
+        "items": [
+            {
+                "title": row["Book-Title"],
+                "author": row.get("Book-Author"),
+                "relevance": float(row["Relevance"]),
+            }
+            for row in results.to_dict("records")
+        ],
+    }
+
+
+def cover_task(key):
+    """(bytes, media type) of a cached thumbnail, or of the local placeholder."""
+    thumbnail = get_thumbnails().get(key)
+    if thumbnail is not None and thumbnail != MISSING:
+        return thumbnail, "image/jpeg"
+    with open(PLACEHOLDER_PATH, "rb") as f:
+        return f.read(), "image/svg+xml"
+
+
+def stats_task():
+    artifacts = get_artifacts()
+    return {"version": artifacts.version, "pid": os.getpid(), "cache": get_result_cache().stats()}
+
+
+def popular_task(n):
+    artifacts = get_artifacts()
+    top = artifacts.leaderboard.popular(n)
+    return {"items": book_items(artifacts.catalog, artifacts.catalog.titles[top].tolist())}
+
+
+class BatchRequest(BaseModel):
+    user_ids: List[Union[int, str]] = Field(..., max_length=MAX_BATCH_USERS)
+    n: int = Field(10, ge=1, le=100)
+
+
+class SessionRequest(BaseModel):
+    user_id: Optional[Union[int, str]] = None
+    ratings: Dict[str, float] = Field(..., min_length=1, max_length=MAX_BATCH_USERS)
+    n: int = Field(10, ge=1, le=100)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Create the scoring pool and load the artifacts once per worker."""
+    if EXECUTOR_KIND == "process":
+        executor = ProcessPoolExecutor(max_workers=POOL_SIZE, initializer=get_artifacts)
+    else:
+        executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="scoring")
+        await asyncio.get_running_loop().run_in_executor(executor, get_artifacts)
+    app.state.executor = executor
+    yield
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="Book Recommender API", lifespan=lifespan)
+REGISTRY.register_collector("result_cache", lambda: _result_cache.stats() if _result_cache is not None else {})
+
+
+@app.middleware("http")
+async def profile_switch(request: Request, call_next):
+    """``?profile=1`` on any request runs its scoring task under cProfile (see /profiles)."""
+    profile_requests(request.query_params.get("profile", "").lower() in ("1", "true"))
+    return await call_next(request)
+
+
+async def run_in_pool(func, *args):
+    """Run a scoring task in the worker pool without blocking the event loop.
+
+    The task is timed as the ``api.<task>`` stage; its cProfile report, when
+    the request asked for one, is kept in the metrics registry.
+    """
+    loop = asyncio.get_running_loop()
+    stage = f"api.{func.__name__}"
+    start = time.perf_counter()
+    try:
+        result, report = await loop.run_in_executor(
+            app.state.executor, partial(profiled_call, profiling_requested(), func, *args)
+        )
+    except Exception:
+        REGISTRY.observe(stage, time.perf_counter() - start, error=True)
+        raise
+    seconds = time.perf_counter() - start
+    REGISTRY.observe(stage, seconds)
+    if report is not None:
+        REGISTRY.add_profile(stage, seconds, report)
+    REGISTRY.export()
+    return result
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/stats")
+async def stats():
+    """Artifact version and result-cache counters of one pool worker."""
+    return await run_in_pool(stats_task)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Stage latencies, errors and cache gauges in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/profiles")
+async def profiles(limit: int = Query(5, ge=1, le=20)):
+    """Latest cProfile reports of requests sent with ``?profile=1``."""
+    return {"profiles": list(REGISTRY.profiles)[:limit]}
+
+
+@app.get("/recommend/user/{user_id}")
+async def recommend_user(user_id: str, n: int = Query(10, ge=1, le=100), hybrid: bool = False,
+                         engine: str = Query("svd", pattern="^(svd|als)$")):
+    if hybrid and engine != "svd":
+        raise HTTPException(status_code=400, detail="The hybrid mode re-ranks SVD candidates only.")
+    result = await run_in_pool(user_task, parse_user_id(user_id), n, hybrid, engine)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No ALS model in the current artifacts.")
+    return result
+
+
+@app.post("/recommend/users")
+async def recommend_users(request: BatchRequest):
+    user_ids = [parse_user_id(user_id) for user_id in request.user_ids]
+    return {"results": await run_in_pool(batch_task, user_ids, request.n)}
+
+
+@app.post("/recommend/session")
+async def recommend_session(request: SessionRequest):
+    """Recommendations from {title: rating} given during the session (SVD fold-in)."""
+    user_id = parse_user_id(request.user_id) if request.user_id is not None else None
+    return await run_in_pool(session_task, user_id, request.ratings, request.n)
+
+
+@app.get("/recommend/book/{title:path}")
+async def recommend_book(title: str, n: int = Query(9, ge=1, le=100)):
+    result = await run_in_pool(book_task, title, n)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Unknown book: {title}")
+    return result
+
+
+@app.get("/cover/{key}")
+async def cover(key: str):
+    """Cover thumbnail served from the local cache; never redirects to a remote host."""
+    content, media_type = await run_in_pool(cover_task, key)
+    return Response(content, media_type=media_type, headers={"Cache-Control": "public, max-age=86400"})
+
+
+@app.get("/search")
+async def search(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=200)):
+    return await run_in_pool(search_task, q, limit)
+
+
+@app.get("/popular")
+async def popular(n: int = Query(10, ge=1, le=100)):
+    return await run_in_pool(popular_task, n)
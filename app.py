@@ -1,9 +1,15 @@
 import streamlit as st
-from utils import load_model_and_data
+from metrics import REGISTRY
+from metrics import profile_requests
+from utils import WARM_UP
+from utils import load_artifact_handle
+from utils import load_result_cache
+from utils import load_thumbnail_cache
 from tabs.tab0 import show_login
 from tabs.tab1 import show_user_recommendations
 from tabs.tab2 import show_book_recommendations
 from tabs.tab3 import show_search_tab
+from tabs.tab4 import show_about
 from tabs.tab5 import show_popular_books
 from tabs.tab6 import show_top_rated_books
 
@@ -15,8 +21,14 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-# Load data and models
-knn_model, book_titles, books_df, svd_model, X_final, books_df_knn = load_model_and_data()
+# Profilage cProfile demandé pour cette session (onglet About ou ?profile=1)
+profile_requests(st.session_state.get("profile_requests", False) or st.query_params.get("profile") == "1")
+
+# Load data and models: each part is built the first time a tab reads it (artifact_store.LazyArtifacts)
+artifacts = load_artifact_handle()
+result_cache = load_result_cache(artifacts.version)
+REGISTRY.register_collector("result_cache", result_cache.stats)
+REGISTRY.register_collector("thumbnail_cache", load_thumbnail_cache().stats)
 
 # Title and introduction
 st.title("📚 Book Recommender System")
@@ -25,8 +37,6 @@ st.markdown("### Find your next favorite book with our recommendation system!")
 # Initialize session state
 if 'user_id' not in st.session_state:
     st.session_state.user_id = "Guest user"
-if "active_tab" not in st.session_state:
-    st.session_state.active_tab = 0  # Par défaut, Tab 0 est actif
 
 # Tabs for different sections
 login_tab = f"Logout / {st.session_state.user_id}" if st.session_state.user_id != "Guest user" else "Login / Guest"
@@ -38,26 +48,40 @@ tab0, tab1, tab2, tab3, tab5, tab6, tab4 = st.tabs([
     "📈 Popular books",
     "⭐ Top-Rated books",
     "📊 About",
-])
+], key="active_tab", on_change="rerun")  # Seul l'onglet ouvert est exécuté (Tab 0 par défaut)
 
 # Tab contents
 with tab0:  # Onglet de connexion / login
-    show_login(books_df)
+    if tab0.open:
+        show_login(artifacts.user_lookup)
 
 with tab1:
-    show_user_recommendations(books_df, svd_model)
+    if tab1.open:
+        show_user_recommendations(artifacts.catalog, artifacts.svd_scorer, artifacts.leaderboard, result_cache,
+                                  artifacts.recommendation_table, artifacts.X_final, artifacts.als_scorer)
 
 with tab2:
-    show_book_recommendations(books_df, book_titles, books_df_knn, knn_model, X_final)
+    if tab2.open:
+        show_book_recommendations(artifacts.catalog, artifacts.book_neighbors, result_cache)
 
 with tab3:
-    show_search_tab(books_df)
+    if tab3.open:
+        show_search_tab(artifacts.books, artifacts.search_index, artifacts.catalog)
 
 with tab5:
-    show_popular_books(books_df)
+    if tab5.open:
+        show_popular_books(artifacts.catalog, artifacts.leaderboard)
 
 with tab6:
-    show_top_rated_books(books_df)
+    if tab6.open:
+        show_top_rated_books(artifacts.catalog, artifacts.leaderboard)
+
+with tab4:
+    if tab4.open:
+        show_about(result_cache, artifacts.version)
+
+# Export Prometheus (RECOMMENDER_METRICS_FILE), au plus toutes les RECOMMENDER_METRICS_INTERVAL secondes
+REGISTRY.export()
 
 
 # Footer
@@ -70,4 +94,8 @@ FOOTER_HTML = """
         </a>
     </div>
 """
-st.markdown(FOOTER_HTML, unsafe_allow_html=True)
\ No newline at end of file
+st.markdown(FOOTER_HTML, unsafe_allow_html=True)
+
+# Après le premier affichage : le reste des artefacts se charge en arrière-plan (RECOMMENDER_WARM_UP=0 pour l'éviter)
+if WARM_UP:
+    artifacts.warm_up()
\ No newline at end of file
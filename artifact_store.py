@@ -0,0 +1,425 @@
+""" Versioned, pickle-free artifact bundles loaded with memory mapping. """
+
+import atexit
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from als import scorer_from_factors
+from catalog import CatalogIndex
+from catalog import PrefixIndex
+from leaderboard import Leaderboard
+from leaderboard import compute_title_stats
+from metrics import timed
+from neighbors import BookNeighbors
+from neighbors import restore_knn_backend
+from precompute import RecommendationTable
+from ratings import RatingsTable
+from ratings import compact_books
+from scoring import SVDScorer
+from search import SearchIndex
+from search import build_search_index
+
+FORMAT_VERSION = 2
+BUNDLES_DIR = "bundles"
+LATEST_FILE = "LATEST"
+MANIFEST_FILE = "manifest.json"
+
+Artifacts = namedtuple(
+    "Artifacts",
+    [
+        "book_titles", "books", "ratings", "X_final", "books_df_knn",
+        "catalog", "svd_scorer", "book_neighbors", "search_index", "leaderboard",
+        "recommendation_table", "als_scorer", "version",
+    ],
+)
+
+
+def file_checksum(file_path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_bundle(artifacts_path, arrays=None, frames=None, meta=None, version=None):
+    """Write arrays as .npy, frames as Parquet and a manifest; return the version.
+
+    The bundle is written to ``<artifacts_path>/bundles/<version>/`` and only
+    published once complete, by atomically replacing the ``LATEST`` pointer.
+    ``version`` defaults to the current timestamp.
+    """
+    arrays = arrays or {}
+    frames = frames or {}
+    version = version or time.strftime("%Y%m%dT%H%M%S")
+    bundles_path = os.path.join(artifacts_path, BUNDLES_DIR)
+    bundle_path = os.path.join(bundles_path, version)
+    suffix = 1
+    while os.path.exists(bundle_path):
+        bundle_path = os.path.join(bundles_path, f"{version}.{suffix}")
+        suffix += 1
+    version = os.path.basename(bundle_path)
+    os.makedirs(bundle_path)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "arrays": {},
+        "frames": {},
+        "meta": meta or {},
+    }
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        file_name = f"{name}.npy"
+        np.save(os.path.join(bundle_path, file_name), array, allow_pickle=False)
+        manifest["arrays"][name] = {
+            "file": file_name,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "sha256": file_checksum(os.path.join(bundle_path, file_name)),
+        }
+        print(f"{name} saved to '{os.path.join(bundle_path, file_name)}'.")
+    for name, frame in frames.items():
+        file_name = f"{name}.parquet"
+        frame.to_parquet(os.path.join(bundle_path, file_name), index=False)
+        manifest["frames"][name] = {
+            "file": file_name,
+            "columns": {column: str(dtype) for column, dtype in frame.dtypes.items()},
+            "rows": len(frame),
+            "sha256": file_checksum(os.path.join(bundle_path, file_name)),
+        }
+        print(f"{name} saved to '{os.path.join(bundle_path, file_name)}'.")
+
+    with open(os.path.join(bundle_path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    latest_tmp = os.path.join(bundles_path, f".{LATEST_FILE}.{os.getpid()}")
+    with open(latest_tmp, "w") as f:
+        f.write(version)
+    os.replace(latest_tmp, os.path.join(bundles_path, LATEST_FILE))
+    print(f"Artifact bundle '{version}' published.")
+    return version
+
+
+def latest_version(artifacts_path):
+    """Version of the latest published bundle, or None if there is none."""
+    try:
+        with open(os.path.join(artifacts_path, BUNDLES_DIR, LATEST_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def artifacts_version(artifacts_path):
+    """Version of the artifacts load_artifacts would serve.
+
+    The latest bundle version, or a fingerprint of the legacy pickles' mtimes.
+    """
+    version = latest_version(artifacts_path)
+    if version is not None:
+        return version
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(artifacts_path)):
+        if name.endswith(".pkl"):
+            digest.update(f"{name}:{os.stat(os.path.join(artifacts_path, name)).st_mtime_ns}".encode())
+    return f"pickle-{digest.hexdigest()[:12]}"
+
+
+class ArtifactBundle:
+    """Read-only view of a bundle; arrays are memory-mapped on first access."""
+
+    def __init__(self, artifacts_path, version=None):
+        version = version or latest_version(artifacts_path)
+        if version is None:
+            raise FileNotFoundError(f"No artifact bundle published in '{artifacts_path}'.")
+        self.path = os.path.join(artifacts_path, BUNDLES_DIR, version)
+        with open(os.path.join(self.path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        if self.manifest["format_version"] > FORMAT_VERSION:
+            raise ValueError(f"Unsupported bundle format {self.manifest['format_version']}.")
+        self.version = self.manifest["version"]
+        self.meta = self.manifest["meta"]
+        self._arrays = {}
+        self._frames = {}
+
+    def __contains__(self, name):
+        return name in self.manifest["arrays"] or name in self.manifest["frames"]
+
+    def array(self, name):
+        """Memory-mapped, read-only array; pages are shared through the page cache."""
+        if name not in self._arrays:
+            entry = self.manifest["arrays"][name]
+            array = np.load(os.path.join(self.path, entry["file"]), mmap_mode="r")
+            if array.dtype.str != entry["dtype"] or list(array.shape) != entry["shape"]:
+                raise ValueError(f"Array '{name}' does not match the bundle manifest.")
+            self._arrays[name] = array
+        return self._arrays[name]
+
+    def frame(self, name):
+        """DataFrame read from its Parquet file on first access."""
+        if name not in self._frames:
+            entry = self.manifest["frames"][name]
+            self._frames[name] = pd.read_parquet(os.path.join(self.path, entry["file"]), memory_map=True)
+        return self._frames[name]
+
+    def verify(self):
+        """Compare every file against the manifest checksums; raise on mismatch."""
+        for kind in ("arrays", "frames"):
+            for name, entry in self.manifest[kind].items():
+                if file_checksum(os.path.join(self.path, entry["file"])) != entry["sha256"]:
+                    raise ValueError(f"Checksum mismatch for '{name}' in bundle {self.version}.")
+
+
+def load_compact_books(bundle):
+    """(books, ratings) of a bundle; format-1 bundles store the long book_df frame."""
+    if "books" not in bundle:
+        return compact_books(bundle.frame("book_df"))
+    ratings = RatingsTable(
+        bundle.array("ratings_user"),
+        bundle.array("ratings_item"),
+        bundle.array("ratings_value"),
+        bundle.frame("users")["User-ID"].tolist(),
+    )
+    return bundle.frame("books"), ratings
+
+
+def load_x_final(artifacts):
+    bundle = artifacts.bundle
+    if "X_final_indptr" in bundle:
+        return csr_matrix(
+            (bundle.array("X_final_data"), bundle.array("X_final_indices"), bundle.array("X_final_indptr")),
+            shape=tuple(bundle.meta["features"]["shape"]),
+        )
+    return bundle.array("X_final")
+
+
+def load_catalog(artifacts):
+    bundle = artifacts.bundle
+    svd_items = bundle.frame("svd_items")["Book-Title"].to_numpy(dtype=object)
+    # Bundles publiés par shared_state.py : tableaux dérivés déjà calculés.
+    shared = {name: bundle.array(name) for name in bundle.manifest["arrays"] if name.startswith("catalog_")}
+    return CatalogIndex(artifacts.books, artifacts.ratings, artifacts.books_df_knn, svd_items, arrays=shared)
+
+
+def load_svd_scorer(artifacts):
+    bundle, catalog = artifacts.bundle, artifacts.catalog
+    svd_users = bundle.frame("svd_users")["User-ID"].tolist()
+    svd_meta = bundle.meta["svd"]
+    return SVDScorer(
+        catalog.titles,
+        catalog.inner_ids,
+        {user_id: inner_uid for inner_uid, user_id in enumerate(svd_users)},
+        svd_meta["global_mean"],
+        bundle.array("svd_bu"),
+        bundle.array("svd_bi"),
+        bundle.array("svd_pu"),
+        bundle.array("svd_qi"),
+        svd_meta["rating_scale"],
+        biased=svd_meta["biased"],
+    )
+
+
+def load_als_scorer(artifacts):
+    bundle = artifacts.bundle
+    if "als_pu" not in bundle:
+        return None
+    return scorer_from_factors(
+        artifacts.catalog.titles,
+        bundle.frame("als_items")["Book-Title"],
+        bundle.frame("als_users")["User-ID"].tolist(),
+        bundle.array("als_pu"),
+        bundle.array("als_qi"),
+    )
+
+
+def load_book_neighbors(artifacts):
+    bundle, X_final = artifacts.bundle, artifacts.X_final
+    neighbor_table = (None, None)
+    if "knn_neighbor_indices" in bundle:
+        neighbor_table = (bundle.array("knn_neighbor_indices"), bundle.array("knn_neighbor_distances"))
+    knn_factory = lambda: restore_knn_backend(
+        bundle.meta["knn_params"],
+        bundle.array("X_final_dense") if "X_final_dense" in bundle else X_final,
+        {name: bundle.array(name) for name in bundle.manifest["arrays"] if name.startswith("ann_")},
+    )
+    return BookNeighbors(None, X_final, *neighbor_table, knn_factory=knn_factory)
+
+
+def load_search_index(artifacts):
+    bundle = artifacts.bundle
+    return SearchIndex(
+        bundle.frame("search_terms")["term"].to_numpy(dtype=object),
+        bundle.array("search_offsets"),
+        bundle.array("search_doc_ids"),
+        bundle.array("search_weights"),
+        bundle.array("search_doc_len"),
+        bundle.frame("search_docs"),
+        **bundle.meta["search"],
+    )
+
+
+def load_recommendation_table(artifacts):
+    bundle = artifacts.bundle
+    if "recs_top" not in bundle:
+        return None
+    return RecommendationTable(
+        artifacts.ratings.user_ids, bundle.array("recs_top"), bundle.array("recs_scores"), bundle.array("recs_fresh")
+    )
+
+
+# Construction de chaque champ d'Artifacts (et de user_lookup) à partir d'un LazyArtifacts.
+BUNDLE_LOADERS = {
+    "compact": lambda artifacts: load_compact_books(artifacts.bundle),
+    "book_titles": lambda artifacts: pd.Index(artifacts.bundle.frame("book_titles")["Book-Title"]),
+    "books": lambda artifacts: artifacts.compact[0],
+    "ratings": lambda artifacts: artifacts.compact[1],
+    "X_final": load_x_final,
+    "books_df_knn": lambda artifacts: artifacts.bundle.frame("book_df_knn"),
+    "catalog": load_catalog,
+    "svd_scorer": load_svd_scorer,
+    "book_neighbors": load_book_neighbors,
+    "search_index": load_search_index,
+    "leaderboard": lambda artifacts: Leaderboard(
+        artifacts.bundle.frame("title_stats"), artifacts.bundle.meta["leaderboard"]["min_votes"]
+    ),
+    "recommendation_table": load_recommendation_table,
+    "als_scorer": load_als_scorer,
+    # Page de connexion : les identifiants seuls, sans construire tout le catalogue.
+    "user_lookup": lambda artifacts: (
+        artifacts.catalog.user_lookup if "catalog" in artifacts.loaded() else PrefixIndex(artifacts.ratings.user_ids)
+    ),
+}
+
+
+class LazyArtifacts:
+    """Artifacts of one version whose fields are built the first time they are read.
+
+    ``artifacts.leaderboard`` loads the leaderboard frame and nothing else, so a
+    page only pays for what it shows. Each field has its own lock, so two
+    threads never build the same field twice. ``warm_up()`` builds the
+    remaining fields in a background thread.
+    """
+
+    def __init__(self, bundle, loaders=BUNDLE_LOADERS, values=None, version=None):
+        self.bundle = bundle
+        self.version = bundle.version if bundle is not None else version
+        self._loaders = loaders
+        self._values = dict(values or {})
+        self._locks = {name: threading.Lock() for name in loaders}
+        self._warm_up_thread = None
+        self._warm_up_stop = threading.Event()
+
+    @classmethod
+    def from_artifacts(cls, artifacts):
+        """Handle over artifacts already loaded (legacy pickles)."""
+        values = dict(artifacts._asdict(), user_lookup=artifacts.catalog.user_lookup)
+        return cls(None, loaders={}, values=values, version=artifacts.version)
+
+    def __getattr__(self, name):
+        values = self.__dict__.get("_values", {})
+        if name in values:
+            return values[name]
+        loader = self.__dict__.get("_loaders", {}).get(name)
+        if loader is None:
+            raise AttributeError(name)
+        with self._locks[name]:
+            if name not in values:
+                with timed(f"load_artifacts.{name}"):
+                    values[name] = loader(self)
+        return values[name]
+
+    def loaded(self):
+        """Names of the fields built so far."""
+        return set(self._values)
+
+    def materialize(self):
+        """The complete Artifacts tuple (every field built)."""
+        return Artifacts(*(getattr(self, name) for name in Artifacts._fields[:-1]), self.version)
+
+    def warm_up(self):
+        """Build every field in a background thread (once); returns the thread.
+
+        The thread checks a stop event between fields; ``stop_warm_up`` (also
+        registered with atexit) sets it and joins the thread, so the
+        interpreter never shuts down in the middle of a Parquet / npy read.
+        """
+        if self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(target=self._run_warm_up, name="artifacts-warm-up", daemon=True)
+            atexit.register(self.stop_warm_up)
+            self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def stop_warm_up(self):
+        """Stop the warm-up after the field being built and wait for its thread."""
+        self._warm_up_stop.set()
+        if self._warm_up_thread is not None and self._warm_up_thread is not threading.current_thread():
+            self._warm_up_thread.join()
+
+    def _run_warm_up(self):
+        try:
+            with timed("load_artifacts.warm_up"):
+                for name in Artifacts._fields[:-1]:
+                    if self._warm_up_stop.is_set():
+                        return
+                    getattr(self, name)
+                if not self._warm_up_stop.is_set() and not self.book_neighbors.has_table():
+                    self.book_neighbors.model()
+        finally:
+            # Plus rien à attendre à la sortie : le handle n'est plus retenu par atexit.
+            atexit.unregister(self.stop_warm_up)
+
+
+def load_bundle_artifacts(bundle):
+    """Build the serving objects from an artifact bundle without unpickling."""
+    return LazyArtifacts(bundle).materialize()
+
+
+def load_pickled_artifacts(artifacts_path):
+    """Build the serving objects from the legacy pickle artifacts."""
+    def load(name):
+        with open(os.path.join(artifacts_path, f"{name}.pkl"), "rb") as f:
+            return pickle.load(f)
+
+    knn_model = load("knn_model")
+    book_titles = load("book_titles")
+    books, ratings = compact_books(load("book_df"))
+    svd_model = load("svd_model")
+    X_final = load("X_final")
+    books_df_knn = load("book_df_knn")
+
+    svd_items = [svd_model.trainset.to_raw_iid(i) for i in svd_model.trainset.all_items()]
+    catalog = CatalogIndex(books, ratings, books_df_knn, svd_items)
+    svd_scorer = SVDScorer.from_model(svd_model, catalog.titles, catalog.inner_ids)
+    book_neighbors = BookNeighbors(knn_model, X_final)
+    search_index = build_search_index(books)
+    leaderboard = Leaderboard(*compute_title_stats(books, ratings))
+
+    return Artifacts(
+        book_titles, books, ratings, X_final, books_df_knn,
+        catalog, svd_scorer, book_neighbors, search_index, leaderboard,
+        None, None, artifacts_version(artifacts_path),
+    )
+
+
+def lazy_artifacts(artifacts_path="artifacts", version=None):
+    """LazyArtifacts of a bundle (the latest by default); legacy pickles are loaded at once."""
+    if latest_version(artifacts_path) is not None:
+        if version is not None and version.startswith("pickle-"):
+            version = None
+        return LazyArtifacts(ArtifactBundle(artifacts_path, version))
+    return LazyArtifacts.from_artifacts(load_pickled_artifacts(artifacts_path))
+
+
+@timed("load_artifacts")
+def load_artifacts(artifacts_path="artifacts", version=None):
+    """Load an artifact bundle (the latest by default), falling back to the legacy pickles."""
+    return lazy_artifacts(artifacts_path, version).materialize()
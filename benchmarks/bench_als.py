@@ -0,0 +1,78 @@
+""" Implicit ALS vs surprise SVD: training time, ranking quality, and thread scaling of the CG solves.
+
+``python benchmarks/bench_als.py [ratings.csv] [n_jobs]`` runs from the
+directory holding ``data/dataset_final3.csv``. Both models are evaluated at
+their training defaults on the same 3 rating folds (evaluation.py metrics).
+ALS is then timed on the full matrix with 1 and ``n_jobs`` threads, and its
+block CG is checked against an exact per-user solve.
+"""
+
+import os
+import sys
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from als import ALS_ALPHA  # noqa: E402
+from als import ALS_FACTORS  # noqa: E402
+from als import ALS_REG  # noqa: E402
+from als import confidence_matrix  # noqa: E402
+from als import conjugate_gradient_block  # noqa: E402
+from als import train_als  # noqa: E402
+from evaluation import print_report  # noqa: E402
+from evaluation import run_search  # noqa: E402
+from ingest import user_item_matrix  # noqa: E402
+from ratings import compact_books  # noqa: E402
+
+DEFAULTS = {
+    "svd": {"n_factors": [50], "lr_all": [0.005], "reg_all": [0.02]},
+    "als": {"factors": [ALS_FACTORS], "reg": [ALS_REG], "alpha": [ALS_ALPHA]},
+}
+
+
+def check_cg(user_item, n_users=50, factors=16, reg=ALS_REG):
+    """Many CG steps on a block must reach the exact solution of each user's normal equations."""
+    rng = np.random.default_rng(0)
+    confidence = confidence_matrix(user_item)
+    items = rng.standard_normal((user_item.shape[1], factors)).astype(np.float32) * 0.1
+    users = np.zeros((n_users, factors), dtype=np.float32)
+    conjugate_gradient_block(users, items, items.T @ items, confidence, np.arange(n_users), reg, steps=4 * factors)
+    worst = 0.0
+    for user in range(n_users):
+        row = confidence[user]
+        y = items[row.indices].astype(np.float64)
+        gram = items.T.astype(np.float64) @ items + (y.T * row.data) @ y + reg * np.eye(factors)
+        exact = np.linalg.solve(gram, ((row.data + 1)[:, None] * y).sum(axis=0))
+        worst = max(worst, np.abs(exact - users[user]).max() / max(np.abs(exact).max(), 1e-12))
+    assert worst < 1e-3, worst
+    print(f"Block CG OK: max relative gap to the exact solves {worst:.1e} ({n_users} users).")
+
+
+def main(data_path="data/dataset_final3.csv", n_jobs=None):
+    warnings.filterwarnings("ignore")
+    n_jobs = int(n_jobs) if n_jobs else os.cpu_count()
+    data = pd.read_csv(data_path, engine="pyarrow")
+    books, ratings = compact_books(data)
+    user_item = user_item_matrix(ratings, len(books))
+    print(f"{len(ratings)} ratings, {user_item.shape[0]} users x {user_item.shape[1]} titles "
+          f"({(ratings.values == 0).mean():.0%} implicit 0 ratings).")
+    check_cg(user_item)
+
+    report = run_search(data, None, models=("svd", "als"), spaces=DEFAULTS)
+    print_report(report)
+    for model, entry in report["best"].items():
+        mean = entry["mean"]
+        print(f"{model.upper()}: fit {mean['fit_seconds']:.2f} s / fold, ndcg@10 {mean['ndcg@10']:.4f}, "
+              f"recall@10 {mean['recall@10']:.4f}, coverage {mean['coverage']:.3f}")
+
+    for threads in sorted({1, n_jobs}):
+        start = time.perf_counter()
+        train_als(user_item, n_jobs=threads)
+        print(f"ALS on the full matrix, {threads} thread(s): {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
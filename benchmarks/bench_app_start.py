@@ -0,0 +1,103 @@
+""" Streamlit cold start: time to first render, then the first opening of each tab.
+
+``python benchmarks/bench_app_start.py [artifacts_dir] [app.py] [repeats]``
+runs the app with streamlit's AppTest in fresh processes. It runs from the
+directory holding ``artifacts/`` (best of ``repeats`` processes per figure).
+
+- first render: the first script run (imports included, login tab open),
+  with the background warm-up disabled, and the artifacts it built;
+- <tab> on demand: the first run with that tab open, right after the first
+  render, with the background warm-up disabled;
+- <tab> after warm-up: the same, once the warm-up thread has finished.
+
+Pass the ``app.py`` of an older checkout (``git worktree add``) to compare.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CHILD_TIMEOUT = 600
+TABS = {
+    "My Recommendations": 1,
+    "Recommendations by books": 2,
+    "Search": 3,
+    "Popular books": 4,
+    "Top-Rated books": 5,
+    "About": 6,
+}
+
+
+def join_warm_up():
+    for thread in threading.enumerate():
+        if thread.name == "artifacts-warm-up":
+            thread.join()
+
+
+def child(app_path, tab, warm_up):
+    """Print the durations (s) of the first run and of the run opening ``tab`` as JSON."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(app_path)))
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(app_path, default_timeout=600)
+    start = time.perf_counter()
+    at.run()
+    result = {"first_render": time.perf_counter() - start}
+    from metrics import REGISTRY
+
+    # Instantané avant tout warm-up : ce que la page de connexion a construit elle-même.
+    result["loaded_at_first_render"] = sorted(
+        row["stage"] for row in REGISTRY.summary() if row["stage"].startswith("load_artifacts.")
+    ) if warm_up == "0" else None
+    if tab != "-":
+        if warm_up == "1":
+            join_warm_up()
+        # Les libellés contiennent l'emoji : celui de l'arbre rendu fait foi.
+        at.session_state["active_tab"] = [t.label for t in at.tabs][TABS[tab]]
+        start = time.perf_counter()
+        at.run()
+        result["tab"] = time.perf_counter() - start
+    assert not at.exception, [e.value for e in at.exception]
+    # Pas de sortie de l'interpréteur pendant une lecture du warm-up.
+    join_warm_up()
+    print(json.dumps(result))
+
+
+def measure(app_path, tab="-", warm_up="0", repeats=3):
+    """Best durations over ``repeats`` fresh processes."""
+    env = dict(os.environ, PYTHONWARNINGS="ignore", RECOMMENDER_REMOTE_COVERS="0", RECOMMENDER_WARM_UP=warm_up)
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", app_path, tab, warm_up],
+            env=env, check=True, capture_output=True, text=True, timeout=CHILD_TIMEOUT,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    best = {key: min(run[key] for run in runs) for key in ("first_render", "tab") if key in runs[0]}
+    best["loaded_at_first_render"] = runs[0]["loaded_at_first_render"]
+    return best
+
+
+def main(artifacts_dir=".", app_path=os.path.join(ROOT, "app.py"), repeats=3):
+    os.chdir(artifacts_dir)
+    app_path, repeats = os.path.abspath(app_path), int(repeats)
+    first = measure(app_path, repeats=repeats)
+    print(f"{app_path}")
+    print(f"first render (login tab)        : {first['first_render'] * 1e3:8.1f} ms")
+    loaded = [stage.split(".", 1)[1] for stage in first["loaded_at_first_render"]]
+    print(f"  artifacts built before it     : {', '.join(loaded) or 'none'}")
+    for tab in TABS:
+        on_demand = measure(app_path, tab, "0", repeats)["tab"]
+        warmed = measure(app_path, tab, "1", repeats)["tab"]
+        print(f"{tab:25s} on demand: {on_demand * 1e3:8.1f} ms, after warm-up: {warmed * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:5])
+    else:
+        main(*sys.argv[1:4])
@@ -0,0 +1,108 @@
+""" Cold-start time and RSS: legacy pickle artifacts vs the memory-mapped bundle. """
+
+import json
+import os
+import pickle
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc, else peak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode, artifacts_path):
+    """Load the artifacts once in a fresh process and print timings as JSON."""
+    warnings.filterwarnings("ignore")
+    import numpy  # noqa: F401  (common imports are not part of the load cost)
+    import pandas  # noqa: F401
+    from artifact_store import ArtifactBundle, load_bundle_artifacts, load_pickled_artifacts
+
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    if mode == "pickle":
+        loaded = load_pickled_artifacts(artifacts_path)
+    else:
+        loaded = load_bundle_artifacts(ArtifactBundle(artifacts_path))
+    elapsed = time.perf_counter() - start
+    assert loaded.catalog is not None
+    print(json.dumps({
+        "mode": mode,
+        "load_s": elapsed,
+        "rss_mb": current_rss_mb() - rss_before,
+    }))
+
+
+def prepare(artifacts_path):
+    """Copy the bundled pickles and write the same artifacts as a bundle."""
+    from bench_catalog_index import load_books_df
+    from leaderboard import compute_title_stats
+    from neighbors import compute_neighbor_table
+    from ratings import compact_books
+    from search import build_search_index
+    from train import save_artifacts
+
+    for name in ("knn_model", "book_titles", "svd_model", "X_final", "book_df_knn"):
+        shutil.copy(os.path.join(ROOT, "artifacts", f"{name}.pkl"), artifacts_path)
+    load = lambda name: pickle.load(open(os.path.join(artifacts_path, f"{name}.pkl"), "rb"))
+    knn_model, svd_model, X_final, books_df_knn = (
+        load("knn_model"), load("svd_model"), load("X_final"), load("book_df_knn")
+    )
+    books_df = load_books_df(svd_model, books_df_knn)
+    with open(os.path.join(artifacts_path, "book_df.pkl"), "wb") as f:
+        pickle.dump(books_df, f)
+
+    indices, distances = compute_neighbor_table(knn_model, X_final)
+    books, ratings = compact_books(books_df)
+    title_stats, min_votes = compute_title_stats(books, ratings)
+    save_artifacts(
+        artifacts_path, knn_model=knn_model, svd_model=svd_model, book_titles=load("book_titles"),
+        X_final=X_final, books=books, ratings=ratings, book_df_knn=books_df_knn,
+        neighbor_indices=indices, neighbor_distances=distances,
+        search_index=build_search_index(books),
+        title_stats=title_stats, min_votes=min_votes,
+    )
+
+
+def main(repeat=3):
+    """Run each loader in fresh processes and print median load time and RSS."""
+    warnings.filterwarnings("ignore")
+    artifacts_path = tempfile.mkdtemp(prefix="bench_artifacts_")
+    try:
+        os.chdir(ROOT)
+        prepare(artifacts_path)
+        print(f"\n{'format':<10}{'load (ms)':>12}{'RSS delta (MB)':>18}")
+        for mode in ("pickle", "bundle"):
+            runs = []
+            for _ in range(repeat):
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", mode, artifacts_path],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            runs.sort(key=lambda run: run["load_s"])
+            median = runs[len(runs) // 2]
+            print(f"{mode:<10}{median['load_s'] * 1e3:>12.1f}{median['rss_mb']:>18.1f}")
+    finally:
+        shutil.rmtree(artifacts_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,108 @@
+""" Micro-benchmark of per-request lookups: DataFrame scans vs CatalogIndex. """
+
+import os
+import pickle
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from catalog import CatalogIndex  # noqa: E402
+from ratings import compact_books  # noqa: E402
+
+
+def load_books_df(svd_model, books_df_knn):
+    """Load book_df.pkl, or rebuild a ratings-level frame from the SVD trainset."""
+    if os.path.exists("artifacts/book_df.pkl"):
+        return pickle.load(open("artifacts/book_df.pkl", "rb"))
+
+    trainset = svd_model.trainset
+    rows = [
+        (trainset.to_raw_uid(u), trainset.to_raw_iid(i), r)
+        for u, i, r in trainset.all_ratings()
+    ]
+    books_df = pd.DataFrame(rows, columns=["User-ID", "Book-Title", "Book-Rating"])
+    meta = books_df_knn.drop_duplicates(subset=["Book-Title"]).set_index("Book-Title")
+    books_df["Book-Author"] = books_df["Book-Title"].map(meta["Book-Author"])
+    books_df["Final_Tags"] = books_df["Book-Title"].map(meta["Final_Tags"])
+    books_df["Cluster_hdbscan"] = books_df["Book-Title"].map(meta["Cluster_hdbscan"])
+    books_df["Rating-Count"] = books_df.groupby("Book-Title")["Book-Rating"].transform("size")
+    books_df["Image-URL-L"] = "http://images.example.com/" + books_df["Book-Title"].str.len().astype(str)
+    books_df["Description"] = "Description of " + books_df["Book-Title"]
+    return books_df
+
+
+def scan_fetch_poster(books_df, book_list):
+    """Previous fetch_poster: column membership test + boolean mask per book."""
+    poster_urls = []
+    for book in book_list:
+        if book in books_df["Book-Title"].values:
+            idx = books_df[books_df["Book-Title"] == book].index
+            poster_urls.append((books_df.loc[idx[0], "Image-URL-L"], books_df.loc[idx[0], "Description"]))
+    return poster_urls
+
+
+def scan_user_seen(books_df, user_id):
+    """Previous recommend_book_svd lookups: unique users + frame filter."""
+    if user_id not in books_df["User-ID"].unique():
+        return None
+    return books_df[books_df["User-ID"] == user_id]["Book-Title"].unique()
+
+
+def scan_knn_row(books_df_knn, book_name):
+    """Previous recommend_book_knn lookup: membership test + boolean mask."""
+    if book_name not in books_df_knn["Book-Title"].values:
+        return None
+    return books_df_knn[books_df_knn["Book-Title"] == book_name].index[0]
+
+
+def timed(func, repeat=50):
+    """Median wall time of func() in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e3
+
+
+def main():
+    """Print per-request latency of each lookup before and after the index."""
+    svd_model = pickle.load(open("artifacts/svd_model.pkl", "rb"))
+    books_df_knn = pickle.load(open("artifacts/book_df_knn.pkl", "rb"))
+    books_df = load_books_df(svd_model, books_df_knn)
+
+    start = time.perf_counter()
+    svd_items = [svd_model.trainset.to_raw_iid(i) for i in svd_model.trainset.all_items()]
+    catalog = CatalogIndex(*compact_books(books_df), books_df_knn, svd_items)
+    print(f"Index built in {(time.perf_counter() - start) * 1e3:.1f} ms "
+          f"({len(books_df)} rows, {len(catalog.titles)} titles, {len(catalog.user_code)} users)")
+
+    rng = np.random.default_rng(0)
+    books = rng.choice(catalog.titles, size=10).tolist()
+    user_id = books_df["User-ID"].iloc[0]
+    book_name = books_df_knn["Book-Title"].iloc[len(books_df_knn) // 2]
+
+    assert scan_knn_row(books_df_knn, book_name) == catalog.knn_row[book_name]
+    assert set(scan_user_seen(books_df, user_id)) == set(catalog.titles[catalog.seen_positions(user_id)])
+    assert scan_fetch_poster(books_df, books) == [catalog.metadata(book) for book in books]
+
+    cases = [
+        ("fetch_poster (10 books)",
+         lambda: scan_fetch_poster(books_df, books),
+         lambda: [catalog.metadata(book) for book in books]),
+        ("user seen items",
+         lambda: scan_user_seen(books_df, user_id),
+         lambda: catalog.seen_positions(user_id)),
+        ("knn row lookup",
+         lambda: scan_knn_row(books_df_knn, book_name),
+         lambda: catalog.knn_row.get(book_name)),
+    ]
+    print(f"{'lookup':<26}{'scan (ms)':>12}{'index (ms)':>12}")
+    for name, before, after in cases:
+        print(f"{name:<26}{timed(before):>12.3f}{timed(after):>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
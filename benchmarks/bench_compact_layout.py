@@ -0,0 +1,85 @@
+""" Memory and load time: long ratings DataFrame vs the compact codes + metadata layout.
+
+``python benchmarks/bench_compact_layout.py 20`` replicates the ratings 20 times
+(with new user ids) to approach the size of the full dataset.
+"""
+
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_catalog_index import load_books_df  # noqa: E402
+from catalog import CatalogIndex  # noqa: E402
+from ratings import RatingsTable, compact_books, frame_memory_mb  # noqa: E402
+
+
+def replicate(books_df, factor):
+    """Copies of the ratings, each with distinct user ids."""
+    offset = int(books_df["User-ID"].max()) + 1
+    return pd.concat(
+        [books_df.assign(**{"User-ID": books_df["User-ID"] + k * offset}) for k in range(factor)],
+        ignore_index=True,
+    )
+
+
+def timed(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        times.append(time.perf_counter() - start)
+    return value, np.median(times) * 1e3
+
+
+def main(factor=1):
+    warnings.filterwarnings("ignore")
+    svd_model = pickle.load(open("artifacts/svd_model.pkl", "rb"))
+    books_df_knn = pickle.load(open("artifacts/book_df_knn.pkl", "rb"))
+    books_df = replicate(load_books_df(svd_model, books_df_knn), factor)
+    books, ratings = compact_books(books_df)
+
+    path = tempfile.mkdtemp(prefix="bench_compact_")
+    try:
+        books_df.to_parquet(os.path.join(path, "book_df.parquet"), index=False)
+        books.to_parquet(os.path.join(path, "books.parquet"), index=False)
+        pd.DataFrame({"User-ID": ratings.user_ids}).to_parquet(os.path.join(path, "users.parquet"), index=False)
+        for name, array in ratings.arrays().items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+
+        def load_long():
+            frame = pd.read_parquet(os.path.join(path, "book_df.parquet"))
+            return frame, CatalogIndex(*compact_books(frame), books_df_knn)
+
+        def load_compact():
+            loaded_books = pd.read_parquet(os.path.join(path, "books.parquet"))
+            loaded_ratings = RatingsTable(
+                *(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ratings.arrays()),
+                pd.read_parquet(os.path.join(path, "users.parquet"))["User-ID"].tolist(),
+            )
+            return loaded_books, CatalogIndex(loaded_books, loaded_ratings, books_df_knn)
+
+        _, long_ms = timed(load_long)
+        _, compact_ms = timed(load_compact)
+    finally:
+        shutil.rmtree(path)
+
+    long_mb = frame_memory_mb(books_df)
+    compact_mb = frame_memory_mb(books) + ratings.nbytes / 2**20 + frame_memory_mb(pd.DataFrame({"u": ratings.user_ids}))
+    print(f"{len(books_df)} ratings, {len(books)} titles, {len(ratings.user_ids)} users")
+    print(f"{'layout':<10}{'memory (MB)':>14}{'load + index (ms)':>20}")
+    print(f"{'long':<10}{long_mb:>14.1f}{long_ms:>20.1f}")
+    print(f"{'compact':<10}{compact_mb:>14.1f}{compact_ms:>20.1f}")
+    print(f"memory reduction: x{long_mb / compact_mb:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1)
@@ -0,0 +1,60 @@
+""" Checks the batched top-k / ranking metrics of evaluation.py against a per-user loop and times both.
+
+Run from the directory holding ``data/dataset_final3.csv``.
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import evaluation  # noqa: E402
+
+
+def per_user_metrics(scorer, seen, relevant, eval_users, k=10):
+    """Reference path: SVDScorer.top_n and set lookups for one user at a time."""
+    precision, recall, ndcg = [], [], []
+    discounts = 1 / np.log2(np.arange(2, k + 2))
+    for user in eval_users:
+        liked = set(relevant[user].indices)
+        top = scorer.top_n(user, seen[user].indices, k)[0]
+        hits = np.array([pos in liked for pos in top], dtype=float)
+        precision.append(hits.sum() / k)
+        recall.append(hits.sum() / len(liked))
+        ndcg.append(hits @ discounts[:len(hits)] / discounts[:min(k, len(liked))].sum())
+    return np.mean(precision), np.mean(recall), np.mean(ndcg)
+
+
+def main(data_path="data/dataset_final3.csv", k=10):
+    books_df = pd.read_csv(data_path)
+    users, items, values, titles = evaluation.encode_ratings(books_df)
+    folds = evaluation.assign_folds(len(values), 3)
+    evaluation._init_worker({
+        "users": users, "items": items, "values": values, "folds": folds,
+        "n_users": int(users.max()) + 1, "n_items": len(titles), "k": k,
+        "relevant_rating": evaluation.RELEVANT_RATING, "rating_scale": (float(values.min()), float(values.max())),
+        "seed": 0, "knn_data": None, "knn_title_pos": None,
+    })
+    params = {"n_factors": 50, "lr_all": 0.005, "reg_all": 0.02}
+    train, _, seen, relevant, eval_users = evaluation.split_fold(0)
+    scorer, score_block = evaluation.svd_scores(train, params, evaluation._worker_state["rating_scale"], 0)
+
+    start = time.perf_counter()
+    top = evaluation.top_k_lists(score_block, eval_users, seen, k)
+    metrics = evaluation.ranking_metrics(top, relevant[eval_users], k, len(titles))
+    batched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference = per_user_metrics(scorer, seen, relevant, eval_users, k)
+    loop = time.perf_counter() - start
+
+    assert np.allclose(reference, [metrics[f"precision@{k}"], metrics[f"recall@{k}"], metrics[f"ndcg@{k}"]])
+    print(f"Parity OK on {len(eval_users)} users ({len(titles)} titles).")
+    print(f"batched top-{k} + metrics  : {batched * 1e3:8.1f} ms")
+    print(f"per-user top-{k} + metrics : {loop * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,50 @@
+""" Request-time SVD fold-in: latency and agreement with the trained user factors.
+
+Each sampled user is treated as a guest: their ratings are folded in against the
+item factors (no prior), and the resulting top-10 is compared with the top-10
+from the user's trained factors.
+"""
+
+import os
+import sys
+import time
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from artifact_store import load_artifacts  # noqa: E402
+from scoring import select_top  # noqa: E402
+
+
+def main(artifacts_path="artifacts", n_users=200, min_ratings=5, seed=0):
+    warnings.filterwarnings("ignore")
+    artifacts = load_artifacts(artifacts_path)
+    catalog, scorer = artifacts.catalog, artifacts.svd_scorer
+    books_df = artifacts.ratings.to_frame(catalog.titles)
+
+    ratings_by_user = {
+        user_id: dict(zip(group["Book-Title"], group["Book-Rating"]))
+        for user_id, group in books_df.groupby("User-ID")
+        if user_id in scorer.user_inner_ids and len(group) >= min_ratings
+    }
+    rng = np.random.default_rng(seed)
+    users = rng.choice(list(ratings_by_user), min(n_users, len(ratings_by_user)), replace=False)
+
+    latencies, overlaps = [], []
+    for user_id in users:
+        ratings = ratings_by_user[user_id]
+        exclude = catalog.seen_positions(user_id)
+        start = time.perf_counter()
+        folded = select_top(scorer.score_factors(*scorer.fold_in(ratings)), exclude, 10)[0]
+        latencies.append((time.perf_counter() - start) * 1e3)
+        trained = scorer.top_n(user_id, exclude, 10)[0]
+        overlaps.append(len(np.intersect1d(folded, trained)) / 10)
+
+    print(f"{len(users)} users with >= {min_ratings} ratings")
+    print(f"fold-in + top-10 : {np.median(latencies):.2f} ms median, {np.percentile(latencies, 95):.2f} ms p95")
+    print(f"top-10 overlap with trained factors: {np.mean(overlaps):.2f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,68 @@
+""" Hybrid re-ranking: added latency over plain SVD, and the cluster diversity it buys. """
+
+import os
+import sys
+import time
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from artifact_store import load_artifacts  # noqa: E402
+from hybrid import content_scores  # noqa: E402
+from recommender import hybrid_recommendations  # noqa: E402
+from recommender import user_recommendations  # noqa: E402
+
+
+def median_ms(times):
+    return np.median(times) * 1e3
+
+
+def main(artifacts_path="artifacts", n_users=500):
+    warnings.filterwarnings("ignore")
+    artifacts = load_artifacts(artifacts_path)
+    catalog, scorer, leaderboard = artifacts.catalog, artifacts.svd_scorer, artifacts.leaderboard
+    table, X_final = artifacts.recommendation_table, artifacts.X_final
+    clusters = dict(zip(catalog.titles, leaderboard.clusters))
+
+    user_ids = artifacts.ratings.user_ids[:n_users]
+    times = {"svd live": [], "hybrid live": [], "svd table": [], "hybrid table": []}
+    distinct = {"svd": [], "hybrid": []}
+    overlap = []
+    for user_id in user_ids:
+        for source, recommendation_table in (("live", None), ("table", table)):
+            start = time.perf_counter()
+            svd_titles, _, _ = user_recommendations(user_id, catalog, scorer, leaderboard, 10, recommendation_table)
+            times[f"svd {source}"].append(time.perf_counter() - start)
+            if recommendation_table is None:
+                live_titles = svd_titles
+            start = time.perf_counter()
+            hybrid_titles, _, _ = hybrid_recommendations(
+                user_id, catalog, scorer, leaderboard, X_final, 10, recommendation_table
+            )
+            times[f"hybrid {source}"].append(time.perf_counter() - start)
+
+        # alpha=1, diversity=1 : la pertinence est le score SVD seul, l'ordre SVD est conservé.
+        plain, _, _ = hybrid_recommendations(user_id, catalog, scorer, leaderboard, X_final, 10,
+                                             alpha=1.0, diversity=1.0)
+        assert plain == live_titles, user_id
+        distinct["svd"].append(len({clusters[title] for title in svd_titles}))
+        distinct["hybrid"].append(len({clusters[title] for title in hybrid_titles}))
+        overlap.append(len(set(svd_titles) & set(hybrid_titles)))
+
+    # Utilisateur implicite : toutes les notes aimées valent 0, le score de contenu reste une moyenne.
+    rows = np.arange(min(20, X_final.shape[0]))
+    implicit = content_scores(X_final, rows, rows[:5], np.zeros(5))
+    assert np.isfinite(implicit).all() and np.allclose(implicit, content_scores(X_final, rows, rows[:5], np.ones(5)))
+
+    print(f"Parity OK on {len(user_ids)} users (alpha=1, diversity=1 reproduces the SVD top-10).")
+    for name, values in times.items():
+        print(f"{name:13s}: {median_ms(values):8.3f} ms / user (median)")
+    print(f"added latency: {median_ms(times['hybrid live']) - median_ms(times['svd live']):+.3f} ms (live), "
+          f"{median_ms(times['hybrid table']) - median_ms(times['svd table']):+.3f} ms (table)")
+    print(f"distinct clusters in top-10: svd {np.mean(distinct['svd']):.2f}, hybrid {np.mean(distinct['hybrid']):.2f}; "
+          f"titles shared with svd top-10: {np.mean(overlap):.2f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
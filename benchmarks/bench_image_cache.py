@@ -0,0 +1,135 @@
+""" Test script: prefetch covers from a local stub image host into the thumbnail cache.
+
+The stub serves generated JPEGs (some identical, to check deduplication), a
+1x1 GIF and 404s for "missing" covers, and a 503 once for flaky ones. The
+checks cover resume, LRU eviction and the cost of serving a cached thumbnail.
+"""
+
+import asyncio
+import io
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from images import MISSING, ThumbnailCache, data_uri, prefetch_thumbnails  # noqa: E402
+
+N_COVERS = 60
+NOT_FOUND = {3, 17}
+TINY = {5}
+FLAKY = {8, 21}
+SHARED = {30, 31, 32}  # même image pour plusieurs ISBN
+
+
+def cover_bytes(i):
+    from PIL import Image
+
+    color = (0, 0, 0) if i in SHARED else (i * 4 % 256, 80, 160)
+    output = io.BytesIO()
+    Image.new("RGB", (400, 600), color).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def tiny_gif():
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new("RGB", (1, 1)).save(output, format="GIF")
+    return output.getvalue()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    hits = Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        match = re.fullmatch(r"/covers/(\d+)\.jpg", self.path)
+        i = int(match.group(1)) if match else None
+        with self.lock:
+            self.hits[i] += 1
+            first_hit = self.hits[i] == 1
+
+        if i is None or i in NOT_FOUND:
+            self.send_response(404)
+            self.end_headers()
+            return
+        if i in FLAKY and first_hit:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = tiny_gif() if i in TINY else cover_bytes(i)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    items = [(f"isbn{i:04d}", f"{base_url}/covers/{i}.jpg") for i in range(N_COVERS)]
+    cache_dir = tempfile.mkdtemp(prefix="thumbnail_check_")
+
+    try:
+        cache = ThumbnailCache(cache_dir, max_bytes=2**30)
+
+        # 1. Premier passage : 404 et GIF 1x1 -> manquants, 503 -> réessayé.
+        start = time.perf_counter()
+        outcomes = asyncio.run(prefetch_thumbnails(items, cache, concurrency=8, backoff=0.05))
+        print(f"first pass ({time.perf_counter() - start:.2f} s): {dict(outcomes)}")
+        expected_missing = len(NOT_FOUND) + len(TINY)
+        assert outcomes["missing"] == expected_missing and outcomes["stored"] == N_COVERS - expected_missing
+        assert all(StubHandler.hits[i] == 2 for i in FLAKY)
+        stats = cache.stats()
+        assert stats["files"] == N_COVERS - expected_missing - len(SHARED) + 1, stats  # dédupliqués
+        assert cache.get("isbn0003") == MISSING and cache.get("isbn0005") == MISSING
+
+        # 2. Reprise : rien n'est retéléchargé.
+        hits_before = sum(StubHandler.hits.values())
+        outcomes = asyncio.run(prefetch_thumbnails(items, cache, concurrency=8))
+        assert outcomes["cached"] == N_COVERS and sum(StubHandler.hits.values()) == hits_before
+        print(f"resume: {dict(outcomes)}, no request sent")
+
+        # 3. Miniatures réduites, servies depuis le disque.
+        thumbnail = cache.get("isbn0010")
+        from PIL import Image
+        assert max(Image.open(io.BytesIO(thumbnail)).size) <= 360
+        start = time.perf_counter()
+        for key, _ in items:
+            value = cache.get(key)
+            if value not in (None, MISSING):
+                data_uri(value)
+        per_cover = (time.perf_counter() - start) / N_COVERS * 1e3
+        print(f"thumbnail {len(thumbnail)} B (source {len(cover_bytes(10))} B); "
+              f"cached lookup + data URI: {per_cover:.3f} ms / cover")
+
+        # 4. Éviction LRU : les miniatures lues récemment restent.
+        for key in ("isbn0040", "isbn0041"):
+            time.sleep(0.01)
+            cache.get(key)
+        cache.max_bytes = cache.total_bytes() // 4
+        removed = cache.evict()
+        assert cache.total_bytes() <= cache.max_bytes
+        assert cache.get("isbn0040") not in (None, MISSING) and cache.get("isbn0041") not in (None, MISSING)
+        assert cache.get("isbn0000") is None
+        print(f"eviction: {removed} files removed, {cache.total_bytes()} B kept, recently used covers kept")
+        print("All checks passed.")
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+""" Streaming ingestion vs full load: peak memory and time of steps 1-3, and output parity.
+
+``python benchmarks/bench_ingest.py [ratings.csv] [chunk_rows]`` runs each
+path in a fresh process (peak RSS from getrusage). It then checks that
+streaming the CSV and a Parquet copy gives the same books, ratings codes,
+KNN rows and titles as the in-memory pipeline.
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def full_load(data_path):
+    from ratings import compact_books
+    from train import create_user_item_matrix
+    from train import preprocess_data_for_knn
+
+    data = pd.read_csv(data_path, engine="pyarrow")
+    books, ratings = compact_books(data)
+    books_knn = preprocess_data_for_knn(data)
+    _, book_titles = create_user_item_matrix(data)
+    return books, ratings, books_knn, book_titles
+
+
+def streamed(data_path, chunk_rows):
+    from ingest import ingest_ratings
+
+    ingested = ingest_ratings(data_path, chunk_rows)
+    return ingested.books, ingested.ratings, ingested.books_knn, ingested.book_titles
+
+
+def child(kind, data_path, chunk_rows):
+    """Run one path and print its duration and peak RSS as JSON (last line)."""
+    import train  # noqa: F401  (imports hors de la mesure de temps)
+
+    start = time.perf_counter()
+    full_load(data_path) if kind == "full" else streamed(data_path, int(chunk_rows))
+    print(json.dumps({"seconds": time.perf_counter() - start,
+                      "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+def measure(kind, data_path, chunk_rows):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", kind, data_path, str(chunk_rows)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def assert_same(expected, actual, label):
+    books, ratings, books_knn, book_titles = expected
+    pd.testing.assert_frame_equal(actual[0], books, obj=f"{label} books")
+    for name in ("user_codes", "item_codes", "values"):
+        left, right = getattr(ratings, name), getattr(actual[1], name)
+        assert left.dtype == right.dtype and np.array_equal(left, right), (label, name)
+    assert actual[1].user_ids == ratings.user_ids, label
+    pd.testing.assert_frame_equal(actual[2], books_knn, obj=f"{label} books_knn")
+    pd.testing.assert_index_equal(actual[3], book_titles, obj=f"{label} titles")
+
+
+def main(data_path="data/dataset_final3.csv", chunk_rows=50_000):
+    chunk_rows = int(chunk_rows)
+    size_mb = os.path.getsize(data_path) / 2**20
+    print(f"{data_path}: {size_mb:.1f} MB")
+    for kind in ("full", "stream"):
+        result = measure(kind, data_path, chunk_rows)
+        label = "full load" if kind == "full" else f"streaming ({chunk_rows} rows / chunk)"
+        print(f"{label:32s}: {result['seconds']:6.2f} s, peak RSS {result['peak_rss_mb']:7.1f} MB")
+
+    expected = full_load(data_path)
+    assert_same(expected, streamed(data_path, chunk_rows), "csv")
+    with tempfile.TemporaryDirectory() as tmp:
+        parquet_path = os.path.join(tmp, "ratings.parquet")
+        pd.read_csv(data_path, engine="pyarrow").to_parquet(parquet_path, index=False, row_group_size=chunk_rows)
+        assert_same(expected, streamed(parquet_path, chunk_rows), "parquet")
+    print("Parity OK: CSV and Parquet streams match the in-memory pipeline.")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:5])
+    else:
+        main(*sys.argv[1:3])
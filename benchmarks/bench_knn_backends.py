@@ -0,0 +1,78 @@
+""" Recall@10 vs latency of the neighbour backends, brute force being the reference.
+
+``python benchmarks/bench_knn_backends.py --scale 20`` tiles X_final with a little
+noise to simulate a larger catalog.
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from neighbors import build_knn_backend  # noqa: E402
+
+
+def load_features(scale=1, seed=0):
+    """X_final from the artifacts, optionally tiled `scale` times with jitter."""
+    with open(os.path.join(ROOT, "artifacts", "X_final.pkl"), "rb") as f:
+        X = np.asarray(pickle.load(f), dtype=np.float32)
+    if scale > 1:
+        rng = np.random.default_rng(seed)
+        X = np.vstack([X] + [X + rng.normal(0, 0.01, X.shape).astype(np.float32) for _ in range(scale - 1)])
+    return X
+
+
+def recall_at_k(reference_distances, distances):
+    """Mean share of the exact top-k found by a backend.
+
+    Many books share the same features, so a neighbour counts as found when it
+    is at most as far as the exact k-th neighbour (ties are interchangeable).
+    """
+    kth = reference_distances[:, -1:] + 1e-5
+    return np.mean(distances <= kth)
+
+
+def measure(model, X, queries, k):
+    """(distances, per-query latency in ms) for single-row queries, like the app."""
+    distances = np.empty((len(queries), k))
+    start = time.perf_counter()
+    for i, row in enumerate(queries):
+        distances[i] = model.kneighbors(X[row:row + 1], n_neighbors=k)[0][0]
+    return distances, (time.perf_counter() - start) * 1e3 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1, help="Tile X_final this many times.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--probes", default="1,4,8,16", help="IVF n_probe values to try.")
+    args = parser.parse_args()
+
+    X = load_features(args.scale)
+    queries = np.random.default_rng(1).choice(X.shape[0], min(args.queries, X.shape[0]), replace=False)
+    print(f"X: {X.shape[0]} rows x {X.shape[1]} features, {len(queries)} queries, k={args.k}\n")
+
+    configs = [("brute", {}), ("kd_tree", {}), ("ball_tree", {})]
+    configs += [("ivf", {"n_probe": int(probe)}) for probe in args.probes.split(",")]
+
+    reference = None
+    print(f"{'backend':<18}{'build (s)':>11}{'query (ms)':>12}{'recall@k':>10}")
+    for backend, params in configs:
+        start = time.perf_counter()
+        model = build_knn_backend(X, backend=backend, metric="manhattan", n_neighbors=args.k, **params)
+        build_s = time.perf_counter() - start
+        distances, latency_ms = measure(model, X, queries, args.k)
+        if reference is None:
+            reference = distances
+        label = backend + (f" probe={params['n_probe']}" if params else "")
+        print(f"{label:<18}{build_s:>11.2f}{latency_ms:>12.3f}{recall_at_k(reference, distances):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+""" Overhead of the latency instrumentation: timed() per call, with and without cProfile, and export cost. """
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from metrics import MetricsRegistry  # noqa: E402
+from metrics import profile_requests  # noqa: E402
+from metrics import timed  # noqa: E402
+
+
+def per_call_us(func, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main(n=100_000):
+    registry = MetricsRegistry()
+    bare = lambda: None
+    decorated = timed("bench.decorated", registry)(bare)
+
+    def nested():
+        with timed("bench.outer", registry):
+            with timed("bench.inner", registry):
+                pass
+
+    baseline = per_call_us(bare, n)
+    print(f"plain call          : {baseline:7.3f} us")
+    print(f"@timed              : {per_call_us(decorated, n) - baseline:7.3f} us overhead / call")
+    print(f"2 nested timed()    : {per_call_us(nested, n) - baseline:7.3f} us overhead / call")
+    profile_requests(True)
+    print(f"@timed + cProfile   : {per_call_us(decorated, n // 100) - baseline:7.3f} us overhead / call")
+    profile_requests(False)
+
+    for stage in range(50):
+        for _ in range(100):
+            registry.observe(f"bench.stage{stage}", 0.001 * (stage + 1))
+    start = time.perf_counter()
+    text = registry.prometheus_text()
+    print(f"Prometheus export   : {(time.perf_counter() - start) * 1e3:7.3f} ms for 53 stages ({len(text)} bytes)")
+    start = time.perf_counter()
+    registry.summary()
+    print(f"About tab summary   : {(time.perf_counter() - start) * 1e3:7.3f} ms")
+    assert registry.stages["bench.decorated"].count == n + n // 100
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+""" Precomputed recommendation table: build time, parity with live scoring and lookup latency. """
+
+import os
+import sys
+import time
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from artifact_store import load_artifacts  # noqa: E402
+from precompute import build_recommendation_table  # noqa: E402
+from recommender import user_recommendations  # noqa: E402
+
+
+def main(artifacts_path="artifacts", n_jobs=4, n_users=500):
+    warnings.filterwarnings("ignore")
+    artifacts = load_artifacts(artifacts_path)
+    catalog, scorer, leaderboard = artifacts.catalog, artifacts.svd_scorer, artifacts.leaderboard
+
+    for jobs in (1, n_jobs):
+        start = time.perf_counter()
+        table = build_recommendation_table(scorer, artifacts.ratings, n_jobs=jobs)
+        print(f"build (n_jobs={jobs}): {time.perf_counter() - start:.2f} s for {table.top.shape[0]} users")
+
+    user_ids = artifacts.ratings.user_ids[:n_users]
+    live_times, table_times = [], []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        expected = user_recommendations(user_id, catalog, scorer, leaderboard, 10)
+        live_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        served = user_recommendations(user_id, catalog, scorer, leaderboard, 10, table)
+        table_times.append(time.perf_counter() - start)
+        assert served[0] == expected[0] and np.allclose(served[1], expected[1], atol=1e-5), user_id
+
+    print(f"Parity OK on {len(user_ids)} users.")
+    print(f"live top-10  : {np.median(live_times) * 1e3:8.3f} ms / user (median)")
+    print(f"table top-10 : {np.median(table_times) * 1e3:8.3f} ms / user (median)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
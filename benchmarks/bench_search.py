@@ -0,0 +1,68 @@
+""" Search latency: regex scan over unique titles vs the inverted index. """
+
+import os
+import pickle
+import sys
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_catalog_index import load_books_df  # noqa: E402
+from search import build_search_index  # noqa: E402
+
+QUERIES = ["harry", "harry pot", "lord rings", "the", "love", "king stephen", "zzzz"]
+
+
+def scale_catalog(books_df, n_titles):
+    """Replicate the per-title rows until the catalog holds n_titles titles."""
+    first_rows = books_df.drop_duplicates(subset=["Book-Title"]).reset_index(drop=True)
+    copies = int(np.ceil(n_titles / len(first_rows)))
+    frames = []
+    for copy in range(copies):
+        frame = first_rows.copy()
+        if copy:
+            frame["Book-Title"] = frame["Book-Title"] + f" vol{copy}"
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True).head(n_titles)
+
+
+def scan(books_df, query):
+    """Previous tab3 path: drop_duplicates + case-insensitive str.contains."""
+    unique_books = books_df.drop_duplicates(subset=["Book-Title"])
+    return unique_books[unique_books["Book-Title"].str.contains(query, case=False, na=False)]
+
+
+def timed(func, repeat=5):
+    """Median wall time of func() in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e3
+
+
+def main(n_titles=int(os.environ.get("BENCH_SEARCH_TITLES", 200_000))):
+    """Build the index on a scaled catalog and print per-query latencies."""
+    warnings.filterwarnings("ignore")
+    svd_model = pickle.load(open("artifacts/svd_model.pkl", "rb"))
+    books_df_knn = pickle.load(open("artifacts/book_df_knn.pkl", "rb"))
+    books_df = scale_catalog(load_books_df(svd_model, books_df_knn), n_titles)
+
+    start = time.perf_counter()
+    search_index = build_search_index(books_df)
+    print(f"Index built in {time.perf_counter() - start:.1f} s "
+          f"({search_index.n_docs} titles, {len(search_index.terms)} terms)")
+
+    print(f"{'query':<16}{'hits':>9}{'scan (ms)':>12}{'index (ms)':>12}")
+    for query in QUERIES:
+        hits = len(search_index.search(query)[0])
+        print(f"{query:<16}{hits:>9}{timed(lambda: scan(books_df, query)):>12.1f}"
+              f"{timed(lambda: search_index.search(query, limit=100)):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+""" Shared-memory serving: memory per worker process, and hot swap of a new generation.
+
+``python benchmarks/bench_shared_state.py [artifacts] [n_workers]`` starts
+worker processes that serve from private bundle loads, then from the shared
+generations of shared_state.py. For each worker it reports the RSS and PSS
+(from /proc, Linux only) added by loading and serving the artifacts. It then publishes two new generations while the workers
+run and checks that every worker switches to the last one.
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from artifact_store import ArtifactBundle  # noqa: E402
+from artifact_store import latest_version  # noqa: E402
+from artifact_store import load_artifacts  # noqa: E402
+from artifact_store import write_bundle  # noqa: E402
+from recommender import similar_books  # noqa: E402
+from recommender import user_recommendations  # noqa: E402
+from shared_state import publish_generation  # noqa: E402
+
+
+def memory_mb():
+    """(RSS, PSS) of the current process in MB; PSS splits shared pages between the processes mapping them."""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return values["Rss"], values["Pss"]
+
+
+def serve(artifacts):
+    """Touch what a worker touches while serving: recommendations, live neighbours."""
+    catalog = artifacts.catalog
+    for user_id in artifacts.ratings.user_ids[:200]:
+        user_recommendations(user_id, catalog, artifacts.svd_scorer, artifacts.leaderboard, 10)
+    # Plus de voisins que la table précalculée : requêtes en direct sur le backend KNN.
+    neighbors = artifacts.book_neighbors
+    n_live = (neighbors.indices.shape[1] if neighbors.indices is not None else 10) + 1
+    for title in catalog.titles[:50]:
+        similar_books(title, catalog, neighbors, n_live)
+
+
+def worker(path, ready, start, results, watch_seconds):
+    warnings.filterwarnings("ignore")
+    import sklearn.neighbors  # noqa: F401  (importé avant la mesure de référence)
+
+    before = memory_mb()
+    artifacts = load_artifacts(path)
+    serve(artifacts)
+    after = memory_mb()
+    ready.put((os.getpid(), after[0] - before[0], after[1] - before[1]))
+    start.wait()
+    # Comme api.get_artifacts : nouvelle version -> rechargement, l'ancienne est libérée.
+    versions = [artifacts.version]
+    deadline = time.monotonic() + watch_seconds
+    while time.monotonic() < deadline:
+        version = latest_version(path)
+        if version not in (None, artifacts.version):
+            begin = time.perf_counter()
+            artifacts = load_artifacts(path, version)
+            serve(artifacts)
+            versions.append(f"{artifacts.version} ({(time.perf_counter() - begin) * 1e3:.0f} ms)")
+        time.sleep(0.1)
+    results.put((os.getpid(), versions, *memory_mb()))
+
+
+def run_workers(path, n_workers, on_start=None, watch_seconds=0.0):
+    context = multiprocessing.get_context("spawn")
+    ready, results, start = context.Queue(), context.Queue(), context.Event()
+    processes = [
+        context.Process(target=worker, args=(path, ready, start, results, watch_seconds)) for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    loaded = [ready.get() for _ in processes]
+    start.set()
+    if on_start is not None:
+        on_start()
+    finished = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return loaded, finished
+
+
+def republish(artifacts_path):
+    """Publish a copy of the latest bundle as a new version (stands in for a retrain)."""
+    bundle = ArtifactBundle(artifacts_path)
+    arrays = {name: bundle.array(name) for name in bundle.manifest["arrays"]}
+    frames = {name: bundle.frame(name) for name in bundle.manifest["frames"]}
+    return write_bundle(artifacts_path, arrays, frames, bundle.meta)
+
+
+def main(artifacts_path="artifacts", n_workers=4):
+    n_workers = int(n_workers)
+    workdir = tempfile.mkdtemp(prefix="shared-bench-")
+    shm_root = "/dev/shm" if os.path.isdir("/dev/shm") else workdir
+    shared_dir = tempfile.mkdtemp(prefix="shared-bench-", dir=shm_root)
+    try:
+        # Copie du dernier bundle : les versions publiées pendant le test n'encombrent pas artifacts/.
+        source = os.path.join(workdir, "artifacts")
+        version = latest_version(artifacts_path)
+        shutil.copytree(os.path.join(artifacts_path, "bundles", version), os.path.join(source, "bundles", version))
+        with open(os.path.join(source, "bundles", "LATEST"), "w") as f:
+            f.write(version)
+        publish_generation(source, shared_dir)
+
+        for label, path in (("private bundle loads", source), ("shared generations", shared_dir)):
+            loaded, _ = run_workers(path, n_workers)
+            rss, pss = np.array([row[1] for row in loaded]), np.array([row[2] for row in loaded])
+            print(f"{label:21s}: {n_workers} workers, artifacts RSS {rss.mean():6.1f} MB / worker, "
+                  f"PSS {pss.mean():6.1f} MB / worker, {pss.sum():6.1f} MB in total")
+
+        def swap_twice():
+            for _ in range(2):
+                time.sleep(1.0)
+                republish(source)
+                print(f"published {publish_generation(source, shared_dir)}", flush=True)
+
+        _, finished = run_workers(shared_dir, n_workers, on_start=swap_twice, watch_seconds=8.0)
+        current = latest_version(shared_dir)
+        for pid, versions, rss, pss in finished:
+            print(f"worker {pid}: {' -> '.join(versions)}; PSS {pss:.1f} MB")
+            assert versions[-1].startswith(current), (pid, versions)
+        print(f"Hot swap OK: every worker serves {current} without a restart; "
+              f"generations kept: {sorted(os.listdir(os.path.join(shared_dir, 'bundles')))}")
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
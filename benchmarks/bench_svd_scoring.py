@@ -0,0 +1,59 @@
+""" Checks SVDScorer against svd.predict and times both scoring paths. """
+
+import os
+import pickle
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from scoring import SVDScorer  # noqa: E402
+
+
+def predict_loop(svd_model, user_id, titles, seen, n_recommendations=10):
+    """Reference path: one svd.predict per unseen title, then a full sort."""
+    books_to_predict = [book for book in titles if book not in seen]
+    predictions = [(book, svd_model.predict(user_id, book).est) for book in books_to_predict]
+    return sorted(predictions, key=lambda x: x[1], reverse=True)[:n_recommendations]
+
+
+def main(n_users=50, n_recommendations=10):
+    """Assert identical rankings on a sample of users and print latencies."""
+    svd_model = pickle.load(open("artifacts/svd_model.pkl", "rb"))
+    trainset = svd_model.trainset
+
+    # Catalogue : titres du trainset + quelques titres inconnus du modèle.
+    titles = [trainset.to_raw_iid(i) for i in trainset.all_items()]
+    titles += [f"__unknown_title_{i}" for i in range(5)]
+    scorer = SVDScorer.from_model(svd_model, titles)
+
+    rng = np.random.default_rng(42)
+    inner_users = rng.choice(trainset.n_users, size=min(n_users, trainset.n_users), replace=False)
+    user_ids = [trainset.to_raw_uid(u) for u in inner_users] + ["__unknown_user__"]
+
+    loop_times, vector_times = [], []
+    for user_id in user_ids:
+        if user_id in scorer.user_inner_ids:
+            inner_uid = scorer.user_inner_ids[user_id]
+            seen = {trainset.to_raw_iid(i) for i, _ in trainset.ur[inner_uid]}
+        else:
+            seen = set()
+
+        start = time.perf_counter()
+        expected = predict_loop(svd_model, user_id, titles, seen, n_recommendations)
+        loop_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        top, scores = scorer.top_n(user_id, scorer.positions(seen), n_recommendations)
+        vector_times.append(time.perf_counter() - start)
+
+        assert [book for book, _ in expected] == scorer.titles[top].tolist(), user_id
+        assert np.allclose([est for _, est in expected], scores), user_id
+
+    print(f"Parity OK on {len(user_ids)} users ({len(titles)} titles).")
+    print(f"svd.predict loop : {np.median(loop_times) * 1e3:8.2f} ms / user (median)")
+    print(f"SVDScorer.top_n  : {np.median(vector_times) * 1e3:8.2f} ms / user (median)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+""" Local load test for the HTTP API: p50/p95/p99 latency and requests per second.
+
+Start the API first (``uvicorn api:app --workers 4``), then run
+``python benchmarks/load_test_api.py --concurrency 32 --duration 30``.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def sample_ids(artifacts_path):
+    """User ids and titles to query, read from the local artifacts."""
+    from artifact_store import load_artifacts
+
+    artifacts = load_artifacts(artifacts_path)
+    return list(artifacts.catalog.user_code), list(artifacts.catalog.knn_row)
+
+
+def make_requests(base_url, user_ids, titles, batch_size):
+    """One request factory per endpoint: () -> (method, url, body)."""
+    quote = urllib.parse.quote
+    return {
+        "user": lambda: ("GET", f"{base_url}/recommend/user/{random.choice(user_ids)}", None),
+        "book": lambda: ("GET", f"{base_url}/recommend/book/{quote(random.choice(titles), safe='')}", None),
+        "search": lambda: ("GET", f"{base_url}/search?q={quote(random.choice(titles).split()[0])}", None),
+        "popular": lambda: ("GET", f"{base_url}/popular", None),
+        "batch": lambda: (
+            "POST",
+            f"{base_url}/recommend/users",
+            json.dumps({"user_ids": random.sample(user_ids, min(batch_size, len(user_ids)))}).encode(),
+        ),
+    }
+
+
+def worker(factory, deadline, latencies, errors, lock):
+    """Send requests back to back until the deadline."""
+    while time.perf_counter() < deadline:
+        method, url, body = factory()
+        request = urllib.request.Request(url, data=body, method=method,
+                                         headers={"Content-Type": "application/json"})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+        except (urllib.error.URLError, OSError):
+            with lock:
+                errors[0] += 1
+
+
+def run(endpoint, factory, concurrency, duration):
+    """Drive one endpoint with `concurrency` clients and print its statistics."""
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker, factory, deadline, latencies, errors, lock)
+    wall = time.perf_counter() - start
+
+    if not latencies:
+        print(f"{endpoint:<10}{'no successful requests':>40}  errors={errors[0]}")
+        return {"endpoint": endpoint, "requests": 0, "errors": errors[0]}
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1e3, [50, 95, 99])
+    rps = len(latencies) / wall
+    print(f"{endpoint:<10}{len(latencies):>9}{rps:>10.1f}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}{errors[0]:>8}")
+    return {"endpoint": endpoint, "requests": len(latencies), "errors": errors[0],
+            "rps": rps, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--artifacts", default="artifacts")
+    parser.add_argument("--endpoints", default="user,book,search,popular,batch")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per endpoint.")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--output", help="Optional JSON file for the results.")
+    args = parser.parse_args()
+
+    user_ids, titles = sample_ids(args.artifacts)
+    factories = make_requests(args.url.rstrip("/"), user_ids, titles, args.batch_size)
+
+    print(f"{'endpoint':<10}{'requests':>9}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    results = [
+        run(endpoint, factories[endpoint], args.concurrency, args.duration)
+        for endpoint in args.endpoints.split(",")
+    ]
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
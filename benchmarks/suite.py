@@ -0,0 +1,326 @@
+""" Reproducible benchmark suite for the serving hot paths, at 1x / 10x / 100x the bundled ratings.
+
+For every scale the suite writes a synthetic dataset (benchmarks/synthetic.py),
+trains the artifacts with train.py, then measures in fresh processes:
+
+- cold start: imports + ``utils.load_model_and_data`` (seconds, peak RSS);
+- per-call latency (p50 / p95 / p99), single-thread throughput and peak
+  Python allocations (tracemalloc) of ``recommend_book_svd`` (precomputed
+  table and live), ``recommend_book_hybrid``, ``recommend_book_knn``,
+  ``fetch_poster`` and the tab3 search.
+
+Results are written as JSON and compared with a stored baseline; any
+regression beyond the tolerance exits with status 1.
+
+    python benchmarks/suite.py --scales 1 10                  # run and compare with benchmarks/baseline.json
+    python benchmarks/suite.py --scales 1 10 --save-baseline  # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE = os.path.join("data", "dataset_final3.csv")
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baseline.json")
+HOT_PATHS = (
+    "recommend_book_svd", "recommend_book_svd_live", "recommend_book_hybrid",
+    "recommend_book_knn", "fetch_poster", "search",
+)
+# métrique -> (sens, écart absolu ignoré, multiplicateur de la tolérance relative).
+# Sens +1 : plus grand est pire ; -1 : plus petit est pire. Les queues (p95) sont plus bruitées.
+CHECKED_METRICS = {
+    "p50_ms": (1, 0.1, 1), "p95_ms": (1, 0.25, 2), "throughput_per_s": (-1, 0.0, 1),
+    "peak_kb": (1, 64.0, 1), "seconds": (1, 0.1, 1), "peak_rss_mb": (1, 16.0, 1),
+}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def hot_path_calls(artifacts, n_calls, seed=0):
+    """{name: call(i)} for every hot path, with seeded users, titles and queries."""
+    import utils
+
+    catalog, scorer, leaderboard = artifacts.catalog, artifacts.svd_scorer, artifacts.leaderboard
+    rng = random.Random(seed)
+    users = rng.choices(list(catalog.user_code), k=n_calls)
+    titles = rng.choices(list(catalog.knn_row), k=n_calls + 10)
+    queries = [rng.choice(title.split() or ["book"]) for title in rng.choices(list(catalog.titles), k=n_calls)]
+    return {
+        "recommend_book_svd": lambda i: utils.recommend_book_svd(
+            users[i], catalog, scorer, leaderboard, recommendation_table=artifacts.recommendation_table
+        ),
+        "recommend_book_svd_live": lambda i: utils.recommend_book_svd(users[i], catalog, scorer, leaderboard),
+        "recommend_book_hybrid": lambda i: utils.recommend_book_hybrid(
+            users[i], catalog, scorer, leaderboard, artifacts.X_final,
+            recommendation_table=artifacts.recommendation_table,
+        ),
+        "recommend_book_knn": lambda i: utils.recommend_book_knn(catalog, titles[i], artifacts.book_neighbors),
+        "fetch_poster": lambda i: utils.fetch_poster(catalog, titles[i:i + 10]),
+        "search": lambda i: artifacts.search_index.results(queries[i]),
+    }
+
+
+def measure_call(call, n_calls, warmup, memory_calls, rounds=5):
+    """Latency distribution, throughput and peak allocations of call(0..n_calls-1).
+
+    The calls are timed in ``rounds`` passes and each statistic keeps its best
+    round (lowest latency, highest throughput), as timeit does: interference
+    from other processes only ever adds time, so the best round is the stable
+    estimate to compare with the baseline.
+    """
+    import tracemalloc
+
+    for i in range(min(warmup, n_calls)):
+        call(i)
+    per_round = []
+    for _ in range(rounds):
+        latencies = []
+        start = time.perf_counter()
+        for i in range(n_calls):
+            call_start = time.perf_counter()
+            call(i)
+            latencies.append((time.perf_counter() - call_start) * 1e3)
+        wall = time.perf_counter() - start
+        per_round.append({
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "mean_ms": sum(latencies) / len(latencies),
+            "throughput_per_s": n_calls / wall,
+        })
+
+    tracemalloc.start()
+    for i in range(min(memory_calls, n_calls)):
+        call(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = best_run(per_round)
+    return {"calls": n_calls, "rounds": rounds, **stats, "peak_kb": peak / 1024}
+
+
+def best_run(rows):
+    """Best value of each statistic over runs of the same hot path."""
+    best = {key: min(row[key] for row in rows) for key in rows[0]}
+    best["throughput_per_s"] = max(row["throughput_per_s"] for row in rows)
+    return best
+
+
+def child_cold_start():
+    """Run in a fresh process: imports + artifact load, as the Streamlit app does."""
+    start = time.perf_counter()
+    import utils
+
+    imported = time.perf_counter()
+    utils.load_model_and_data()
+    loaded = time.perf_counter()
+    return {
+        "seconds": loaded - start,
+        "import_seconds": imported - start,
+        "load_seconds": loaded - imported,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def child_hot_paths(n_calls, warmup, memory_calls, rounds, seed):
+    """Run in a fresh process: every hot path on the artifacts of the working directory."""
+    import utils
+
+    artifacts = utils.load_model_and_data()
+    calls = hot_path_calls(artifacts, n_calls, seed)
+    return {name: measure_call(calls[name], n_calls, warmup, memory_calls, rounds) for name in HOT_PATHS}
+
+
+def run_child(workdir, *args):
+    """JSON result of ``suite.py --child ...`` run in ``workdir``."""
+    env = dict(os.environ, PYTHONWARNINGS="ignore", RECOMMENDER_REMOTE_COVERS="0")
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", *map(str, args)],
+        cwd=workdir, env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def prepare_scale(args, factor):
+    """Synthetic dataset + trained artifacts of one scale; returns (workdir, dataset stats, train seconds)."""
+    import pandas as pd
+
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    from synthetic import scale_ratings
+
+    workdir = os.path.abspath(os.path.join(args.workdir, f"x{factor}"))
+    data_path = os.path.join(workdir, DATA_FILE)
+    trained = os.path.exists(os.path.join(workdir, "artifacts", "bundles", "LATEST"))
+    if not (args.reuse and trained):
+        books_df = scale_ratings(pd.read_csv(args.data), factor, seed=args.seed)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        books_df.to_csv(data_path, index=False)
+    books_df = pd.read_csv(data_path, usecols=["User-ID", "Book-Title"])
+    stats = {"ratings": len(books_df), "users": int(books_df["User-ID"].nunique()),
+             "titles": int(books_df["Book-Title"].nunique())}
+
+    train_seconds = None
+    if not (args.reuse and trained):
+        print(f"[x{factor}] training on {stats['ratings']} ratings...", flush=True)
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, "train.py"), "--no-cache", "--n-jobs", str(args.n_jobs)],
+            cwd=workdir, check=True, stdout=subprocess.DEVNULL,
+        )
+        train_seconds = time.perf_counter() - start
+    return workdir, stats, train_seconds
+
+
+def run_suite(args):
+    results = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "commit": git_commit(),
+            "calls": args.calls,
+            "rounds": args.rounds,
+            "repeats": args.repeats,
+            "seed": args.seed,
+        },
+        "scales": {},
+    }
+    for factor in args.scales:
+        workdir, stats, train_seconds = prepare_scale(args, factor)
+        cold = [run_child(workdir, "cold-start") for _ in range(args.repeats)]
+        cold_start = {key: min(run[key] for run in cold) for key in cold[0]}
+        print(f"[x{factor}] cold start {cold_start['seconds']:.2f} s "
+              f"(peak RSS {cold_start['peak_rss_mb']:.0f} MB); measuring hot paths...", flush=True)
+        # Chaque processus a sa propre variance (placement mémoire, fréquence CPU) : on garde le meilleur.
+        runs = [
+            run_child(workdir, "hot-paths", args.calls, args.warmup, args.memory_calls, args.rounds, args.seed)
+            for _ in range(args.repeats)
+        ]
+        hot_paths = {name: best_run([run[name] for run in runs]) for name in runs[0]}
+        results["scales"][str(factor)] = {
+            "dataset": stats, "train_seconds": train_seconds, "cold_start": cold_start, "hot_paths": hot_paths,
+        }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    for factor, scale in results["scales"].items():
+        dataset = scale["dataset"]
+        print(f"\nx{factor}: {dataset['ratings']} ratings, {dataset['users']} users, {dataset['titles']} titles; "
+              f"cold start {scale['cold_start']['seconds']:.2f} s, peak RSS {scale['cold_start']['peak_rss_mb']:.0f} MB")
+        print(f"{'hot path':<26}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'calls/s':>10}{'peak KB':>10}")
+        for name, row in scale["hot_paths"].items():
+            print(f"{name:<26}{row['p50_ms']:>9.3f}{row['p95_ms']:>9.3f}{row['p99_ms']:>9.3f}"
+                  f"{row['throughput_per_s']:>10.0f}{row['peak_kb']:>10.1f}")
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of ``results`` against ``baseline``: list of human-readable lines."""
+    regressions = []
+    for factor, scale in results["scales"].items():
+        base_scale = baseline.get("scales", {}).get(factor)
+        if base_scale is None:
+            continue
+        sections = {"cold_start": (scale["cold_start"], base_scale["cold_start"])}
+        for name, row in scale["hot_paths"].items():
+            if name in base_scale["hot_paths"]:
+                sections[name] = (row, base_scale["hot_paths"][name])
+        for section, (current, base) in sections.items():
+            for metric, (direction, floor, scale) in CHECKED_METRICS.items():
+                if metric not in current or metric not in base:
+                    continue
+                value, reference = current[metric], base[metric]
+                worse = (value - reference) * direction
+                if worse > floor and worse > scale * tolerance * reference:
+                    regressions.append(f"x{factor} {section}.{metric}: {reference:.4g} -> {value:.4g} "
+                                       f"({(value / reference - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the serving hot paths at several data scales.")
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10],
+                        help="Multiples of the bundled ratings (e.g. 1 10 100).")
+    parser.add_argument("--data", default=DATA_FILE, help="Dataset scaled by the synthetic generator.")
+    parser.add_argument("--workdir", default="bench_runs", help="Datasets and artifacts of each scale.")
+    parser.add_argument("--reuse", action="store_true", help="Reuse the artifacts already trained in --workdir.")
+    parser.add_argument("--calls", type=int, default=200, help="Timed calls per hot path and round.")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed passes over the calls (best round reported).")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--memory-calls", type=int, default=30, help="Calls traced by tracemalloc per hot path.")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Fresh processes per scale for the cold start and the hot paths (best kept).")
+    parser.add_argument("--n-jobs", type=int, default=1, help="train.py worker processes.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join("bench_runs", "results.json"))
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.35,
+                        help="Relative slack before a metric counts as a regression (tighten on a quiet machine).")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline.")
+    return parser.parse_args()
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        sys.path.insert(0, ROOT)
+        kind, params = sys.argv[2], [int(value) for value in sys.argv[3:]]
+        result = child_cold_start() if kind == "cold-start" else child_hot_paths(*params)
+        print(json.dumps(result))
+        return
+
+    args = parse_args()
+    results = run_suite(args)
+    print_results(results)
+    write_json(args.output, results)
+    print(f"\nResults written to {args.output}.")
+
+    if args.save_baseline:
+        write_json(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}.")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}: run with --save-baseline to record one.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSIONS vs baseline {baseline['meta'].get('commit')} "
+              f"(tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        sys.exit(1)
+    print(f"\nNo regression vs baseline {baseline['meta'].get('commit')} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
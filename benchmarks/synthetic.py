@@ -0,0 +1,74 @@
+""" Synthetic ratings at N times the size of the bundled dataset, with the same columns.
+
+Each extra copy adds new users (``User-ID`` offset per copy) who rate the
+titles of an original user: a share of the titles is swapped for another
+title of the same HDBSCAN cluster and ratings are jittered by +-1. The title
+catalog and its metadata are unchanged, so every schema-dependent stage
+(compact layout, KNN features, search index) runs on realistic inputs.
+
+``python benchmarks/synthetic.py --factor 10 --output bench_runs/x10/data/dataset_final3.csv``
+"""
+
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+SWAP_SHARE = 0.3
+
+
+def scale_ratings(books_df, factor, seed=0, swap_share=SWAP_SHARE):
+    """Long ratings frame ``factor`` times larger than ``books_df`` with the same columns."""
+    if factor <= 1:
+        return books_df.copy()
+    rng = np.random.default_rng(seed)
+    titles = books_df["Book-Title"].to_numpy(dtype=object)
+    metadata = books_df.drop_duplicates(subset=["Book-Title"]).drop(columns=["User-ID", "Book-Rating"])
+    metadata = metadata.set_index("Book-Title")
+
+    # Titres de chaque cluster, pour les substitutions.
+    clusters = metadata["Cluster_hdbscan"].fillna(-1).to_numpy()
+    cluster_titles = {
+        cluster: metadata.index.to_numpy(dtype=object)[clusters == cluster] for cluster in np.unique(clusters)
+    }
+    row_clusters = metadata["Cluster_hdbscan"].fillna(-1).reindex(titles).to_numpy()
+
+    user_ids = pd.to_numeric(books_df["User-ID"], errors="coerce")
+    user_offset = int(user_ids.max()) + 1
+    low, high = books_df["Book-Rating"].min(), books_df["Book-Rating"].max()
+    copies = [books_df]
+    for copy in range(1, int(factor)):
+        swapped = titles.copy()
+        swap = rng.random(len(titles)) < swap_share
+        for cluster, members in cluster_titles.items():
+            rows = np.flatnonzero(swap & (row_clusters == cluster))
+            swapped[rows] = members[rng.integers(0, len(members), len(rows))]
+        ratings = np.clip(books_df["Book-Rating"].to_numpy() + rng.integers(-1, 2, len(titles)), low, high)
+        frame = pd.DataFrame({
+            "User-ID": user_ids.to_numpy() + copy * user_offset,
+            "Book-Title": swapped,
+            "Book-Rating": ratings,
+        })
+        frame = frame.drop_duplicates(subset=["User-ID", "Book-Title"])
+        copies.append(frame.join(metadata, on="Book-Title")[books_df.columns])
+    return pd.concat(copies, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a scaled copy of the ratings dataset.")
+    parser.add_argument("--input", default=os.path.join("data", "dataset_final3.csv"))
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--factor", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    books_df = pd.read_csv(args.input)
+    scaled = scale_ratings(books_df, args.factor, seed=args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    scaled.to_csv(args.output, index=False)
+    print(f"{len(books_df)} -> {len(scaled)} ratings ({scaled['User-ID'].nunique()} users) "
+          f"written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+""" Two-level recommendation result cache: in-process LRU + optional shared SQLite. """
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+CACHE_DB_PATH = os.environ.get("RECOMMENDER_CACHE_DB")
+CACHE_MAX_ENTRIES = int(os.environ.get("RECOMMENDER_CACHE_SIZE", 1024))
+CACHE_TTL = float(os.environ.get("RECOMMENDER_CACHE_TTL", 600))
+
+
+def normalize_key(key):
+    """Plain Python value for a user id / title (numpy scalars -> Python)."""
+    return key.item() if hasattr(key, "item") else key
+
+
+class ResultCache:
+    """Results keyed on (artifact version, kind, user or title, n).
+
+    The memory tier is an LRU bounded by ``max_entries`` with a TTL. When
+    ``db_path`` is given, results are also shared through a SQLite file so
+    several Streamlit/API workers reuse each other's work. Rows are keyed on
+    (key, version), so workers serving different versions during a swap never
+    overwrite each other; opening the cache only purges the versions first
+    seen before its own.
+    """
+
+    def __init__(self, version, max_entries=1024, ttl=600.0, db_path=None, prune_every=256):
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.counters = {
+            "hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0,
+        }
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False)
+            with self._db:
+                self._db.execute("PRAGMA journal_mode=WAL")
+                # Ancien schéma (clé sans la version) : ce n'est qu'un cache, on le recrée.
+                primary_key = [row[1] for row in self._db.execute("PRAGMA table_info(results)") if row[5]]
+                if primary_key == ["key"]:
+                    self._db.execute("DROP TABLE results")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    " key TEXT, version TEXT, value TEXT, expires_at REAL, PRIMARY KEY (key, version))"
+                )
+                # Les versions (horodatages ou empreintes) ne se comparent pas : on date leur première
+                # ouverture, une ligne par version publiée, conservée pour qu'une version ne rajeunisse pas.
+                self._db.execute("CREATE TABLE IF NOT EXISTS versions (version TEXT PRIMARY KEY, first_seen REAL)")
+                self._db.execute("INSERT OR IGNORE INTO versions VALUES (?, ?)", (version, time.time()))
+                self._db.execute(
+                    "DELETE FROM results WHERE version IN (SELECT version FROM versions"
+                    " WHERE first_seen < (SELECT first_seen FROM versions WHERE version = ?))",
+                    (version,),
+                )
+
+    def _key(self, kind, key, n):
+        return json.dumps([kind, normalize_key(key), n], default=str)
+
+    def get(self, kind, key, n):
+        """Cached value, or None on a miss."""
+        cache_key = self._key(kind, key, n)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(cache_key)
+                    self.counters["hits"] += 1
+                    return value
+                del self._entries[cache_key]
+                self.counters["expirations"] += 1
+
+        if self._db is not None:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM results WHERE key = ? AND version = ? AND expires_at > ?",
+                    (cache_key, self.version, time.time()),
+                ).fetchone()
+            if row is not None:
+                value = json.loads(row[0])
+                self._remember(cache_key, value, now + min(self.ttl, row[1] - time.time()))
+                with self._lock:
+                    self.counters["disk_hits"] += 1
+                return value
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def set(self, kind, key, n, value):
+        """Store a JSON-serialisable value in both tiers."""
+        cache_key = self._key(kind, key, n)
+        self._remember(cache_key, value, time.monotonic() + self.ttl)
+        if self._db is not None:
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                    (cache_key, self.version, json.dumps(value), time.time() + self.ttl),
+                )
+                self._writes += 1
+                if self._writes % self.prune_every == 0:
+                    self._db.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+
+    def get_or_compute(self, kind, key, n, compute):
+        """Cached value, or compute() stored then returned."""
+        value = self.get(kind, key, n)
+        if value is None:
+            value = compute()
+            self.set(kind, key, n, value)
+        return value
+
+    def _remember(self, cache_key, value, expires_at):
+        with self._lock:
+            self._entries[cache_key] = (expires_at, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def clear(self):
+        """Drop every entry of both tiers."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM results")
+
+    def stats(self):
+        """Counters plus the current size and hit rate of the cache."""
+        with self._lock:
+            stats = dict(self.counters, size=len(self._entries), version=self.version)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+def cache_from_env(version):
+    """ResultCache configured by the RECOMMENDER_CACHE_* environment variables.
+
+    The shared SQLite tier is enabled by setting ``RECOMMENDER_CACHE_DB``.
+    """
+    return ResultCache(version, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, db_path=CACHE_DB_PATH)
@@ -0,0 +1,168 @@
+""" Precomputed lookup tables over the books DataFrames, built once at load time. """
+
+import numpy as np
+import pandas as pd
+
+# Pas de couverture : placeholder local (images.py).
+DEFAULT_IMAGE = None
+DEFAULT_DESCRIPTION = "Description non disponible"
+
+
+class PrefixIndex:
+    """Values sorted by their case-folded string form, matched by prefix with binary search.
+
+    Lookups cost two ``searchsorted`` calls and only return one page of
+    matches, so pickers never ship the full list to the browser.
+    """
+
+    def __init__(self, values):
+        keys = np.array([str(value).casefold() for value in values], dtype=object)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.values = np.asarray(values, dtype=object)[order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def bounds(self, prefix):
+        """[start, stop) of the sorted keys starting with ``prefix``."""
+        prefix = prefix.strip().casefold()
+        start = int(np.searchsorted(self.keys, prefix, side="left"))
+        stop = int(np.searchsorted(self.keys, prefix + "\U0010ffff", side="left"))
+        return start, stop
+
+    def count(self, prefix):
+        start, stop = self.bounds(prefix)
+        return stop - start
+
+    def search(self, prefix, offset=0, limit=50):
+        """Values of the matches [offset, offset + limit), in key order."""
+        start, stop = self.bounds(prefix)
+        return self.values[min(start + offset, stop):min(start + offset + limit, stop)].tolist()
+
+
+def user_rating_arrays(ratings):
+    """Rating rows grouped by user, as CSR arrays (``catalog_*`` names of the shared bundles).
+
+    ``rating_*``: every row of each user in file order; ``seen_*``: the sorted
+    unique catalog positions each user rated.
+    """
+    n_users = len(ratings.user_ids)
+    user_codes = np.asarray(ratings.user_codes)
+    item_codes = np.asarray(ratings.item_codes)
+    order = np.argsort(user_codes, kind="stable")
+    seen_order = np.lexsort((item_codes, user_codes))
+    users, items = user_codes[seen_order], item_codes[seen_order]
+    first = np.r_[True, (users[1:] != users[:-1]) | (items[1:] != items[:-1])] if len(users) else np.empty(0, bool)
+    return {
+        "catalog_rating_bounds": np.searchsorted(user_codes[order], np.arange(n_users + 1)),
+        "catalog_rating_items": item_codes[order],
+        "catalog_rating_values": np.asarray(ratings.values)[order],
+        "catalog_seen_bounds": np.searchsorted(users[first], np.arange(n_users + 1)),
+        "catalog_seen_items": items[first].astype(np.int32),
+    }
+
+
+class CatalogIndex:
+    """O(1) title, user and model-id lookups replacing full-column scans.
+
+    Built from the compact layout of :mod:`ratings`: catalog positions are the
+    rows of ``books`` and the item codes of ``ratings``, so they line up with
+    :class:`scoring.SVDScorer`.
+
+    ``arrays`` are the ``shared_arrays()`` of an identical index (shared-memory
+    serving): they are used as is, read-only, instead of being recomputed.
+    """
+
+    def __init__(self, books, ratings, books_df_knn, svd_items=None, arrays=None):
+        self.titles = books["Book-Title"].to_numpy(dtype=object)
+        self.title_to_pos = {title: pos for pos, title in enumerate(self.titles)}
+
+        image_urls = books["Image-URL-L"].astype(object)
+        valid_urls = image_urls.notna() & image_urls.astype(str).str.startswith("http")
+        self.image_urls = image_urls.where(valid_urls, DEFAULT_IMAGE).to_numpy(dtype=object)
+        # Clé des miniatures du cache d'images : l'ISBN de la première ligne du titre.
+        cover_keys = books["ISBN"] if "ISBN" in books.columns else books["Book-Title"]
+        self.cover_keys = cover_keys.astype(str).to_numpy(dtype=object)
+        self.descriptions = (
+            books["Description"].astype(object).fillna(DEFAULT_DESCRIPTION).to_numpy(dtype=object)
+        )
+
+        # Titre -> ligne de X_final (premier ISBN du titre).
+        self.knn_titles = books_df_knn["Book-Title"].to_numpy(dtype=object)
+        knn_first = pd.Series(np.arange(len(books_df_knn))).groupby(
+            books_df_knn["Book-Title"].to_numpy(), sort=False
+        ).first()
+        self.knn_row = dict(zip(knn_first.index, knn_first.to_numpy()))
+
+        # Utilisateur -> titres déjà notés et (positions, notes) de ses lignes (mode hybride), en CSR.
+        arrays = arrays or {}
+        if "catalog_rating_bounds" not in arrays:
+            arrays = {**arrays, **user_rating_arrays(ratings)}
+        self.user_code = {user_id: code for code, user_id in enumerate(ratings.user_ids)}
+        self.rating_bounds = arrays["catalog_rating_bounds"]
+        self.rating_items = arrays["catalog_rating_items"]
+        self.rating_values = arrays["catalog_rating_values"]
+        self.seen_bounds = arrays["catalog_seen_bounds"]
+        self.seen_items = arrays["catalog_seen_items"]
+
+        # Recherche par préfixe pour les sélecteurs (connexion, titres).
+        self.title_lookup = PrefixIndex(self.titles)
+        self.user_lookup = PrefixIndex(ratings.user_ids)
+
+        # Titre <-> identifiant interne surprise (-1 si absent du trainset).
+        # svd_items liste les titres du trainset dans l'ordre des ids internes.
+        self.inner_ids = np.full(len(self.titles), -1, dtype=np.int64)
+        self.inner_to_pos = np.empty(0, dtype=np.int64)
+        if "catalog_inner_ids" in arrays:
+            self.inner_ids = arrays["catalog_inner_ids"]
+            self.inner_to_pos = arrays["catalog_inner_to_pos"]
+        elif svd_items is not None:
+            raw2inner = {title: inner_id for inner_id, title in enumerate(svd_items)}
+            self.inner_ids[:] = [raw2inner.get(title, -1) for title in self.titles]
+            self.inner_to_pos = np.full(len(raw2inner), -1, dtype=np.int64)
+            known = self.inner_ids >= 0
+            self.inner_to_pos[self.inner_ids[known]] = np.flatnonzero(known)
+
+    def __contains__(self, title):
+        return title in self.title_to_pos
+
+    def shared_arrays(self):
+        """Arrays derived at load time that serving processes can map instead of rebuilding."""
+        return {
+            "catalog_rating_bounds": self.rating_bounds,
+            "catalog_rating_items": self.rating_items,
+            "catalog_rating_values": self.rating_values,
+            "catalog_seen_bounds": self.seen_bounds,
+            "catalog_seen_items": self.seen_items,
+            "catalog_inner_ids": self.inner_ids,
+            "catalog_inner_to_pos": self.inner_to_pos,
+        }
+
+    def knows_user(self, user_id):
+        """Whether the user has at least one rating in the catalog."""
+        return user_id in self.user_code
+
+    def seen_positions(self, user_id):
+        """Catalog positions of the titles the user already rated (sorted, read-only)."""
+        code = self.user_code.get(user_id)
+        if code is None:
+            return np.empty(0, dtype=np.int32)
+        return self.seen_items[self.seen_bounds[code]:self.seen_bounds[code + 1]]
+
+    def user_ratings(self, user_id):
+        """(catalog positions, ratings) of the user's rated rows; empty when unknown."""
+        code = self.user_code.get(user_id)
+        if code is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+        start, stop = self.rating_bounds[code], self.rating_bounds[code + 1]
+        values = self.rating_values[start:stop].astype(np.float64)
+        rated = ~np.isnan(values)
+        return self.rating_items[start:stop][rated], values[rated]
+
+    def metadata(self, title):
+        """Return the (image URL, description) pair shown for a title."""
+        pos = self.title_to_pos.get(title)
+        if pos is None:
+            return DEFAULT_IMAGE, DEFAULT_DESCRIPTION
+        return self.image_urls[pos], self.descriptions[pos]
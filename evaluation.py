@@ -0,0 +1,323 @@
+""" Offline evaluation: parallel hyperparameter search over rating folds, with ranking metrics. """
+
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from als import ALS_ITERATIONS
+from als import train_als
+from neighbors import build_knn_backend
+from neighbors import compute_neighbor_table
+from neighbors import knn_feature_matrix
+from scoring import SVDScorer
+from scoring import select_top_many
+
+REPORT_FILE = "evaluation.json"
+# Une note de test >= ce seuil rend le livre « pertinent » pour l'utilisateur.
+RELEVANT_RATING = 8
+SEARCH_SPACES = {
+    "svd": {"n_factors": [20, 50, 100], "lr_all": [0.002, 0.005, 0.01], "reg_all": [0.02, 0.05, 0.1]},
+    "als": {"factors": [32, 64], "reg": [0.01, 0.1], "alpha": [10.0, 40.0]},
+    "knn": {"metric": ["manhattan", "euclidean", "cosine"], "author_features": [50, 100, 200],
+            "cluster_weight": [0.0, 1.0], "tag_weight": [0.0, 1.0]},
+}
+# Métrique (moyenne sur les folds) qui désigne les meilleurs paramètres.
+SELECTION_METRIC = "ndcg"
+KNN_NEIGHBORS = 10
+# Taille maximale d'un bloc de scores (utilisateurs x titres) évalué d'un coup.
+SCORE_BLOCK_CELLS = 1 << 24
+
+_worker_state = {}
+
+
+def candidate_params(space, search="grid", n_iter=10, seed=0):
+    """Every combination of a search space, or ``n_iter`` of them drawn at random."""
+    grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    if search == "grid" or n_iter >= len(grid):
+        return grid
+    rng = np.random.default_rng(seed)
+    return [grid[i] for i in sorted(rng.choice(len(grid), n_iter, replace=False))]
+
+
+def encode_ratings(books_df):
+    """(users, items, values, titles): int codes of the ratings, items in catalog order."""
+    titles = books_df["Book-Title"].unique()
+    users = pd.factorize(books_df["User-ID"])[0]
+    items = pd.Index(titles).get_indexer(books_df["Book-Title"])
+    return users, items, books_df["Book-Rating"].to_numpy(dtype=np.float64), titles
+
+
+def assign_folds(n_ratings, n_folds, seed=0):
+    """Random fold id of every rating (each fold holds ~1/n_folds of the ratings)."""
+    return np.random.default_rng(seed).permutation(n_ratings) % n_folds
+
+
+def ranking_metrics(top, relevant, k, n_items):
+    """precision@k, recall@k, NDCG@k and catalog coverage of top-k lists.
+
+    ``top`` holds one row of catalog positions per user (-1 = empty slot) and
+    ``relevant`` the matching rows of a sparse user x item relevance matrix.
+    """
+    filled = top >= 0
+    rows = np.broadcast_to(np.arange(len(top))[:, None], top.shape)
+    hits = np.zeros(top.shape, dtype=bool)
+    hits[filled] = np.asarray(relevant[rows[filled], top[filled]]).ravel() > 0
+
+    n_relevant = np.diff(relevant.indptr)
+    discounts = 1 / np.log2(np.arange(2, k + 2))
+    ideal = np.cumsum(discounts)[np.minimum(n_relevant, k) - 1]
+    return {
+        f"precision@{k}": float(hits.sum(axis=1).mean() / k),
+        f"recall@{k}": float((hits.sum(axis=1) / n_relevant).mean()),
+        f"ndcg@{k}": float((hits @ discounts / ideal).mean()),
+        "coverage": float(len(np.unique(top[filled])) / n_items),
+        "users": int(len(top)),
+    }
+
+
+def top_k_lists(score_block, users, seen, k):
+    """Top-k positions of every user, scored block by block to bound memory.
+
+    ``score_block(users)`` returns the score matrix of a block of users; titles
+    already rated in the training fold are excluded.
+    """
+    block_size = max(1, SCORE_BLOCK_CELLS // seen.shape[1])
+    tops = []
+    for start in range(0, len(users), block_size):
+        block = users[start:start + block_size]
+        scores = score_block(block)
+        block_seen = seen[block]
+        scores[np.repeat(np.arange(len(block)), np.diff(block_seen.indptr)), block_seen.indices] = -np.inf
+        tops.append(select_top_many(scores, k))
+    return np.vstack(tops) if tops else np.empty((0, k), dtype=np.int64)
+
+
+def svd_scores(train, params, rating_scale, seed):
+    """Fit a surprise SVD on the training ratings; return its block scoring function."""
+    from surprise import Dataset
+    from surprise import Reader
+    from surprise import SVD
+
+    users, items, values = train
+    frame = pd.DataFrame({"user": users, "item": items, "rating": values})
+    trainset = Dataset.load_from_df(frame, Reader(rating_scale=rating_scale)).build_full_trainset()
+    svd = SVD(random_state=seed, **params)
+    svd.fit(trainset)
+    scorer = SVDScorer.from_model(svd, np.arange(_worker_state["n_items"]))
+    return scorer, lambda block: scorer.score_many(block)
+
+
+def als_scores(train, params, seed):
+    """Fit the implicit ALS model on the training ratings; return its block scoring function."""
+    users, items, values = train
+    user_item = csr_matrix((values, (users, items)), shape=(_worker_state["n_users"], _worker_state["n_items"]))
+    # Un processus par job : l'ALS d'un job reste sur un thread.
+    user_factors, item_factors = train_als(user_item, iterations=ALS_ITERATIONS, seed=seed, **params)
+    return lambda block: (user_factors[block] @ item_factors.T).astype(np.float64)
+
+
+def knn_scores(train, params, relevant_rating):
+    """Item-based scores: similarity of every title to the user's liked training titles.
+
+    The neighbour table of the book features is folded into a title x title
+    similarity matrix (1 / (1 + distance)); a user's scores sum the rows of the
+    titles they rated >= ``relevant_rating``. Titles with no similar liked
+    title score -inf, i.e. are never recommended.
+    """
+    knn_data, title_pos = _worker_state["knn_data"], _worker_state["knn_title_pos"]
+    n_users, n_items = _worker_state["n_users"], _worker_state["n_items"]
+    params = dict(params)
+    metric = params.pop("metric")
+    X = knn_feature_matrix(knn_data, **params)
+    knn_model = build_knn_backend(X, backend="brute", metric=metric, n_neighbors=KNN_NEIGHBORS + 1)
+    indices, distances = compute_neighbor_table(knn_model, X, n_neighbors=KNN_NEIGHBORS + 1)
+
+    source = np.repeat(title_pos, indices.shape[1])
+    target = title_pos[indices.ravel()]
+    keep = (source >= 0) & (target >= 0) & (source != target)
+    similarity = csr_matrix(
+        (1 / (1 + distances.ravel()[keep]), (source[keep], target[keep])), shape=(n_items, n_items)
+    )
+
+    users, items, values = train
+    liked = values >= relevant_rating
+    liked = csr_matrix((np.ones(liked.sum()), (users[liked], items[liked])), shape=(n_users, n_items))
+
+    def score_block(block):
+        scores = (liked[block] @ similarity).toarray()
+        scores[scores <= 0] = -np.inf
+        return scores
+
+    return score_block
+
+
+def split_fold(fold):
+    """(train, test, seen, relevant, eval_users) of a fold.
+
+    ``train`` / ``test`` are (users, items, values) triples, ``seen`` and
+    ``relevant`` sparse user x item matrices of the training ratings and of the
+    relevant test ratings.
+    """
+    state = _worker_state
+    users, items, values, folds = state["users"], state["items"], state["values"], state["folds"]
+    shape = (state["n_users"], state["n_items"])
+    in_train = folds != fold
+    train = users[in_train], items[in_train], values[in_train]
+    test = users[~in_train], items[~in_train], values[~in_train]
+
+    seen = csr_matrix((np.ones(in_train.sum()), (train[0], train[1])), shape=shape)
+    liked = test[2] >= state["relevant_rating"]
+    relevant = csr_matrix((np.ones(liked.sum()), (test[0][liked], test[1][liked])), shape=shape)
+    # Utilisateurs évaluables : au moins un livre pertinent en test et une note en entraînement.
+    eval_users = np.flatnonzero((np.diff(relevant.indptr) > 0) & (np.diff(seen.indptr) > 0))
+    return train, test, seen, relevant, eval_users
+
+
+def evaluate_job(job):
+    """Metrics of one (model, params, fold) combination."""
+    model, params, fold = job
+    state = _worker_state
+    start = time.perf_counter()
+    train, test, seen, relevant, eval_users = split_fold(fold)
+    k = state["k"]
+
+    metrics = {}
+    fit_start = time.perf_counter()
+    if model == "svd":
+        scorer, score_block = svd_scores(train, params, state["rating_scale"], state["seed"])
+        metrics["fit_seconds"] = time.perf_counter() - fit_start
+        errors = scorer.score_pairs(test[0], test[1]) - test[2]
+        metrics.update(rmse=float(np.sqrt(np.mean(errors ** 2))), mae=float(np.mean(np.abs(errors))))
+    elif model == "als":
+        # Scores de classement, pas des notes : ni RMSE ni MAE.
+        score_block = als_scores(train, params, state["seed"])
+        metrics["fit_seconds"] = time.perf_counter() - fit_start
+    else:
+        score_block = knn_scores(train, params, state["relevant_rating"])
+        metrics["fit_seconds"] = time.perf_counter() - fit_start
+
+    top = top_k_lists(score_block, eval_users, seen, k)
+    metrics.update(ranking_metrics(top, relevant[eval_users], k, state["n_items"]))
+    metrics["seconds"] = time.perf_counter() - start
+    return model, params, fold, metrics
+
+
+def _init_worker(state):
+    """Keep the encoded ratings and the KNN data in each worker process."""
+    _worker_state.clear()
+    _worker_state.update(state)
+
+
+def summarize(model, params, fold_metrics):
+    """Mean and standard deviation of each metric over the folds."""
+    frame = pd.DataFrame(fold_metrics)
+    return {
+        "model": model,
+        "params": params,
+        "mean": frame.mean().to_dict(),
+        "std": frame.std(ddof=0).to_dict(),
+        "folds": len(frame),
+    }
+
+
+def run_search(books_df, books_df_knn, models=("svd", "knn"), search="grid", n_iter=10, n_folds=3, k=10,
+               n_jobs=1, relevant_rating=RELEVANT_RATING, spaces=None, seed=0):
+    """Evaluate every candidate configuration of ``models`` on ``n_folds`` rating folds.
+
+    Each (configuration, fold) pair is an independent job, run across
+    ``n_jobs`` processes. Returns the report written by ``write_report``.
+    """
+    spaces = spaces or SEARCH_SPACES
+    users, items, values, titles = encode_ratings(books_df)
+    state = {
+        "users": users,
+        "items": items,
+        "values": values,
+        "folds": assign_folds(len(values), n_folds, seed),
+        "n_users": int(users.max()) + 1,
+        "n_items": len(titles),
+        "k": k,
+        "relevant_rating": relevant_rating,
+        "rating_scale": (float(values.min()), float(values.max())),
+        "seed": seed,
+        "knn_data": books_df_knn,
+        "knn_title_pos": pd.Index(titles).get_indexer(books_df_knn["Book-Title"]) if books_df_knn is not None else None,
+    }
+    candidates = {
+        model: candidate_params(spaces[model], search, n_iter, seed) for model in models
+    }
+    jobs = [
+        (model, params, fold)
+        for model in models for params in candidates[model] for fold in range(n_folds)
+    ]
+
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count()
+    start = time.perf_counter()
+    if not n_jobs or n_jobs == 1:
+        _init_worker(state)
+        outputs = [evaluate_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(state,)) as executor:
+            outputs = list(executor.map(evaluate_job, jobs))
+
+    grouped = {}
+    for model, params, _, metrics in outputs:
+        grouped.setdefault((model, json.dumps(params, sort_keys=True)), []).append(metrics)
+    results = [
+        summarize(model, json.loads(params), fold_metrics) for (model, params), fold_metrics in grouped.items()
+    ]
+    selection = f"{SELECTION_METRIC}@{k}"
+    best = {
+        model: max((r for r in results if r["model"] == model), key=lambda r: r["mean"][selection])
+        for model in models
+    }
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "search": search,
+        "folds": n_folds,
+        "k": k,
+        "relevant_rating": relevant_rating,
+        "selection_metric": selection,
+        "n_ratings": len(values),
+        "seconds": time.perf_counter() - start,
+        "results": results,
+        "best": {model: {"params": r["params"], "mean": r["mean"]} for model, r in best.items()},
+    }
+
+
+def write_report(artifacts_path, report):
+    """Write the report as JSON next to the artifacts (atomically); return its path."""
+    path = os.path.join(artifacts_path, REPORT_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_report(artifacts_path):
+    """The last evaluation report, or None."""
+    path = os.path.join(artifacts_path, REPORT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def print_report(report):
+    """One line per configuration, best first, for each model."""
+    k = report["k"]
+    columns = ["rmse", "mae", f"precision@{k}", f"recall@{k}", f"ndcg@{k}", "coverage", "fit_seconds"]
+    for model in report["best"]:
+        rows = [r for r in report["results"] if r["model"] == model]
+        rows.sort(key=lambda r: -r["mean"][report["selection_metric"]])
+        table = pd.DataFrame([
+            {"params": json.dumps(r["params"]), **{c: r["mean"][c] for c in columns if c in r["mean"]}} for r in rows
+        ])
+        print(f"\n{model.upper()} ({report['folds']} folds, {rows[0]['mean']['users']:.0f} users per fold):")
+        print(table.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
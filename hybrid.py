@@ -0,0 +1,76 @@
+""" Hybrid re-ranking of SVD candidates: content similarity blending and cluster diversification (MMR). """
+
+import numpy as np
+from neighbors import dense_rows
+
+HYBRID_CANDIDATES = 50
+# Poids du score SVD face à la similarité de contenu dans la pertinence.
+HYBRID_ALPHA = 0.5
+# Compromis MMR : 1 = pertinence seule, 0 = diversité seule.
+MMR_LAMBDA = 0.7
+
+
+def minmax(values):
+    """Values rescaled to [0, 1] (all zeros when constant)."""
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return values
+    span = values.max() - values.min()
+    return (values - values.min()) / span if span > 0 else np.zeros_like(values)
+
+
+def content_scores(X_final, candidate_rows, liked_rows, weights):
+    """Weighted mean cosine similarity of each candidate to the liked books.
+
+    Rows of ``X_final`` (dense or sparse) are L2-normalized, so one
+    (candidates x liked) matrix product gives every cosine. Rows equal to -1
+    (title without KNN features) score 0. Weights summing to 0 (only 0, i.e.
+    implicit, ratings) fall back to a plain mean.
+    """
+    scores = np.zeros(len(candidate_rows))
+    liked = liked_rows >= 0
+    candidates = candidate_rows >= 0
+    if not liked.any() or not candidates.any():
+        return scores
+    X_liked = dense_rows(X_final, liked_rows[liked])
+    X_candidates = dense_rows(X_final, candidate_rows[candidates])
+    weights = np.asarray(weights, dtype=np.float64)[liked]
+    if weights.sum() <= 0:
+        weights = np.ones_like(weights)
+    scores[candidates] = (X_candidates @ X_liked.T) @ weights / weights.sum()
+    return scores
+
+
+def mmr_select(relevance, clusters, n=10, diversity=MMR_LAMBDA):
+    """Greedy maximal marginal relevance over cluster redundancy.
+
+    Each step picks the candidate maximizing ``diversity * relevance -
+    (1 - diversity) * redundancy``, where redundancy is 1 when a title of the
+    same HDBSCAN cluster (noise, -1, excepted) is already selected. Returns the
+    selected candidate indices in order.
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)
+    clusters = np.asarray(clusters)
+    n = min(n, len(relevance))
+    redundancy = np.zeros(len(relevance))
+    available = np.ones(len(relevance), dtype=bool)
+    selected = np.empty(n, dtype=np.int64)
+    for step in range(n):
+        marginal = np.where(available, diversity * relevance - (1 - diversity) * redundancy, -np.inf)
+        best = int(np.argmax(marginal))
+        selected[step] = best
+        available[best] = False
+        if clusters[best] != -1:
+            redundancy[clusters == clusters[best]] = 1.0
+    return selected
+
+
+def rerank(svd_scores, content, clusters, n=10, alpha=HYBRID_ALPHA, diversity=MMR_LAMBDA):
+    """(indices, relevance) of the n re-ranked candidates.
+
+    Relevance blends the min-max normalized SVD and content scores with
+    weight ``alpha``; MMR then diversifies the list across clusters.
+    """
+    relevance = alpha * minmax(svd_scores) + (1 - alpha) * minmax(content)
+    selected = mmr_select(relevance, clusters, n, diversity)
+    return selected, relevance[selected]
@@ -0,0 +1,252 @@
+""" Local cover images: bulk prefetch, downscaled thumbnails and a size-bounded on-disk cache.
+
+Run ``python images.py`` after train.py to fetch the cover of every catalog
+title (keyed by ISBN) into the thumbnail cache; the app then serves covers
+from disk instead of hot-linking the remote ``Image-URL-L``.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+IMAGE_CACHE_DIR = os.environ.get("RECOMMENDER_IMAGE_CACHE", os.path.join("artifacts", "thumbnails"))
+IMAGE_CACHE_MAX_MB = float(os.environ.get("RECOMMENDER_IMAGE_CACHE_MB", 256))
+PLACEHOLDER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images", "placeholder_cover.svg")
+THUMBNAIL_SIZE = (240, 360)
+THUMBNAIL_QUALITY = 80
+# Amazon renvoie un GIF 1x1 (HTTP 200) quand la couverture n'existe pas.
+MIN_IMAGE_SIDE = 10
+MISSING_STATUSES = (403, 404, 410)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+MISSING = "missing"
+
+
+def make_thumbnail(image_bytes, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """JPEG bytes of the image downscaled to fit ``size``; None if it is not a usable cover."""
+    from PIL import Image
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    if min(image.size) < MIN_IMAGE_SIDE:
+        return None
+    image = image.convert("RGB")
+    image.thumbnail(size)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def data_uri(data, mime="image/jpeg"):
+    """Inline ``src`` for an <img> tag."""
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def placeholder_data_uri():
+    """The local placeholder cover, inlined."""
+    with open(PLACEHOLDER_PATH, "rb") as f:
+        return data_uri(f.read(), "image/svg+xml")
+
+
+class ThumbnailCache:
+    """Content-addressed thumbnails (``objects/<sha256>.jpg``) plus a key -> digest index.
+
+    Identical covers are stored once. Reads refresh the file's mtime and
+    ``evict()`` removes the least recently used files until the cache fits in
+    ``max_bytes``. Keys whose cover does not exist are recorded as missing so
+    they are not fetched again.
+    """
+
+    def __init__(self, cache_dir=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_MB * 2**20, evict_every=256):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), timeout=5.0, check_same_thread=False)
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS thumbnails (key TEXT PRIMARY KEY, digest TEXT, fetched_at REAL)"
+            )
+
+    def path(self, digest):
+        return os.path.join(self.cache_dir, "objects", f"{digest}.jpg")
+
+    def status(self, key):
+        """Digest of a key's thumbnail, MISSING, or None when it was never fetched."""
+        with self._lock:
+            row = self._db.execute("SELECT digest FROM thumbnails WHERE key = ?", (str(key),)).fetchone()
+        if row is None:
+            return None
+        return row[0] or MISSING
+
+    def get(self, key):
+        """Thumbnail bytes, MISSING, or None (not fetched, or evicted since)."""
+        digest = self.status(key)
+        if digest is None or digest == MISSING:
+            return digest
+        try:
+            with open(self.path(digest), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM thumbnails WHERE key = ?", (str(key),))
+            return None
+        os.utime(self.path(digest))
+        return data
+
+    def put(self, key, image_bytes):
+        """Store the thumbnail of a downloaded image; return its digest, or MISSING if unusable."""
+        thumbnail = make_thumbnail(image_bytes)
+        if thumbnail is None:
+            self.mark_missing(key)
+            return MISSING
+        digest = hashlib.sha256(thumbnail).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(thumbnail)
+            os.replace(tmp_path, path)
+        self._index(key, digest)
+        return digest
+
+    def mark_missing(self, key):
+        self._index(key, None)
+
+    def _index(self, key, digest):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?)", (str(key), digest, time.time()))
+            self._writes += 1
+            evict = self._writes % self.evict_every == 0
+        if evict:
+            self.evict()
+
+    def files(self):
+        """(mtime, size, path) of every stored thumbnail."""
+        entries = []
+        with os.scandir(os.path.join(self.cache_dir, "objects")) as it:
+            for entry in it:
+                if entry.name.endswith(".jpg"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def total_bytes(self):
+        return sum(size for _, size, _ in self.files())
+
+    def evict(self):
+        """Delete the least recently used thumbnails until the cache fits; return how many."""
+        entries = sorted(self.files())
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed.append(os.path.basename(path)[:-len(".jpg")])
+        if removed:
+            with self._lock, self._db:
+                self._db.executemany("DELETE FROM thumbnails WHERE digest = ?", [(digest,) for digest in removed])
+        return len(removed)
+
+    def stats(self):
+        with self._lock:
+            stored, missing = self._db.execute(
+                "SELECT COUNT(digest), COUNT(*) - COUNT(digest) FROM thumbnails"
+            ).fetchone()
+        return {"keys": stored, "missing": missing, "files": len(self.files()), "bytes": self.total_bytes()}
+
+
+def cover_items(books):
+    """(ISBN, image URL) of every title with a usable remote cover, one per ISBN."""
+    key_column = "ISBN" if "ISBN" in books.columns else "Book-Title"
+    urls = books["Image-URL-L"].astype(object)
+    valid = urls.notna() & urls.astype(str).str.startswith("http")
+    items = books.loc[valid, [key_column]].assign(url=urls[valid]).drop_duplicates(subset=[key_column])
+    return list(zip(items[key_column].astype(str), items["url"]))
+
+
+async def fetch_thumbnail(client, semaphore, cache, key, url, retries=3, backoff=0.5):
+    """Download one cover into the cache; return 'stored', 'missing' or 'failed'."""
+    import httpx
+
+    async with semaphore:
+        for attempt in range(retries):
+            try:
+                response = await client.get(url)
+            except httpx.HTTPError:
+                await asyncio.sleep(backoff * 2 ** attempt)
+                continue
+            if response.status_code == 200:
+                digest = await asyncio.to_thread(cache.put, key, response.content)
+                return "missing" if digest == MISSING else "stored"
+            if response.status_code in MISSING_STATUSES:
+                cache.mark_missing(key)
+                return "missing"
+            if response.status_code in RETRY_STATUSES:
+                await asyncio.sleep(backoff * 2 ** attempt)
+                continue
+            break
+        return "failed"
+
+
+async def prefetch_thumbnails(items, cache, concurrency=16, timeout=10.0, refresh=False, backoff=0.5):
+    """Fetch the covers of (key, url) items not in the cache yet; return a Counter of outcomes."""
+    import httpx
+
+    todo = [(key, url) for key, url in items if refresh or cache.status(key) is None]
+    outcomes = Counter(cached=len(items) - len(todo))
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, follow_redirects=True) as client:
+        results = await asyncio.gather(*(
+            fetch_thumbnail(client, semaphore, cache, key, url, backoff=backoff) for key, url in todo
+        ))
+    outcomes.update(results)
+    cache.evict()
+    return outcomes
+
+
+def main():
+    """Prefetch the covers of the latest artifact bundle."""
+    from artifact_store import ArtifactBundle
+    from artifact_store import load_compact_books
+
+    parser = argparse.ArgumentParser(description="Prefetch cover thumbnails into the local image cache.")
+    parser.add_argument("--artifacts", default="artifacts")
+    parser.add_argument("--cache-dir", default=IMAGE_CACHE_DIR)
+    parser.add_argument("--max-mb", type=float, default=IMAGE_CACHE_MAX_MB)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--refresh", action="store_true", help="Fetch covers already in the cache again.")
+    args = parser.parse_args()
+
+    books, _ = load_compact_books(ArtifactBundle(args.artifacts))
+    items = cover_items(books)
+    cache = ThumbnailCache(args.cache_dir, max_bytes=args.max_mb * 2**20)
+    print(f"Prefetching {len(items)} covers into {args.cache_dir} (concurrency={args.concurrency})...")
+    start = time.perf_counter()
+    outcomes = asyncio.run(prefetch_thumbnails(
+        items, cache, concurrency=args.concurrency, timeout=args.timeout, refresh=args.refresh
+    ))
+    print(f"Done in {time.perf_counter() - start:.1f} s: {dict(outcomes)}; cache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+""" Incremental SVD update: fold new ratings into the latest bundle without a full retrain. """
+
+import numpy as np
+import pandas as pd
+from artifact_store import ArtifactBundle
+from artifact_store import load_compact_books
+from artifact_store import write_bundle
+from leaderboard import compute_title_stats
+from precompute import RecommendationTable
+from ratings import compact_books
+from ratings import expand_books
+from scoring import FOLD_IN_REG
+from scoring import fold_in_factors
+from search import build_search_index
+
+RATING_COLUMNS = ["User-ID", "Book-Title", "Book-Rating"]
+
+
+def load_delta(delta_path):
+    """New ratings (CSV with at least User-ID, Book-Title, Book-Rating)."""
+    delta = pd.read_csv(delta_path)
+    missing = [column for column in RATING_COLUMNS if column not in delta.columns]
+    if missing:
+        raise ValueError(f"Delta file '{delta_path}' lacks the columns {missing}.")
+    return delta.dropna(subset=RATING_COLUMNS).drop_duplicates(subset=RATING_COLUMNS[:2], keep="last")
+
+
+def merge_ratings(books_df, delta):
+    """books_df with the delta applied: re-rated (user, title) pairs are updated in
+    place, so catalog positions do not move, and new pairs are appended.
+
+    Book metadata the delta does not carry is copied from the title's existing rows.
+    """
+    pairs = pd.MultiIndex.from_frame(books_df[RATING_COLUMNS[:2]])
+    delta_pairs = pd.MultiIndex.from_frame(delta[RATING_COLUMNS[:2]])
+    books_df = books_df.copy()
+    books_df["Book-Rating"] = books_df["Book-Rating"].astype(np.float64)
+    replaced = pairs.isin(delta_pairs)
+    books_df.loc[replaced, "Book-Rating"] = delta.set_index(RATING_COLUMNS[:2])["Book-Rating"].reindex(
+        pairs[replaced]
+    ).to_numpy()
+
+    delta = delta[~delta_pairs.isin(pairs)]
+    metadata_columns = [column for column in books_df.columns if column not in delta.columns]
+    if metadata_columns:
+        metadata = books_df.drop_duplicates(subset=["Book-Title"])[["Book-Title"] + metadata_columns]
+        delta = delta.merge(metadata, on="Book-Title", how="left")
+    delta = delta[[column for column in books_df.columns if column in delta.columns]]
+    return pd.concat([books_df, delta], ignore_index=True)
+
+
+def extend_factors(ids, raw_ids, factors, biases, rng, init_std=0.1):
+    """Append rows for ids unseen by the model (random vectors like SVD's init, zero bias)."""
+    known = set(ids)
+    new_ids = [raw_id for raw_id in dict.fromkeys(raw_ids) if raw_id not in known]
+    if new_ids:
+        factors = np.vstack([factors, rng.normal(0, init_std, (len(new_ids), factors.shape[1]))])
+        biases = np.r_[biases, np.zeros(len(new_ids))]
+    return ids + new_ids, new_ids, factors, biases
+
+
+def fold_in_rows(rows, other, ratings, factors, biases, other_factors, other_biases,
+                 global_mean, biased, targets, reg=FOLD_IN_REG):
+    """Solve the factors of every target row against the fixed opposite factors."""
+    order = np.argsort(rows, kind="stable")
+    rows, other, ratings = rows[order], other[order], ratings[order]
+    starts = np.searchsorted(rows, targets, side="left")
+    stops = np.searchsorted(rows, targets, side="right")
+    for target, start, stop in zip(targets, starts, stops):
+        if start == stop:
+            continue
+        bias, vector = fold_in_factors(
+            other_factors[other[start:stop]], other_biases[other[start:stop]],
+            ratings[start:stop], global_mean, reg=reg, biased=biased,
+        )
+        factors[target] = vector
+        biases[target] = bias
+
+
+def predict(users, items, pu, qi, bu, bi, global_mean, biased):
+    dot = np.einsum("ij,ij->i", pu[users], qi[items])
+    return global_mean + bu[users] + bi[items] + dot if biased else dot
+
+
+def sgd_epochs(users, items, ratings, pu, qi, bu, bi, global_mean, n_epochs=3, lr=0.005, reg=0.02,
+               biased=True, batch_size=1024, seed=0):
+    """Warm-started SGD over (user, item, rating) triples, in vectorized mini-batches.
+
+    Same update rule as surprise's SVD; the rows of one batch are updated from
+    the same snapshot of the factors and their steps are summed.
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(n_epochs):
+        order = rng.permutation(len(ratings))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            u, i = users[batch], items[batch]
+            err = ratings[batch] - predict(u, i, pu, qi, bu, bi, global_mean, biased)
+            if biased:
+                np.add.at(bu, u, lr * (err - reg * bu[u]))
+                np.add.at(bi, i, lr * (err - reg * bi[i]))
+            user_step = lr * (err[:, None] * qi[i] - reg * pu[u])
+            item_step = lr * (err[:, None] * pu[u] - reg * qi[i])
+            np.add.at(pu, u, user_step)
+            np.add.at(qi, i, item_step)
+
+
+def rmse(users, items, ratings, pu, qi, bu, bi, global_mean, biased, rating_scale):
+    estimates = np.clip(predict(users, items, pu, qi, bu, bi, global_mean, biased), *rating_scale)
+    return float(np.sqrt(np.mean((ratings - estimates) ** 2)))
+
+
+def update_artifacts(artifacts_path, delta, n_epochs=3, lr=0.005, reg=0.02, seed=0):
+    """Fold a delta of ratings into the latest bundle and publish the result as a new version.
+
+    New users and titles are folded in against the fixed opposite factors, then
+    a few SGD epochs warm-started from the current factors run over every
+    rating of the users touched by the delta. The global mean is kept as is.
+    """
+    bundle = ArtifactBundle(artifacts_path)
+    svd_meta = bundle.meta["svd"]
+    global_mean, biased = svd_meta["global_mean"], svd_meta["biased"]
+    rating_scale = tuple(svd_meta["rating_scale"])
+    rng = np.random.default_rng(seed)
+
+    old_books, old_ratings = load_compact_books(bundle)
+    books_df = merge_ratings(expand_books(old_books, old_ratings), delta)
+    # Toutes les notes des utilisateurs concernés par le delta.
+    touched = books_df[books_df["User-ID"].isin(set(delta["User-ID"]))]
+
+    # Titres hors du trainset (nouveaux ou restés dans le split de test) : ajoutés aussi.
+    user_ids, new_users, pu, bu = extend_factors(
+        bundle.frame("svd_users")["User-ID"].tolist(), delta["User-ID"].tolist(),
+        np.array(bundle.array("svd_pu"), dtype=np.float64), np.array(bundle.array("svd_bu"), dtype=np.float64), rng,
+    )
+    item_ids, new_items, qi, bi = extend_factors(
+        bundle.frame("svd_items")["Book-Title"].tolist(), touched["Book-Title"].tolist(),
+        np.array(bundle.array("svd_qi"), dtype=np.float64), np.array(bundle.array("svd_bi"), dtype=np.float64), rng,
+    )
+    new_titles = set(delta["Book-Title"]) - set(old_books["Book-Title"])
+    print(f"Delta: {len(delta)} ratings, {len(new_users)} new users, {len(new_items)} titles new to the model "
+          f"({len(new_titles)} new to the catalog).")
+
+    users = pd.Index(user_ids).get_indexer(touched["User-ID"])
+    items = pd.Index(item_ids).get_indexer(touched["Book-Title"])
+    ratings = touched["Book-Rating"].to_numpy(dtype=np.float64)
+
+    # Nouveaux titres d'abord (contre les utilisateurs connus), puis nouveaux utilisateurs.
+    new_item_rows = np.arange(len(item_ids) - len(new_items), len(item_ids))
+    new_user_rows = np.arange(len(user_ids) - len(new_users), len(user_ids))
+    old_users = users < len(user_ids) - len(new_users)
+    fold_in_rows(items[old_users], users[old_users], ratings[old_users], qi, bi, pu, bu,
+                 global_mean, biased, new_item_rows)
+    fold_in_rows(users, items, ratings, pu, bu, qi, bi, global_mean, biased, new_user_rows)
+
+    before = rmse(users, items, ratings, pu, qi, bu, bi, global_mean, biased, rating_scale)
+    sgd_epochs(users, items, ratings, pu, qi, bu, bi, global_mean,
+               n_epochs=n_epochs, lr=lr, reg=reg, biased=biased, seed=seed)
+    after = rmse(users, items, ratings, pu, qi, bu, bi, global_mean, biased, rating_scale)
+    print(f"RMSE on the {len(ratings)} ratings of the updated users: {before:.4f} -> {after:.4f}.")
+
+    books, ratings = compact_books(books_df)
+    arrays = {name: bundle.array(name) for name in bundle.manifest["arrays"]}
+    frames = {name: bundle.frame(name) for name in bundle.manifest["frames"] if name != "book_df"}
+    arrays.update(svd_pu=pu, svd_qi=qi, svd_bu=bu, svd_bi=bi, **ratings.arrays())
+    title_stats, min_votes = compute_title_stats(books, ratings)
+    frames.update(
+        books=books,
+        users=pd.DataFrame({"User-ID": ratings.user_ids}),
+        svd_users=pd.DataFrame({"User-ID": user_ids}),
+        svd_items=pd.DataFrame({"Book-Title": item_ids}),
+        title_stats=title_stats,
+    )
+    # Recommandations précalculées : les utilisateurs du delta repassent en scoring live.
+    if "recs_top" in bundle:
+        old_table = RecommendationTable(
+            old_ratings.user_ids, bundle.array("recs_top"), bundle.array("recs_scores"), bundle.array("recs_fresh")
+        )
+        arrays.update(old_table.reindexed(ratings.user_ids, stale=set(delta["User-ID"])).arrays())
+    meta = dict(bundle.meta, leaderboard={"min_votes": min_votes})
+    meta["update"] = {"base_version": bundle.version, "delta_ratings": len(delta), "epochs": n_epochs}
+
+    # Les nouveaux titres doivent apparaître dans la recherche.
+    if new_titles:
+        search_index = build_search_index(books, k1=bundle.meta["search"]["k1"], b=bundle.meta["search"]["b"])
+        arrays.update(
+            search_offsets=search_index.offsets,
+            search_doc_ids=search_index.doc_ids,
+            search_weights=search_index.weights,
+            search_doc_len=search_index.doc_len,
+        )
+        frames.update(search_terms=pd.DataFrame({"term": search_index.terms}), search_docs=search_index.docs)
+
+    return write_bundle(artifacts_path, arrays=arrays, frames=frames, meta=meta)
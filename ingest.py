@@ -0,0 +1,190 @@
+""" Streaming ingestion of a ratings dump: codes and aggregates built chunk by chunk.
+
+The long ratings frame (one row per rating, with every metadata column of the
+book) is never materialized. Each chunk of the CSV (or each Parquet row
+group) is reduced to int32 user / item codes and a compact rating column. It
+also feeds the per-title metadata (first row and aggregates) and the per-ISBN
+aggregates of the KNN stage. The outputs match ``ratings.compact_books`` and
+``train.preprocess_data_for_knn`` on the fully loaded frame.
+"""
+
+import os
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from ratings import RatingsTable
+from ratings import TITLE_AGGREGATES
+from ratings import compact_values
+from ratings import finish_metadata
+
+CHUNK_ROWS = 200_000
+# Colonnes dont le type doit être identique d'un bloc à l'autre (clés des dictionnaires de codes).
+KEY_COLUMNS = ("User-ID", "Book-Title", "ISBN")
+ISBN_FIRST_COLUMNS = ["Book-Title", "Book-Author", "Cluster_hdbscan"]
+
+Ingested = namedtuple("Ingested", ["books", "ratings", "books_knn", "book_titles", "user_item"])
+
+
+def read_chunks(file_path, chunk_rows=CHUNK_ROWS):
+    """DataFrames of at most ``chunk_rows`` rows read from a CSV file or Parquet row groups."""
+    if os.path.splitext(file_path)[1].lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+        return
+    yield from pd.read_csv(file_path, chunksize=chunk_rows)
+
+
+class IncrementalCodes:
+    """Integer codes of values in first-appearance order across chunks, like ``pd.factorize``."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, values):
+        """int32 codes of a chunk's values, new values getting the next codes (-1 for NaN)."""
+        codes, get = self.codes, self.codes.get
+        for value in pd.unique(values):
+            if value not in codes and not pd.isna(value):
+                codes[value] = len(self.values)
+                self.values.append(value)
+        return np.fromiter((get(value, -1) for value in values.tolist()), dtype=np.int32, count=len(values))
+
+
+def grow(array, size, fill=0.0):
+    """``array`` extended with ``fill`` up to ``size`` elements."""
+    if len(array) >= size:
+        return array
+    return np.concatenate([array, np.full(size - len(array), fill, dtype=array.dtype)])
+
+
+class RatingsIngest:
+    """Accumulates the outputs of the chunks of one ratings dump (see :func:`ingest_ratings`)."""
+
+    def __init__(self):
+        self.users = IncrementalCodes()
+        self.titles = IncrementalCodes()
+        self.user_codes, self.item_codes, self.values = [], [], []
+        self.key_dtypes = None
+        self.first_rows = []
+        # Agrégats par titre (position du catalogue) : somme / nombre pour la moyenne, max.
+        self.sums = np.zeros(0)
+        self.counts = np.zeros(0)
+        self.maxima = {}
+        # Agrégats par ISBN : premières valeurs non nulles, somme / nombre des notes, tags.
+        self.isbn_first = None
+        self.isbn_dtypes = {}
+        self.isbn_sum = pd.Series(dtype=np.float64)
+        self.isbn_count = pd.Series(dtype=np.float64)
+        self.isbn_tags = None
+        self.rows = 0
+
+    def add(self, chunk):
+        if self.key_dtypes is None:
+            self.key_dtypes = {column: chunk[column].dtype for column in KEY_COLUMNS if column in chunk.columns}
+        chunk = chunk.astype(self.key_dtypes)
+        self.rows += len(chunk)
+
+        n_titles = len(self.titles)
+        items = self.titles.encode(chunk["Book-Title"])
+        self.user_codes.append(self.users.encode(chunk["User-ID"]))
+        self.item_codes.append(items)
+        self.values.append(chunk["Book-Rating"].to_numpy(dtype=np.float32))
+        # Première ligne de chaque nouveau titre ; l'ordre des lignes est celui des codes.
+        codes, first = np.unique(items, return_index=True)
+        new_rows = np.sort(first[codes >= n_titles])
+        self.first_rows.append(chunk.iloc[new_rows].drop(columns=["User-ID"], errors="ignore"))
+
+        size = len(self.titles)
+        known = items >= 0
+        ratings = chunk["Book-Rating"].to_numpy(dtype=np.float64)
+        rated = known & ~np.isnan(ratings)
+        self.sums = grow(self.sums, size) + np.bincount(items[rated], ratings[rated], minlength=size)
+        self.counts = grow(self.counts, size) + np.bincount(items[rated], minlength=size)
+        for column, how in TITLE_AGGREGATES.items():
+            if how == "max" and column in chunk.columns:
+                maxima = grow(self.maxima.get(column, np.zeros(0)), size, np.nan)
+                np.fmax.at(maxima, items[known], chunk[column].to_numpy(dtype=np.float64)[known])
+                self.maxima[column] = maxima
+
+        if "ISBN" in chunk.columns:
+            self.add_isbn_aggregates(chunk)
+
+    def add_isbn_aggregates(self, chunk):
+        grouped = chunk.groupby("ISBN", sort=False)
+        first = grouped[ISBN_FIRST_COLUMNS].first()
+        for column, dtype in first.dtypes.items():
+            self.isbn_dtypes.setdefault(column, dtype)
+        self.isbn_first = first if self.isbn_first is None else self.isbn_first.combine_first(first)
+        self.isbn_sum = self.isbn_sum.add(grouped["Book-Rating"].sum(), fill_value=0)
+        self.isbn_count = self.isbn_count.add(grouped["Book-Rating"].count(), fill_value=0)
+        tags = chunk[["ISBN", "Final_Tags"]].dropna().drop_duplicates()
+        self.isbn_tags = tags if self.isbn_tags is None else pd.concat([self.isbn_tags, tags]).drop_duplicates()
+
+    def books(self):
+        """Per-title metadata in catalog order, as ``ratings.compact_metadata``."""
+        books = pd.concat(self.first_rows, ignore_index=True)
+        aggregates = {}
+        for column, how in TITLE_AGGREGATES.items():
+            if column not in books.columns:
+                continue
+            if how == "mean":
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    aggregates[column] = self.sums / self.counts
+            else:
+                aggregates[column] = self.maxima[column]
+        return finish_metadata(books, aggregates)
+
+    def ratings(self):
+        return RatingsTable(
+            np.concatenate(self.user_codes),
+            np.concatenate(self.item_codes),
+            compact_values(np.concatenate(self.values)),
+            self.users.values,
+        )
+
+    def books_knn(self):
+        """Per-ISBN rows of the KNN stage, as ``train.preprocess_data_for_knn``."""
+        grouped = self.isbn_first.sort_index()
+        # combine_first passe les entiers en float dès qu'un ISBN manque d'un côté.
+        for column, dtype in self.isbn_dtypes.items():
+            if grouped[column].dtype != dtype and not grouped[column].isna().any():
+                grouped[column] = grouped[column].astype(dtype)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            grouped.insert(2, "Book-Rating", (self.isbn_sum / self.isbn_count).reindex(grouped.index))
+        joined_tags = self.isbn_tags.groupby("ISBN", sort=False)["Final_Tags"].agg(list).str.join(", ")
+        grouped.insert(2, "Final_Tags", joined_tags.reindex(grouped.index, fill_value=""))
+        grouped["Book-Author"] = grouped["Book-Author"].fillna("")
+        return grouped.reset_index()
+
+
+def user_item_matrix(ratings, n_titles):
+    """Sparse users x titles CSR matrix of the ratings (duplicate pairs are summed)."""
+    return csr_matrix(
+        (ratings.values, (ratings.user_codes, ratings.item_codes)), shape=(len(ratings.user_ids), n_titles)
+    )
+
+
+def ingest_ratings(file_path, chunk_rows=CHUNK_ROWS):
+    """Stream a ratings dump into ``Ingested(books, ratings, books_knn, book_titles, user_item)``.
+
+    Memory grows with the number of ratings (9 bytes each), users and titles,
+    not with the size of the rows: descriptions, tags and URLs are only kept
+    once per title.
+    """
+    ingest = RatingsIngest()
+    for chunk in read_chunks(file_path, chunk_rows):
+        ingest.add(chunk)
+        print(f"  {ingest.rows} ratings read ({len(ingest.users)} users, {len(ingest.titles)} titles)...", flush=True)
+    if not ingest.rows:
+        raise ValueError(f"No ratings in '{file_path}'.")
+    books, ratings = ingest.books(), ingest.ratings()
+    book_titles = pd.Index(sorted(books["Book-Title"].dropna()))
+    books_knn = ingest.books_knn() if ingest.isbn_first is not None else None
+    return Ingested(books, ratings, books_knn, book_titles, user_item_matrix(ratings, len(books)))
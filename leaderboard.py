@@ -0,0 +1,102 @@
+""" Precomputed per-title aggregates and leaderboards for the Popular / Top-rated tabs. """
+
+import numpy as np
+import pandas as pd
+
+MIN_VOTES_QUANTILE = 0.75
+
+
+def compute_title_stats(books, ratings, min_votes=None):
+    """Aggregate the ratings per title, in catalog order.
+
+    ``books`` and ``ratings`` are the compact layout of :mod:`ratings`.
+    ``weighted_mean`` is the Bayesian average
+    ``(v * R + m * C) / (v + m)`` with ``v`` the title's vote count, ``R`` its
+    mean, ``C`` the global mean and ``m = min_votes`` (by default the 75th
+    percentile of the vote counts). Returns ``(stats, min_votes)``.
+    """
+    n_titles = len(books)
+    values = ratings.values.astype(np.float64)
+    rated = ~np.isnan(values)
+    items = ratings.item_codes[rated]
+    counts = np.bincount(items, minlength=n_titles)
+    sums = np.bincount(items, weights=values[rated], minlength=n_titles)
+
+    stats = pd.DataFrame({"Book-Title": books["Book-Title"].to_numpy(dtype=object)})
+    stats["count"] = counts.astype(np.int32)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stats["mean"] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan).astype(np.float32)
+
+    # "Rating-Count" (nombre de notes du dataset d'origine) sert de popularité.
+    if "Rating-Count" in books.columns:
+        popularity = pd.Series(books["Rating-Count"].to_numpy())
+    else:
+        popularity = pd.Series(counts)
+    stats["popularity"] = popularity.fillna(0).to_numpy(dtype=np.int64)
+
+    if "Cluster_hdbscan" in books.columns:
+        stats["cluster"] = pd.Series(books["Cluster_hdbscan"].to_numpy()).fillna(-1).to_numpy(dtype=np.int32)
+    else:
+        stats["cluster"] = np.full(n_titles, -1, dtype=np.int32)
+
+    if min_votes is None:
+        min_votes = float(stats["count"].quantile(MIN_VOTES_QUANTILE)) if len(stats) else 0.0
+    global_mean = float(values[rated].mean()) if rated.any() else 0.0
+    votes = stats["count"].to_numpy(dtype=np.float64)
+    stats["weighted_mean"] = (
+        (votes * stats["mean"].fillna(global_mean).to_numpy() + min_votes * global_mean)
+        / np.maximum(votes + min_votes, 1e-12)
+    ).astype(np.float32)
+    return stats, float(min_votes)
+
+
+def ranking(values, ties=None):
+    """Positions sorted by descending value, ties broken by ascending position."""
+    positions = np.arange(len(values))
+    return np.lexsort((positions if ties is None else ties, -np.asarray(values, dtype=np.float64)))
+
+
+class Leaderboard:
+    """Top-N lists over the per-title aggregates, sorted once at load time.
+
+    All lists hold catalog positions, so results are read in O(n) with the
+    catalog metadata.
+    """
+
+    def __init__(self, stats, min_votes, top_n_per_cluster=50):
+        self.stats = stats
+        self.min_votes = min_votes
+        # Cluster HDBSCAN de chaque position (-1 : bruit ou inconnu).
+        self.clusters = stats["cluster"].to_numpy()
+        counts = stats["count"].to_numpy()
+
+        self.by_popularity = ranking(stats["popularity"].to_numpy())
+        self.by_mean = ranking(stats["mean"].fillna(-np.inf).to_numpy())
+        by_weighted = ranking(stats["weighted_mean"].to_numpy())
+        eligible = counts[by_weighted] >= min_votes
+        self.by_weighted_mean = by_weighted[eligible] if eligible.any() else by_weighted
+
+        # Top-N par cluster HDBSCAN : listes concaténées + bornes par cluster.
+        clusters = stats["cluster"].to_numpy()[self.by_weighted_mean]
+        order = np.argsort(clusters, kind="stable")
+        sorted_clusters = clusters[order]
+        self.cluster_ids, starts, sizes = np.unique(sorted_clusters, return_index=True, return_counts=True)
+        self.cluster_top = {
+            int(cluster): self.by_weighted_mean[order[start:start + min(size, top_n_per_cluster)]]
+            for cluster, start, size in zip(self.cluster_ids, starts, sizes)
+        }
+
+    def popular(self, n=10):
+        """Most rated titles."""
+        return self.by_popularity[:n]
+
+    def top_rated(self, n=10, cluster=None):
+        """Best Bayesian-weighted titles, optionally within one HDBSCAN cluster."""
+        if cluster is None:
+            return self.by_weighted_mean[:n]
+        return self.cluster_top.get(int(cluster), np.empty(0, dtype=np.int64))[:n]
+
+    def best_mean(self, n=10):
+        """Titles with the highest raw mean rating, with those means."""
+        top = self.by_mean[:n]
+        return top, self.stats["mean"].to_numpy()[top]
@@ -0,0 +1,255 @@
+""" In-process latency instrumentation: per-stage histograms, opt-in cProfile and Prometheus text export.
+
+Wrap a function with ``@timed("stage")`` or a block with ``with timed("stage"):``.
+Timings land in the module-level ``REGISTRY``; the About tab reads it and
+``prometheus_text()`` / the API ``/metrics`` endpoint export it.
+"""
+
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import ContextDecorator
+import numpy as np
+
+METRICS_FILE = os.environ.get("RECOMMENDER_METRICS_FILE")
+METRICS_EXPORT_INTERVAL = float(os.environ.get("RECOMMENDER_METRICS_INTERVAL", 15))
+# Fraction des requêtes profilées avec cProfile, en plus de celles qui le demandent.
+PROFILE_SAMPLE_RATE = float(os.environ.get("RECOMMENDER_PROFILE_RATE", 0))
+PROFILE_TOP_FUNCTIONS = 25
+# Bornes des buckets Prometheus, en secondes (0.25 ms -> ~65 s).
+BUCKETS = tuple(0.00025 * 2 ** i for i in range(19))
+RECENT_SAMPLES = 1024
+PREFIX = "recommender"
+
+_profile_request = contextvars.ContextVar("profile_request", default=False)
+_active_profiler = contextvars.ContextVar("active_profiler", default=None)
+# Pile des étapes en cours : propre à chaque thread et à chaque tâche asyncio.
+_open_stages = contextvars.ContextVar("open_stages", default=())
+# Un seul profil à la fois (Python >= 3.12 refuse deux profileurs actifs).
+_profiler_lock = threading.Lock()
+
+
+class StageHistogram:
+    """Durations of one stage: cumulative buckets for export plus a window of recent samples."""
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.last = None
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        self.bucket_counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.recent.append(seconds)
+
+
+def percentiles(samples, quantiles=(50, 95, 99)):
+    """Percentiles (seconds) of a window of samples; NaN when it is empty."""
+    if not samples:
+        return [float("nan")] * len(quantiles)
+    return np.percentile(np.asarray(samples, dtype=np.float64), quantiles).tolist()
+
+
+class MetricsRegistry:
+    """Thread-safe stage histograms, cProfile reports and gauge collectors."""
+
+    def __init__(self, max_profiles=20):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.profiles = deque(maxlen=max_profiles)
+        self.collectors = {}
+        self._exported_at = 0.0
+
+    def observe(self, stage, seconds, error=False):
+        with self._lock:
+            histogram = self.stages.setdefault(stage, StageHistogram())
+            histogram.observe(seconds)
+            histogram.errors += bool(error)
+
+    def record_error(self, stage):
+        """Count a failure handled inside a stage (e.g. shown with st.error)."""
+        with self._lock:
+            self.stages.setdefault(stage, StageHistogram()).errors += 1
+
+    def add_profile(self, stage, seconds, report):
+        with self._lock:
+            self.profiles.appendleft({"stage": stage, "seconds": seconds, "at": time.time(), "report": report})
+
+    def register_collector(self, name, collect):
+        """Export the numeric values of ``collect()`` (a dict) as gauges ``<prefix>_<name>_<key>``."""
+        with self._lock:
+            self.collectors[name] = collect
+
+    def summary(self):
+        """One row per stage: count, errors, p50 / p95 / p99 and last duration (ms)."""
+        # Copie sous verrou, calcul des percentiles hors verrou.
+        with self._lock:
+            stages = {stage: (h.count, h.errors, list(h.recent), h.last) for stage, h in self.stages.items()}
+        stages = {
+            stage: (count, errors, percentiles(recent), last) for stage, (count, errors, recent, last) in stages.items()
+        }
+        return [
+            {
+                "stage": stage, "count": count, "errors": errors,
+                "p50_ms": p50 * 1e3, "p95_ms": p95 * 1e3, "p99_ms": p99 * 1e3,
+                "last_ms": last * 1e3 if last is not None else float("nan"),
+            }
+            for stage, (count, errors, (p50, p95, p99), last) in sorted(stages.items())
+        ]
+
+    def collected(self):
+        """{collector: {key: value}} of the numeric gauges."""
+        with self._lock:
+            collectors = dict(self.collectors)
+        values = {}
+        for name, collect in collectors.items():
+            try:
+                values[name] = {
+                    key: float(value) for key, value in collect().items()
+                    if isinstance(value, (int, float)) and not isinstance(value, bool)
+                }
+            except Exception:  # un collecteur défaillant ne doit pas casser l'export
+                values[name] = {}
+        return values
+
+    def prometheus_text(self):
+        """Every metric in the Prometheus text exposition format."""
+        metric = f"{PREFIX}_stage_seconds"
+        lines = [f"# HELP {metric} Duration of each instrumented stage.", f"# TYPE {metric} histogram"]
+        errors = [f"# HELP {PREFIX}_stage_errors_total Failures per stage.",
+                  f"# TYPE {PREFIX}_stage_errors_total counter"]
+        with self._lock:
+            stages = {stage: (list(h.bucket_counts), h.count, h.total, h.errors) for stage, h in self.stages.items()}
+        for stage, (bucket_counts, count, total, n_errors) in sorted(stages.items()):
+            label = escape_label(stage)
+            for bound, cumulative in zip(BUCKETS, np.cumsum(bucket_counts[:-1])):
+                lines.append(f'{metric}_bucket{{stage="{label}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{stage="{label}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{stage="{label}"}} {total:.6f}')
+            lines.append(f'{metric}_count{{stage="{label}"}} {count}')
+            errors.append(f'{PREFIX}_stage_errors_total{{stage="{label}"}} {n_errors}')
+        lines.extend(errors)
+        for name, values in sorted(self.collected().items()):
+            for key, value in sorted(values.items()):
+                gauge = f"{PREFIX}_{name}_{key}"
+                lines.extend([f"# TYPE {gauge} gauge", f"{gauge} {value:g}"])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Atomically write the metrics for a textfile collector."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def export(self, path=METRICS_FILE, interval=METRICS_EXPORT_INTERVAL):
+        """write_prometheus to ``path`` at most once per ``interval`` seconds; no-op without a path."""
+        now = time.monotonic()
+        if not path or now - self._exported_at < interval:
+            return False
+        self._exported_at = now
+        self.write_prometheus(path)
+        return True
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.profiles.clear()
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def start_profiler():
+    """An enabled cProfile.Profile, or None when another request is being profiled."""
+    if not _profiler_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profiler(profiler, top=PROFILE_TOP_FUNCTIONS):
+    """Disable a profiler from start_profiler; return its ``top`` functions by cumulative time, as text."""
+    profiler.disable()
+    _profiler_lock.release()
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(top)
+    return output.getvalue()
+
+
+class timed(ContextDecorator):
+    """Record the duration of a stage (decorator or context manager).
+
+    Exceptions are counted as errors of the stage and re-raised. The
+    outermost stage of a request is run under cProfile when profiling is on
+    for the request (``profile_requests``) or sampled by PROFILE_SAMPLE_RATE;
+    the report is kept in ``registry.profiles``.
+    """
+
+    def __init__(self, stage, registry=None):
+        self.stage = stage
+        self.registry = registry
+
+    def __enter__(self):
+        profiler, token = None, None
+        if _active_profiler.get() is None and (
+            _profile_request.get() or (PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE)
+        ):
+            profiler = start_profiler()
+            token = _active_profiler.set(profiler) if profiler is not None else None
+        _open_stages.set(_open_stages.get() + ((self, time.perf_counter(), profiler, token),))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        stack = _open_stages.get()
+        _, start, profiler, token = stack[-1]
+        _open_stages.set(stack[:-1])
+        seconds = time.perf_counter() - start
+        registry = self.registry or REGISTRY
+        if profiler is not None:
+            _active_profiler.reset(token)
+            registry.add_profile(self.stage, seconds, stop_profiler(profiler))
+        registry.observe(self.stage, seconds, error=exc_type is not None)
+        return False
+
+
+def profile_requests(enabled=True):
+    """Switch cProfile on (or off) for the stages run by the current request / thread."""
+    _profile_request.set(bool(enabled))
+
+
+def profiling_requested():
+    """Whether the current request / thread asked for a cProfile report."""
+    return _profile_request.get()
+
+
+def profiled_call(profile, func, *args):
+    """Run ``func(*args)``, under cProfile when asked (picklable, for pool workers).
+
+    Returns ``(result, report)``, the report being None when not profiled.
+    """
+    profiler = start_profiler() if profile else None
+    if profiler is None:
+        return func(*args), None
+    try:
+        result = func(*args)
+    finally:
+        report = stop_profiler(profiler)
+    return result, report
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,258 @@
+""" Precomputed top-K neighbour table for the content-based KNN model. """
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import sparse
+from ann import IVFIndex
+
+KNN_BACKENDS = ("brute", "kd_tree", "ball_tree", "ivf", "sparse")
+# Métriques calculables à partir des seuls produits scalaires (backend "sparse").
+SPARSE_METRICS = ("cosine", "euclidean")
+# Taille maximale d'un bloc de similarités (requêtes x livres) calculé d'un coup.
+SPARSE_BLOCK_CELLS = 1 << 24
+
+_worker_state = {}
+
+
+def split_tags(text):
+    """Distinct tags of a comma-separated ``Final_Tags`` string."""
+    return list(dict.fromkeys(tag.strip().lower() for tag in text.split(",") if tag.strip()))
+
+
+def knn_feature_matrix(data, author_features=100, cluster_weight=1.0, tag_features=200, tag_weight=1.0,
+                       author_weight=1.0, rating_weight=1.0):
+    """L2-normalized sparse book features (float32 CSR).
+
+    Blocks: author TF-IDF, tag TF-IDF (``Final_Tags``), mean rating and HDBSCAN
+    cluster, each scaled by its weight before the row normalization; a block
+    of weight 0 is left out. ``*_features`` cap the TF-IDF vocabularies. Memory
+    grows with the non-zeros, not with books x vocabulary.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import normalize
+
+    blocks = []
+    if author_weight:
+        tfidf_authors = TfidfVectorizer(stop_words="english", max_features=author_features, dtype=np.float32)
+        blocks.append(author_weight * tfidf_authors.fit_transform(data["Book-Author"].fillna("")))
+    if tag_weight and "Final_Tags" in data.columns:
+        tfidf_tags = TfidfVectorizer(analyzer=split_tags, max_features=tag_features, dtype=np.float32)
+        blocks.append(tag_weight * tfidf_tags.fit_transform(data["Final_Tags"].fillna("")))
+    if rating_weight:
+        blocks.append(sparse.csr_matrix(rating_weight * data[["Book-Rating"]].fillna(data["Book-Rating"]).to_numpy()))
+    if cluster_weight:
+        blocks.append(sparse.csr_matrix(cluster_weight * data[["Cluster_hdbscan"]].to_numpy()))
+
+    X = sparse.hstack(blocks, format="csr", dtype=np.float32)
+    X.eliminate_zeros()
+    X.sort_indices()
+    return normalize(X, norm="l2")
+
+
+def dense_rows(X, rows):
+    """Rows of a dense or sparse feature matrix as a dense float array."""
+    block = X[rows]
+    return block.toarray() if sparse.issparse(block) else np.asarray(block)
+
+
+def feature_arrays(X):
+    """Bundle arrays of the feature matrix: its CSR parts when sparse, else ``X_final``."""
+    if not sparse.issparse(X):
+        return {"X_final": X}
+    X = X.tocsr()
+    return {"X_final_data": X.data, "X_final_indices": X.indices, "X_final_indptr": X.indptr}
+
+
+class SparseNeighbors:
+    """Exact brute-force neighbours over a CSR matrix from sparse dot products.
+
+    Queries are scored in blocks of at most ``block_cells`` similarities, so
+    memory stays bounded whatever the catalog size. Only the metrics derived
+    from dot products (cosine, euclidean) are supported.
+    """
+
+    def __init__(self, X, metric="cosine", block_cells=SPARSE_BLOCK_CELLS):
+        if metric not in SPARSE_METRICS:
+            raise ValueError(f"Unsupported metric for the sparse backend: {metric}, expected {SPARSE_METRICS}.")
+        self.X = sparse.csr_matrix(X)
+        self.metric = metric
+        self.block_cells = block_cells
+        self.squared_norms = np.asarray(self.X.multiply(self.X).sum(axis=1), dtype=np.float64).ravel()
+
+    def distances(self, X_query):
+        """Dense (queries x rows) distance block."""
+        X_query = sparse.csr_matrix(X_query, dtype=self.X.dtype)
+        dots = (X_query @ self.X.T).toarray().astype(np.float64)
+        query_norms = np.asarray(X_query.multiply(X_query).sum(axis=1), dtype=np.float64)
+        if self.metric == "cosine":
+            norms = np.sqrt(query_norms * self.squared_norms)
+            return 1 - dots / np.where(norms > 0, norms, 1)
+        return np.sqrt(np.maximum(query_norms + self.squared_norms - 2 * dots, 0))
+
+    def kneighbors(self, X_query, n_neighbors=10):
+        """Exact (distances, indices) like NearestNeighbors.kneighbors, ties broken by row."""
+        n_rows = self.X.shape[0]
+        n_queries = X_query.shape[0]
+        k = min(n_neighbors, n_rows)
+        distances = np.empty((n_queries, k))
+        indices = np.empty((n_queries, k), dtype=np.int64)
+        step = max(1, self.block_cells // max(n_rows, 1))
+        for start in range(0, n_queries, step):
+            block = self.distances(X_query[start:start + step])
+            top = np.argpartition(block, k - 1, axis=1)[:, :k]
+            top.sort(axis=1)
+            top_distances = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(top_distances, axis=1, kind="stable")
+            distances[start:start + len(block)] = np.take_along_axis(top_distances, order, axis=1)
+            indices[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+        return distances, indices
+
+
+def build_knn_backend(X, backend="brute", metric="manhattan", n_neighbors=10, **ivf_params):
+    """Fit the neighbour search backend selected in train.py.
+
+    ``brute`` is sklearn's exact scan and ``sparse`` the exact
+    :class:`SparseNeighbors` (cosine / euclidean), both run on the sparse
+    matrix. ``kd_tree`` / ``ball_tree`` (exact tree searches, manhattan and
+    euclidean) and ``ivf`` (the approximate :class:`ann.IVFIndex`) need dense
+    rows: a sparse X is densified for them.
+    """
+    if backend == "sparse":
+        return SparseNeighbors(X, metric=metric)
+    if backend not in KNN_BACKENDS:
+        raise ValueError(f"Unknown KNN backend '{backend}', expected one of {KNN_BACKENDS}.")
+    if backend != "brute" and sparse.issparse(X):
+        X = X.toarray()
+    if backend == "ivf":
+        return IVFIndex.build(X, metric=metric, **ivf_params)
+
+    from sklearn.neighbors import NearestNeighbors
+
+    return NearestNeighbors(metric=metric, algorithm=backend, n_neighbors=n_neighbors).fit(X)
+
+
+def query_rows(knn_model, X, start, stop):
+    """Rows [start, stop) of X in the layout the backend accepts (dense unless it searches sparse rows)."""
+    rows = X[start:stop]
+    searches_sparse = isinstance(knn_model, SparseNeighbors) or getattr(knn_model, "algorithm", None) == "brute"
+    return rows.toarray() if sparse.issparse(rows) and not searches_sparse else rows
+
+
+def knn_backend_state(knn_model):
+    """(params, arrays) describing a fitted backend for the artifact bundle."""
+    if isinstance(knn_model, IVFIndex):
+        return {"algorithm": "ivf", "metric": knn_model.metric, "n_probe": knn_model.n_probe}, knn_model.arrays()
+    if isinstance(knn_model, SparseNeighbors):
+        return {"algorithm": "sparse", "metric": knn_model.metric}, {}
+    return {
+        "algorithm": knn_model.algorithm,
+        "metric": knn_model.metric,
+        "n_neighbors": knn_model.n_neighbors,
+    }, {}
+
+
+def restore_knn_backend(params, X, arrays):
+    """Rebuild a backend from its bundle state; sklearn models are refitted on X."""
+    params = dict(params)
+    algorithm = params.pop("algorithm")
+    if algorithm == "ivf":
+        return IVFIndex(
+            X.toarray() if sparse.issparse(X) else X,
+            arrays["ann_centroids"], arrays["ann_list_offsets"], arrays["ann_list_ids"], **params
+        )
+    return build_knn_backend(X, backend=algorithm, **params)
+
+
+def _init_worker(knn_model, X):
+    """Keep the model and the feature matrix in each worker process."""
+    _worker_state["knn_model"] = knn_model
+    _worker_state["X"] = X
+
+
+def _query_chunk(args):
+    """Query the neighbours of rows [start, stop) in a worker process."""
+    start, stop, n_neighbors = args
+    knn_model = _worker_state["knn_model"]
+    distances, indices = knn_model.kneighbors(
+        query_rows(knn_model, _worker_state["X"], start, stop), n_neighbors=n_neighbors
+    )
+    return start, distances, indices
+
+
+def compute_neighbor_table(knn_model, X, n_neighbors=10, chunk_size=1024, n_jobs=1):
+    """Compute every row's top-K neighbours in chunks, optionally across processes.
+
+    Returns ``(indices, distances)`` as int32 / float32 arrays of shape (n_rows, K),
+    ordered like ``knn_model.kneighbors`` (the book itself comes first).
+    """
+    n_rows = X.shape[0]
+    n_neighbors = min(n_neighbors, n_rows)
+    indices = np.empty((n_rows, n_neighbors), dtype=np.int32)
+    distances = np.empty((n_rows, n_neighbors), dtype=np.float32)
+    chunks = [
+        (start, min(start + chunk_size, n_rows), n_neighbors)
+        for start in range(0, n_rows, chunk_size)
+    ]
+
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count()
+
+    def fill(results):
+        for start, chunk_distances, chunk_indices in results:
+            indices[start:start + len(chunk_indices)] = chunk_indices
+            distances[start:start + len(chunk_distances)] = chunk_distances
+
+    if not n_jobs or n_jobs == 1 or len(chunks) == 1:
+        fill(
+            (start, *knn_model.kneighbors(query_rows(knn_model, X, start, stop), n_neighbors=k))
+            for start, stop, k in chunks
+        )
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs, initializer=_init_worker, initargs=(knn_model, X)
+        ) as executor:
+            fill(executor.map(_query_chunk, chunks))
+
+    return indices, distances
+
+
+class BookNeighbors:
+    """Neighbours of a KNN row: a table slice when available, else a live query.
+
+    ``knn_model`` may be None together with ``knn_factory``: the backend is
+    then built by ``knn_factory()`` the first time a live query is needed, so
+    sklearn is only imported on the fallback path.
+    """
+
+    def __init__(self, knn_model, X_final, indices=None, distances=None, knn_factory=None):
+        self.knn_model = knn_model
+        self.knn_factory = knn_factory
+        self.X_final = X_final
+        self.indices = indices
+        self.distances = distances
+
+    def model(self):
+        """The fitted neighbour backend, built on first use if needed."""
+        if self.knn_model is None:
+            self.knn_model = self.knn_factory()
+        return self.knn_model
+
+    def has_table(self, n_neighbors=10):
+        """Whether the precomputed table can answer queries for n_neighbors."""
+        return self.indices is not None and n_neighbors <= self.indices.shape[1]
+
+    def kneighbors(self, row, n_neighbors=10):
+        """Return (distances, indices) of the n_neighbors closest rows to a row."""
+        if self.has_table(n_neighbors):
+            distances, indices = self.distances[row, :n_neighbors], self.indices[row, :n_neighbors]
+        else:
+            knn_model = self.model()
+            distances, indices = knn_model.kneighbors(
+                query_rows(knn_model, self.X_final, row, row + 1), n_neighbors=n_neighbors
+            )
+            distances, indices = distances[0], indices[0]
+
+        # Un index approché peut renvoyer moins de voisins (-1 = case vide).
+        found = indices >= 0
+        return distances[found], indices[found]
@@ -0,0 +1,117 @@
+""" Offline top-N recommendations of every known user, served in O(1). """
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.sparse import csr_matrix
+from scoring import select_top_many
+
+PRECOMPUTED_N = 50
+# Taille maximale d'un bloc de scores (utilisateurs x titres) : borne la mémoire par processus.
+BLOCK_CELLS = 1 << 24
+
+_worker_state = {}
+
+
+class RecommendationTable:
+    """Top-N catalog positions (int32, -1 padded) and scores of every user, keyed by user code.
+
+    Row ``code`` is the ``user_recommendations`` ranking of ``user_ids[code]``
+    when the table was built. Users whose ``fresh`` flag is off rated titles
+    since then (see incremental.update_artifacts); they, unknown users and
+    requests for more than N titles fall back to live scoring.
+    """
+
+    def __init__(self, user_ids, top, scores, fresh=None):
+        self.user_codes = {user_id: code for code, user_id in enumerate(user_ids)}
+        self.top = top
+        self.scores = scores
+        self.fresh = np.ones(len(top), dtype=bool) if fresh is None else fresh
+
+    @property
+    def width(self):
+        return self.top.shape[1]
+
+    def lookup(self, user_id, n=10):
+        """(positions, scores) of the user's n best titles, or None when they must be scored live."""
+        code = self.user_codes.get(user_id)
+        if code is None or n > self.width or not self.fresh[code]:
+            return None
+        top = self.top[code, :n]
+        filled = top >= 0
+        return top[filled].astype(np.int64), self.scores[code, :n][filled].astype(np.float64)
+
+    def reindexed(self, user_ids, stale=()):
+        """Table over a new user list: rows copied by user id, ``stale`` users marked for live scoring."""
+        codes = np.array([self.user_codes.get(user_id, -1) for user_id in user_ids], dtype=np.int64)
+        known = codes >= 0
+        top = np.full((len(codes), self.width), -1, dtype=np.int32)
+        scores = np.full((len(codes), self.width), np.nan, dtype=np.float32)
+        fresh = np.zeros(len(codes), dtype=bool)
+        top[known] = self.top[codes[known]]
+        scores[known] = self.scores[codes[known]]
+        fresh[known] = self.fresh[codes[known]]
+        stale = set(stale)
+        fresh &= np.array([user_id not in stale for user_id in user_ids], dtype=bool)
+        return RecommendationTable(user_ids, top, scores, fresh)
+
+    def arrays(self):
+        """Arrays stored in the artifact bundle."""
+        return {"recs_top": self.top, "recs_scores": self.scores, "recs_fresh": self.fresh}
+
+
+def _init_worker(svd_scorer, seen, user_ids, n):
+    """Keep the scorer and the seen matrix in each worker process."""
+    _worker_state.update(svd_scorer=svd_scorer, seen=seen, user_ids=user_ids, n=n)
+
+
+def _score_block(bounds):
+    """Top-n of users [start, stop): one matrix product, seen titles masked."""
+    start, stop = bounds
+    state = _worker_state
+    scores = state["svd_scorer"].score_many(state["user_ids"][start:stop])
+    seen = state["seen"][start:stop]
+    scores[np.repeat(np.arange(stop - start), np.diff(seen.indptr)), seen.indices] = -np.inf
+    top = select_top_many(scores, state["n"])
+    top_scores = np.take_along_axis(scores, np.maximum(top, 0), axis=1)
+    top_scores[top < 0] = np.nan
+    return start, top.astype(np.int32), top_scores.astype(np.float32)
+
+
+def build_recommendation_table(svd_scorer, ratings, n=PRECOMPUTED_N, n_jobs=1):
+    """Top-n of every user of ``ratings``, scored in blocks of users across ``n_jobs`` processes.
+
+    Blocks hold at most BLOCK_CELLS scores, so the peak memory of a worker does
+    not grow with the number of users.
+    """
+    user_ids = np.asarray(ratings.user_ids, dtype=object)
+    n_titles = len(svd_scorer.titles)
+    seen = csr_matrix(
+        (np.ones(len(ratings), dtype=np.int8), (ratings.user_codes, ratings.item_codes)),
+        shape=(len(user_ids), n_titles),
+    )
+    n = min(n, n_titles)
+    block_size = max(1, BLOCK_CELLS // n_titles)
+    blocks = [(start, min(start + block_size, len(user_ids))) for start in range(0, len(user_ids), block_size)]
+    top = np.empty((len(user_ids), n), dtype=np.int32)
+    scores = np.empty((len(user_ids), n), dtype=np.float32)
+
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count()
+
+    def fill(results):
+        for start, block_top, block_scores in results:
+            top[start:start + len(block_top)] = block_top
+            scores[start:start + len(block_top)] = block_scores
+
+    if not n_jobs or n_jobs == 1 or len(blocks) == 1:
+        _init_worker(svd_scorer, seen, user_ids, n)
+        fill(map(_score_block, blocks))
+        _worker_state.clear()
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs, initializer=_init_worker, initargs=(svd_scorer, seen, user_ids, n)
+        ) as executor:
+            fill(executor.map(_score_block, blocks))
+
+    return RecommendationTable(ratings.user_ids, top, scores)
@@ -0,0 +1,119 @@
+""" Compact ratings layout: int32 user / item codes plus one metadata row per title. """
+
+import numpy as np
+import pandas as pd
+
+# Colonnes agrégées par titre au lieu de la première ligne.
+TITLE_AGGREGATES = {"Book-Rating": "mean", "Rating-Count": "max"}
+# Au-delà de cette part de valeurs distinctes, une colonne texte reste en object.
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+
+class RatingsTable:
+    """One row per rating as int32 user / item codes and int8 (or float32) values.
+
+    Item codes are catalog positions, i.e. ``books_df["Book-Title"].unique()``
+    order; user codes index ``user_ids`` (first-appearance order).
+    """
+
+    def __init__(self, user_codes, item_codes, values, user_ids):
+        self.user_codes = user_codes
+        self.item_codes = item_codes
+        self.values = values
+        self.user_ids = list(user_ids)
+
+    @classmethod
+    def from_frame(cls, books_df, titles):
+        """Encode the User-ID / Book-Title / Book-Rating columns of a ratings frame."""
+        user_codes, user_ids = pd.factorize(books_df["User-ID"])
+        item_codes = pd.Index(titles).get_indexer(books_df["Book-Title"])
+        return cls(
+            user_codes.astype(np.int32),
+            item_codes.astype(np.int32),
+            compact_values(books_df["Book-Rating"].to_numpy()),
+            user_ids.tolist(),
+        )
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        return self.user_codes.nbytes + self.item_codes.nbytes + self.values.nbytes
+
+    def to_frame(self, titles):
+        """Long User-ID / Book-Title / Book-Rating frame (for training and updates)."""
+        return pd.DataFrame({
+            "User-ID": np.asarray(self.user_ids)[self.user_codes],
+            "Book-Title": np.asarray(titles, dtype=object)[self.item_codes],
+            "Book-Rating": self.values,
+        })
+
+    def arrays(self):
+        """Arrays stored in the artifact bundle (memory-mapped when loaded)."""
+        return {
+            "ratings_user": self.user_codes,
+            "ratings_item": self.item_codes,
+            "ratings_value": self.values,
+        }
+
+
+def compact_values(values):
+    """int8 ratings when they are whole numbers in range, float32 otherwise."""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.number) and len(values):
+        finite = np.isfinite(values).all()
+        if finite and np.array_equal(values, np.round(values)) and values.min() >= -128 and values.max() <= 127:
+            return values.astype(np.int8)
+    return values.astype(np.float32)
+
+
+def compact_metadata(books_df):
+    """One metadata row per title, in catalog order.
+
+    Columns come from the first row of each title, except ``Book-Rating`` (mean
+    of the title's ratings) and ``Rating-Count`` (max). Repetitive text columns
+    become categoricals; the per-rating ``User-ID`` column is dropped.
+    """
+    books = books_df.drop_duplicates(subset=["Book-Title"]).drop(columns=["User-ID"], errors="ignore")
+    grouped = books_df.groupby("Book-Title", sort=False)
+    aggregates = {
+        column: grouped[column].agg(how).reindex(books["Book-Title"]).to_numpy()
+        for column, how in TITLE_AGGREGATES.items() if column in books.columns
+    }
+    return finish_metadata(books, aggregates)
+
+
+def finish_metadata(books, aggregates):
+    """Compact the first row of each title given its TITLE_AGGREGATES values (catalog order)."""
+    books = books.reset_index(drop=True)
+    for column, aggregate in aggregates.items():
+        aggregate = np.asarray(aggregate, dtype=np.float32)
+        whole = TITLE_AGGREGATES[column] == "max" and np.isfinite(aggregate).all()
+        books[column] = aggregate.astype(np.int32) if whole else aggregate
+
+    for column in books.columns:
+        text = pd.api.types.is_object_dtype(books[column]) or pd.api.types.is_string_dtype(books[column])
+        if column == "Book-Title" or not text:
+            continue
+        if books[column].nunique() <= CATEGORY_MAX_UNIQUE_RATIO * len(books):
+            books[column] = books[column].astype("category")
+    return books
+
+
+def compact_books(books_df):
+    """(books, ratings): the per-title metadata and the encoded ratings of a long frame."""
+    books = compact_metadata(books_df)
+    return books, RatingsTable.from_frame(books_df, books["Book-Title"])
+
+
+def expand_books(books, ratings):
+    """Long frame in the legacy layout: one row per rating with its title's metadata."""
+    frame = ratings.to_frame(books["Book-Title"])
+    metadata = books.drop(columns=["Book-Rating"], errors="ignore")
+    return frame.merge(metadata, on="Book-Title", how="left")
+
+
+def frame_memory_mb(frame):
+    """Deep memory usage of a DataFrame in MB."""
+    return frame.memory_usage(deep=True).sum() / 2**20
@@ -0,0 +1,111 @@
+""" Streamlit-free recommendation entry points shared by the app and the HTTP API. """
+
+import numpy as np
+from hybrid import HYBRID_ALPHA, HYBRID_CANDIDATES, MMR_LAMBDA, content_scores, rerank
+from scoring import select_top
+
+
+def similar_books(book_name, catalog, book_neighbors, n_neighbors=10):
+    """Titles closest to a book in the KNN feature space, the book itself excluded.
+
+    Raises KeyError when the title is not in the KNN catalog.
+    """
+    book_idx = catalog.knn_row.get(book_name)
+    if book_idx is None:
+        raise KeyError(book_name)
+
+    _, suggestions = book_neighbors.kneighbors(book_idx, n_neighbors=n_neighbors)
+    return [book for book in catalog.knn_titles[suggestions].tolist() if book != book_name]
+
+
+def user_recommendations(user_id, catalog, svd_scorer, leaderboard, n_recommendations=10,
+                         recommendation_table=None):
+    """Return (titles, scores, personalized) for a user.
+
+    Users without ratings, or without factors in an unbiased model such as
+    ALS, get the best mean-rated titles (personalized=False).
+    Rows of ``recommendation_table`` (precompute.py) are served as is; users
+    missing from it are scored live.
+    """
+    if not catalog.knows_user(user_id) or not svd_scorer.knows_user(user_id):
+        top, mean_ratings = leaderboard.best_mean(n_recommendations)
+        return catalog.titles[top].tolist(), mean_ratings.tolist(), False
+
+    precomputed = recommendation_table.lookup(user_id, n_recommendations) if recommendation_table else None
+    if precomputed is not None:
+        top, scores = precomputed
+    else:
+        top, scores = svd_scorer.top_n(user_id, catalog.seen_positions(user_id), n_recommendations)
+    return svd_scorer.titles[top].tolist(), scores.tolist(), True
+
+
+def batch_user_recommendations(user_ids, catalog, svd_scorer, leaderboard, n_recommendations=10,
+                               recommendation_table=None):
+    """user_recommendations for many users; those scored live share one matrix product."""
+    results = {}
+    live = []
+    for user_id in dict.fromkeys(user_ids):
+        precomputed = recommendation_table.lookup(user_id, n_recommendations) if recommendation_table else None
+        if precomputed is not None:
+            top, scores = precomputed
+            results[user_id] = (svd_scorer.titles[top].tolist(), scores.tolist(), True)
+        elif catalog.knows_user(user_id) and svd_scorer.knows_user(user_id):
+            live.append(user_id)
+        else:
+            results[user_id] = user_recommendations(user_id, catalog, svd_scorer, leaderboard, n_recommendations)
+
+    for user_id, user_scores in zip(live, svd_scorer.score_many(live) if live else []):
+        top, scores = select_top(user_scores, catalog.seen_positions(user_id), n_recommendations)
+        results[user_id] = (svd_scorer.titles[top].tolist(), scores.tolist(), True)
+    return {user_id: results[user_id] for user_id in user_ids}
+
+
+def hybrid_recommendations(user_id, catalog, svd_scorer, leaderboard, X_final, n_recommendations=10,
+                           recommendation_table=None, n_candidates=HYBRID_CANDIDATES,
+                           alpha=HYBRID_ALPHA, diversity=MMR_LAMBDA):
+    """user_recommendations re-ranked by content and diversified across clusters.
+
+    The user's top ``n_candidates`` SVD titles are scored by their similarity
+    in ``X_final`` to the titles the user rated at or above their own mean,
+    blended with the SVD score, then picked by MMR over the HDBSCAN clusters.
+    Returns (titles, blended relevance, personalized).
+    """
+    if not catalog.knows_user(user_id):
+        return user_recommendations(user_id, catalog, svd_scorer, leaderboard, n_recommendations)
+
+    n_candidates = max(n_candidates, n_recommendations)
+    precomputed = recommendation_table.lookup(user_id, n_candidates) if recommendation_table else None
+    if precomputed is not None:
+        top, svd_scores = precomputed
+    else:
+        top, svd_scores = svd_scorer.top_n(user_id, catalog.seen_positions(user_id), n_candidates)
+
+    positions, ratings = catalog.user_ratings(user_id)
+    liked = ratings >= ratings.mean() if len(ratings) else np.zeros(0, dtype=bool)
+    knn_rows = np.array([catalog.knn_row.get(title, -1) for title in catalog.titles[top]], dtype=np.int64)
+    liked_rows = np.array(
+        [catalog.knn_row.get(title, -1) for title in catalog.titles[positions[liked]]], dtype=np.int64
+    )
+    content = content_scores(X_final, knn_rows, liked_rows, ratings[liked])
+
+    selected, relevance = rerank(
+        svd_scores, content, leaderboard.clusters[top], n_recommendations, alpha, diversity
+    )
+    return svd_scorer.titles[top[selected]].tolist(), relevance.tolist(), True
+
+
+def session_recommendations(ratings, catalog, svd_scorer, leaderboard, n_recommendations=10, user_id=None):
+    """user_recommendations with in-session {title: rating} folded into the SVD.
+
+    The user's latent vector is solved at request time against the item
+    factors, so guests and new users get personalized results without a
+    retrain. Rated titles are excluded; without any usable rating this is
+    plain user_recommendations.
+    """
+    factors = svd_scorer.fold_in(ratings, user_id=user_id)
+    if factors is None:
+        return user_recommendations(user_id, catalog, svd_scorer, leaderboard, n_recommendations)
+
+    exclude = np.union1d(catalog.seen_positions(user_id), svd_scorer.positions(ratings))
+    top, scores = select_top(svd_scorer.score_factors(*factors), exclude, n_recommendations)
+    return svd_scorer.titles[top].tolist(), scores.tolist(), True
@@ -1,87 +1,153 @@
-""" Scrape Open Library for book descriptions and themes using concurrent requests. """
-
+""" Scrape Open Library for book descriptions and themes with asyncio.
+
+Requests go through a token bucket (shared by every worker and paused on 429
+Retry-After), results are appended to a JSONL cache as soon as they arrive so an
+interrupted run resumes where it stopped, and the dataset is enriched with one
+final merge.
+"""
+
+import argparse
+import asyncio
+import email.utils
+import json
+import os
 import pickle
-import time
 import random
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import requests
+import time
+import httpx
 import pandas as pd
 from bs4 import BeautifulSoup
 
-
-# Load cached ISBN descriptions
-def load_cache():
-    """Load the cache from disk."""
+BASE_URL = "https://openlibrary.org"
+CACHE_PATH = "isbn_cache.jsonl"
+LEGACY_CACHE_PATH = "isbn_cache2.pkl"
+NOT_FOUND = ("No description available", "No themes available")
+FAILED_DESCRIPTION = "Error: Failed after multiple retries"
+NO_THEMES = "No themes available"
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average, with bursts up to `capacity`.
+
+    pause() empties the bucket until a deadline: a 429 Retry-After then slows
+    down every worker, not only the one that was throttled.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Block every request for `seconds` and restart from an empty bucket."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+
+def parse_retry_after(value, default=10.0):
+    """Seconds to wait from a Retry-After header (delay in seconds or HTTP date)."""
+    if not value:
+        return default
     try:
-        with open("isbn_cache2.pkl", "rb") as f:
-            return pickle.load(f)
-    except FileNotFoundError:
-        return {}
-
-
-# Save cache after each request
-def save_cache(cache):
-    """Save the cache to disk after each request."""
-    with open("isbn_cache2.pkl", "wb") as f:
-        pickle.dump(cache, f)
-
-
-# Initialize cache
-isbn_cache = load_cache()
-
-# Create a persistent session
-session = requests.Session()
-session.headers.update({"User-Agent": "Mozilla/5.0"})
-
-
-# Retry function with exponential backoff
-def retry_with_backoff(func, max_retries=5):
-    """Retry function with exponential backoff in case of network failures."""
-    for attempt in range(max_retries):
-        try:
-            return func()  # Call the target function
-        except requests.exceptions.RequestException as e:
-            wait_time = 2**attempt + random.uniform(0, 2)  # Exponential backoff
-            print(
-                f"⚠️ Retry {attempt+1}/{max_retries} after {wait_time:.2f}s due to error: {e}"
-            )
-            time.sleep(wait_time)
-    return None  # Failure after all retries
-
-
-# Scraping function
-def scrape_openlibrary_details(isbn):
-    """Scrape Open Library for book descriptions and themes with retries."""
-    if isbn in isbn_cache:
-        return isbn, isbn_cache[isbn]
-
-    url = f"https://openlibrary.org/isbn/{isbn}"
-
-    def request_func():
-        return session.get(url, timeout=20)
-
-    response = retry_with_backoff(request_func)
-
-    if response is None:
-        return isbn, "Error: Failed after multiple retries", "No themes available"
-
-    if response.status_code == 404:  # Handle 404 errors properly
-        print(f"⚠️ ISBN {isbn} not found on Open Library (404). Skipping.")
-        return isbn, "No description available", "No themes available"
-
-    if response.status_code == 429:
-        wait_time = random.uniform(5, 15)
-        print(
-            f"🚨 429 Too Many Requests for ISBN {isbn}. Retrying in {wait_time:.2f} seconds..."
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+def read_cache(path=CACHE_PATH):
+    """{isbn: (description, themes)} from a JSONL cache; a truncated line is skipped."""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["isbn"]] = (entry["description"], entry["themes"])
+    return entries
+
+
+class ScrapeCache:
+    """Append-only JSONL cache of scraped ISBNs, doubling as the resume checkpoint.
+
+    Each result is written and flushed on its own line, so saving is O(1) per
+    ISBN instead of re-pickling the whole cache.
+    """
+
+    def __init__(self, path=CACHE_PATH, legacy_path=None):
+        self.path = path
+        self.entries = read_cache(path)
+        needs_newline = os.path.exists(path) and os.path.getsize(path) > 0 and not self._ends_with_newline()
+        self._file = open(path, "a", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")
+
+        # Reprise d'un ancien cache pickle (isbn_cache2.pkl) lors du premier lancement.
+        if not self.entries and legacy_path and os.path.exists(legacy_path):
+            with open(legacy_path, "rb") as f:
+                legacy = pickle.load(f)
+            for isbn, data in legacy.items():
+                description, themes = data if isinstance(data, tuple) else (data, NO_THEMES)
+                self.add(isbn, description, themes)
+            print(f"Imported {len(legacy)} ISBNs from '{legacy_path}'.")
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def __contains__(self, isbn):
+        return isbn in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, isbn, description, themes):
+        """Record one ISBN and flush it to disk."""
+        self.entries[isbn] = (description, themes)
+        self._file.write(json.dumps({"isbn": isbn, "description": description, "themes": themes}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def frame(self):
+        """Cached details as an ISBN / Description / Tags DataFrame."""
+        return pd.DataFrame(
+            [(isbn, description, themes) for isbn, (description, themes) in self.entries.items()],
+            columns=["ISBN", "Description", "Tags"],
         )
-        time.sleep(wait_time)
-        return scrape_openlibrary_details(isbn)
 
-    response.raise_for_status()
 
-    soup = BeautifulSoup(response.text, "html.parser")
+def parse_details(html):
+    """Extract (description, themes) from an Open Library book page."""
+    soup = BeautifulSoup(html, "html.parser")
 
-    # Extract book description
     description_div = soup.find("div", class_="read-more__content")
     description = (
         description_div.get_text(strip=True, separator=" ")
@@ -89,58 +155,150 @@ def scrape_openlibrary_details(isbn):
         else "No description found"
     )
 
-    # Extract book themes
     themes_div = soup.find("div", class_="section link-box")
     themes = (
         ", ".join([a.get_text(strip=True) for a in themes_div.find_all("a")])
         if themes_div
-        else "No themes available"
+        else NO_THEMES
     )
+    return description, themes
 
-    time.sleep(random.uniform(1, 3))  # Anti-bot delay
 
-    isbn_cache[isbn] = (description, themes)
-    save_cache(isbn_cache)
-    return isbn, description, themes
-
-
-# Load dataset
-try:
-    df_books = pd.read_csv("../data/dataset.csv")
-except FileNotFoundError:
-    print("❌ Error: 'dataset.csv' not found.")
-    exit()
+async def fetch_details(client, isbn, limiter, max_retries=8, backoff=1.0):
+    """(description, themes) of an ISBN, or None once every retry failed."""
+    for attempt in range(max_retries):
+        await limiter.acquire()
+        try:
+            response = await client.get(f"/isbn/{isbn}")
+        except httpx.HTTPError as e:
+            wait_time = backoff * (2**attempt + random.uniform(0, 2))
+            print(f"⚠️ Retry {attempt+1}/{max_retries} for ISBN {isbn} after {wait_time:.2f}s due to error: {e!r}")
+            await asyncio.sleep(wait_time)
+            continue
+
+        if response.status_code == 404:
+            print(f"⚠️ ISBN {isbn} not found on Open Library (404). Skipping.")
+            return NOT_FOUND
+        if response.status_code == 429:
+            wait_time = parse_retry_after(response.headers.get("Retry-After"))
+            print(f"🚨 429 Too Many Requests for ISBN {isbn}. Pausing all requests for {wait_time:.2f} seconds...")
+            limiter.pause(wait_time)
+            continue
+        if response.status_code >= 500:
+            wait_time = backoff * (2**attempt + random.uniform(0, 2))
+            print(f"⚠️ Retry {attempt+1}/{max_retries} for ISBN {isbn} after {wait_time:.2f}s (HTTP {response.status_code})")
+            await asyncio.sleep(wait_time)
+            continue
+        if response.status_code != 200:
+            print(f"❌ ISBN {isbn}: unexpected HTTP {response.status_code}.")
+            return None
+        return parse_details(response.text)
+    return None
+
+
+async def worker(queue, client, limiter, cache, stats, max_retries, backoff):
+    """Scrape ISBNs from the queue until it is cancelled."""
+    while True:
+        isbn = await queue.get()
+        try:
+            details = await fetch_details(client, isbn, limiter, max_retries, backoff)
+            if details is None:
+                stats["failed"] += 1
+                print(f"❌ Error processing ISBN: {isbn}")
+            else:
+                cache.add(isbn, *details)
+                stats["scraped"] += 1
+                print(f"✅ {isbn} → {details[0][:80]} | Tags: {details[1][:80]}")
+        except Exception as e:
+            stats["failed"] += 1
+            print(f"❌ Error processing ISBN: {isbn} - {e!r}")
+        finally:
+            queue.task_done()
+
+
+async def scrape_isbns(isbns, cache, base_url=BASE_URL, concurrency=8, rate=2.0,
+                       max_retries=8, backoff=1.0, timeout=20.0):
+    """Scrape every ISBN missing from the cache; return scraped/failed counters."""
+    pending = [isbn for isbn in dict.fromkeys(isbns) if isbn not in cache]
+    print(f"{len(cache)} ISBNs already scrapped, {len(pending)} left.")
+    stats = {"scraped": 0, "failed": 0}
+    if not pending:
+        return stats
+
+    queue = asyncio.Queue()
+    for isbn in pending:
+        queue.put_nowait(isbn)
+    limiter = TokenBucket(rate)
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"User-Agent": "Mozilla/5.0"},
+        timeout=timeout,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=concurrency),
+    ) as client:
+        workers = [
+            asyncio.create_task(worker(queue, client, limiter, cache, stats, max_retries, backoff))
+            for _ in range(min(concurrency, len(pending)))
+        ]
+        await queue.join()
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    return stats
+
+
+def merge_details(df_books, details):
+    """Attach Description / Tags to every row of the dataset with a single merge."""
+    merged = df_books.assign(_isbn=df_books["ISBN"].astype(str).str.strip()).merge(
+        details.rename(columns={"ISBN": "_isbn"}), on="_isbn", how="left"
+    )
+    merged["Description"] = merged["Description"].fillna(FAILED_DESCRIPTION)
+    merged["Tags"] = merged["Tags"].fillna(NO_THEMES)
+    return merged.drop(columns="_isbn")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Enrich the dataset with Open Library details.")
+    parser.add_argument("--input", default="../data/dataset.csv")
+    parser.add_argument("--output", default="dataset_with_details.csv")
+    parser.add_argument("--cache", default=CACHE_PATH, help="Append-only JSONL cache (resume point).")
+    parser.add_argument("--legacy-cache", default=LEGACY_CACHE_PATH,
+                        help="Pickle cache of the previous scraper, imported once.")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at most.")
+    parser.add_argument("--rate", type=float, default=2.0, help="Requests per second on average.")
+    parser.add_argument("--max-retries", type=int, default=8)
+    return parser.parse_args()
+
+
+def main(args):
+    try:
+        df_books = pd.read_csv(args.input)
+    except FileNotFoundError:
+        print(f"❌ Error: '{args.input}' not found.")
+        return
 
-if "ISBN" not in df_books.columns:
-    print("❌ Error: 'ISBN' column missing in CSV file.")
-    exit()
+    if "ISBN" not in df_books.columns:
+        print("❌ Error: 'ISBN' column missing in CSV file.")
+        return
 
-df_books.dropna(subset=["ISBN"], inplace=True)
-df_unique_isbn = df_books.drop_duplicates(subset="ISBN").copy()
+    df_books.dropna(subset=["ISBN"], inplace=True)
+    isbns = df_books["ISBN"].astype(str).str.strip().unique().tolist()
 
-# Scraping with multithreading
-num_threads = min(4, len(df_unique_isbn))  # Reduce number of threads to avoid bans
-with ThreadPoolExecutor(max_workers=num_threads) as executor:
-    future_to_isbn = {
-        executor.submit(scrape_openlibrary_details, str(isbn).strip()): isbn
-        for isbn in df_unique_isbn["ISBN"]
-    }
+    cache = ScrapeCache(args.cache, legacy_path=args.legacy_cache)
+    try:
+        stats = asyncio.run(scrape_isbns(
+            isbns, cache, base_url=args.base_url, concurrency=args.concurrency,
+            rate=args.rate, max_retries=args.max_retries,
+        ))
+    finally:
+        cache.close()
+    print(f"Scraped {stats['scraped']} ISBNs, {stats['failed']} failed (re-run to retry them).")
 
-    for future in as_completed(future_to_isbn):
-        try:
-            isbn, description, tags = future.result()
-            df_unique_isbn.loc[df_unique_isbn["ISBN"] == isbn, "Description"] = (
-                description
-            )
-            df_unique_isbn.loc[df_unique_isbn["ISBN"] == isbn, "Tags"] = tags
-            print(f"✅ {isbn} → {description} | Tags: {tags}")
-        except Exception as e:
-            print(f"❌ Error processing ISBN: {future_to_isbn[future]} - {e}")
+    merge_details(df_books, cache.frame()).to_csv(args.output, index=False)
+    print(f"✅ Scraping completed! Results saved in '{args.output}'")
 
-# Merge results and save
 
-df_books = df_books.merge(
-    df_unique_isbn[["ISBN", "Description", "Tags"]], on="ISBN", how="left"
-)
-df_books.to_csv("dataset_with_details.csv", index=False)
-print("✅ Scraping completed! Results saved in 'dataset_with_details.csv'")
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,115 @@
+""" Test script: run the scraper against a local stub of Open Library, never the live site.
+
+The stub answers 404 for some ISBNs, 429 + Retry-After and 500 once for others,
+and counts requests so the checks cover rate limiting, retries, resume and merge.
+"""
+
+import asyncio
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+from scrapper import ScrapeCache, merge_details, read_cache, scrape_isbns
+
+ISBNS = [f"{i:010d}" for i in range(40)]
+MISSING = {ISBNS[3], ISBNS[17]}
+THROTTLED = {ISBNS[5]}
+FLAKY = {ISBNS[8], ISBNS[21]}
+PAGE = """<html><body>
+<div class="read-more__content"><p>Description of {isbn}</p></div>
+<div class="section link-box"><a>Fiction</a><a>Theme {isbn}</a></div>
+</body></html>"""
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    hits = Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        match = re.fullmatch(r"/isbn/(\w+)", self.path)
+        isbn = match.group(1) if match else None
+        with self.lock:
+            self.hits[isbn] += 1
+            first_hit = self.hits[isbn] == 1
+
+        if isbn is None or isbn in MISSING:
+            self.send_response(404)
+            self.end_headers()
+        elif isbn in THROTTLED and first_hit:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.end_headers()
+        elif isbn in FLAKY and first_hit:
+            self.send_response(500)
+            self.end_headers()
+        else:
+            body = PAGE.format(isbn=isbn).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(isbns, cache_path, base_url, rate=50.0):
+    cache = ScrapeCache(cache_path)
+    try:
+        start = time.perf_counter()
+        stats = asyncio.run(scrape_isbns(
+            isbns, cache, base_url=base_url, concurrency=8, rate=rate, backoff=0.05,
+        ))
+        return stats, time.perf_counter() - start, cache
+    finally:
+        cache.close()
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    cache_path = os.path.join(tempfile.mkdtemp(prefix="scrapper_check_"), "isbn_cache.jsonl")
+
+    try:
+        # 1. Premier passage interrompu : seule la moitié des ISBN est traitée.
+        stats, _, _ = run(ISBNS[:20], cache_path, base_url)
+        assert stats == {"scraped": 20, "failed": 0}, stats
+
+        # Simule un arrêt brutal au milieu d'une écriture.
+        with open(cache_path, "a") as f:
+            f.write('{"isbn": "broken')
+
+        # 2. Reprise : seuls les ISBN manquants sont demandés au serveur.
+        StubHandler.hits.clear()
+        stats, elapsed, cache = run(ISBNS, cache_path, base_url, rate=20.0)
+        assert stats == {"scraped": 20, "failed": 0}, stats
+        assert set(StubHandler.hits) == set(ISBNS[20:]), sorted(StubHandler.hits)
+        assert StubHandler.hits[ISBNS[21]] == 2, "a 500 must be retried"
+        requests = sum(StubHandler.hits.values())
+        assert elapsed >= (requests - 20) / 20.0, "token bucket must cap the request rate"
+
+        entries = read_cache(cache_path)
+        assert len(entries) == len(ISBNS)
+        assert entries[ISBNS[5]] == (f"Description of {ISBNS[5]}", f"Fiction, Theme {ISBNS[5]}")
+        assert entries[ISBNS[3]][0] == "No description available"
+
+        # 3. Fusion finale, ISBN avec espaces et doublons compris.
+        df_books = pd.DataFrame({"ISBN": [f" {ISBNS[0]}", ISBNS[0], ISBNS[5], "9999999999"]})
+        merged = merge_details(df_books, cache.frame())
+        assert len(merged) == 4
+        assert merged["Description"].tolist()[:3] == [f"Description of {ISBNS[0]}"] * 2 + [f"Description of {ISBNS[5]}"]
+        assert merged["Description"].iloc[3].startswith("Error")
+
+        print(f"✅ Stub checks passed ({requests} requests in {elapsed:.2f}s on resume).")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+""" Inverted-index full-text search over titles, authors, descriptions and tags. """
+
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Poids de chaque champ dans la fréquence des termes (BM25F simplifié).
+FIELD_WEIGHTS = {
+    "Book-Title": 3.0,
+    "Book-Author": 2.0,
+    "Final_Tags": 1.5,
+    "Description": 1.0,
+}
+DOC_COLUMNS = ["Book-Title", "Book-Author", "Book-Rating", "Rating-Count"]
+
+
+def tokenize(text):
+    """Lowercase, accent-free word tokens of a text."""
+    if not isinstance(text, str):
+        return []
+    if text.isascii():
+        return TOKEN_PATTERN.findall(text.lower())
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return TOKEN_PATTERN.findall(text)
+
+
+def build_search_index(books_df, field_weights=None, k1=1.2, b=0.75):
+    """Build the inverted index over the first row of every title in books_df.
+
+    Documents follow ``books_df["Book-Title"].unique()``, i.e. catalog positions;
+    the per-title ``books`` frame of :mod:`ratings` works as is.
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    field_weights = field_weights or FIELD_WEIGHTS
+    first_rows = books_df.drop_duplicates(subset=["Book-Title"]).reset_index(drop=True)
+    fields = [column for column in field_weights if column in first_rows.columns]
+
+    vectorizer = CountVectorizer(analyzer=tokenize, dtype=np.float32)
+    texts = {column: first_rows[column].astype(object).fillna("") for column in fields}
+    vectorizer.fit(pd.concat(texts.values()))
+    term_matrix = sum(field_weights[column] * vectorizer.transform(texts[column]) for column in fields)
+
+    # Colonnes CSC = listes de postings triées par identifiant de document.
+    postings = term_matrix.tocsc()
+    postings.sort_indices()
+    docs = first_rows[[column for column in DOC_COLUMNS if column in first_rows.columns]]
+    return SearchIndex(
+        vectorizer.get_feature_names_out().astype(object),
+        postings.indptr.astype(np.int64),
+        postings.indices.astype(np.int32),
+        postings.data.astype(np.float32),
+        np.asarray(term_matrix.sum(axis=1)).ravel().astype(np.float32),
+        docs,
+        k1=k1,
+        b=b,
+    )
+
+
+class SearchIndex:
+    """Term -> sorted posting list index answering prefix, AND and BM25 queries."""
+
+    def __init__(self, terms, offsets, doc_ids, weights, doc_len, docs, k1=1.2, b=0.75):
+        self.terms = np.asarray(terms, dtype=object)
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.doc_len = doc_len
+        self.docs = docs
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(doc_len)
+        self.avg_doc_len = float(np.mean(doc_len)) if len(doc_len) else 0.0
+        self.doc_freq = np.diff(offsets)
+
+    def expand(self, prefix, max_expansions=64):
+        """Term ids starting with prefix, keeping the most frequent ones."""
+        lo = np.searchsorted(self.terms, prefix, side="left")
+        hi = np.searchsorted(self.terms, prefix + "\U0010ffff", side="left")
+        term_ids = np.arange(lo, hi)
+        if len(term_ids) > max_expansions:
+            keep = np.argpartition(-self.doc_freq[term_ids], max_expansions - 1)[:max_expansions]
+            term_ids = term_ids[keep]
+        return term_ids
+
+    def term_scores(self, term_ids):
+        """Sorted matching documents and their summed BM25 score for the term ids."""
+        if len(term_ids) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        starts, stops = self.offsets[term_ids], self.offsets[term_ids + 1]
+        lengths = stops - starts
+        posting_pos = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        docs = self.doc_ids[posting_pos]
+        tf = self.weights[posting_pos]
+
+        df = np.repeat(self.doc_freq[term_ids], lengths)
+        idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len[docs] / self.avg_doc_len)
+        scores = idf * tf * (self.k1 + 1) / (tf + norm)
+
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        return unique_docs, np.bincount(inverse, weights=scores).astype(np.float32)
+
+    def search(self, query, limit=None, max_expansions=64):
+        """Documents matching every query term (as a prefix), best BM25 score first.
+
+        Returns ``(doc_ids, scores)``; doc ids are catalog positions.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        matches, total = None, None
+        for token in tokens:
+            docs, scores = self.term_scores(self.expand(token, max_expansions))
+            if matches is None:
+                matches, total = docs, scores
+                continue
+            matches, left, right = np.intersect1d(matches, docs, assume_unique=True, return_indices=True)
+            total = total[left] + scores[right]
+            if len(matches) == 0:
+                break
+
+        order = np.lexsort((matches, -total))
+        if limit is not None:
+            order = order[:limit]
+        return matches[order], total[order]
+
+    def results(self, query, limit=None):
+        """Matching rows of the document table, with a Relevance column."""
+        doc_ids, scores = self.search(query, limit)
+        results = self.docs.iloc[doc_ids].copy()
+        results["Relevance"] = scores
+        return results
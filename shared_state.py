@@ -0,0 +1,123 @@
+""" Shared-memory serving: one loader publishes artifact generations, serving processes map them read-only.
+
+``python shared_state.py`` runs the loader. Every bundle train.py (or
+incremental.py) publishes in ``artifacts/`` is copied into ``SHARED_DIR``
+(``/dev/shm`` by default) as a numbered generation. The copy also holds the
+arrays each process would otherwise derive at load time: the catalog CSR
+tables and the dense feature copy of the tree / ivf KNN backends.
+
+Serving processes started with ``RECOMMENDER_SHARED_DIR=<dir>`` load the
+generations like any bundle. Their arrays are memory-mapped read-only from
+tmpfs, so N workers share one copy. When a new generation is published, each
+worker switches to it on its next request; no restart is needed. The loader
+keeps the last ``--keep`` generations. A removed generation's memory is freed
+once the last worker still mapping it moves on.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from artifact_store import ArtifactBundle
+from artifact_store import BUNDLES_DIR
+from artifact_store import latest_version
+from artifact_store import load_bundle_artifacts
+from artifact_store import write_bundle
+from metrics import timed
+
+SHARED_DIR_ENV = "RECOMMENDER_SHARED_DIR"
+SHARED_DIR = os.environ.get(SHARED_DIR_ENV) or os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "book-recommender"
+)
+KEEP_GENERATIONS = 2
+POLL_INTERVAL = 5.0
+# Backends qui travaillent sur une copie dense de X_final (neighbors.build_knn_backend).
+DENSE_KNN_BACKENDS = ("kd_tree", "ball_tree", "ivf")
+
+
+def serving_path(artifacts_path):
+    """Directory a serving process loads from: the shared generations when RECOMMENDER_SHARED_DIR is set."""
+    return os.environ.get(SHARED_DIR_ENV) or artifacts_path
+
+
+def generation_name(generation, source_version):
+    return f"g{generation:06d}-{source_version}"
+
+
+def current_generation(shared_dir=SHARED_DIR):
+    """(generation number, source bundle version) of the published generation, or (0, None)."""
+    version = latest_version(shared_dir)
+    if version is None:
+        return 0, None
+    meta = ArtifactBundle(shared_dir, version).meta["shared"]
+    return meta["generation"], meta["source_version"]
+
+
+@timed("shared_state.publish")
+def publish_generation(artifacts_path="artifacts", shared_dir=SHARED_DIR, keep=KEEP_GENERATIONS):
+    """Copy the latest bundle of ``artifacts_path`` into ``shared_dir`` as the next generation.
+
+    Returns the generation version, or None when the latest bundle is already
+    the published one.
+    """
+    source = ArtifactBundle(artifacts_path)
+    generation, source_version = current_generation(shared_dir)
+    if source_version == source.version:
+        return None
+    artifacts = load_bundle_artifacts(source)
+
+    arrays = {name: source.array(name) for name in source.manifest["arrays"]}
+    arrays.update(artifacts.catalog.shared_arrays())
+    if source.meta["knn_params"]["algorithm"] in DENSE_KNN_BACKENDS and "X_final_indptr" in source:
+        arrays["X_final_dense"] = artifacts.X_final.toarray()
+    frames = {name: source.frame(name) for name in source.manifest["frames"]}
+    meta = dict(source.meta, shared={
+        "generation": generation + 1, "source_version": source.version, "source_path": os.path.abspath(artifacts_path),
+    })
+    version = write_bundle(shared_dir, arrays, frames, meta, version=generation_name(generation + 1, source.version))
+    retire_generations(shared_dir, keep)
+    return version
+
+
+def retire_generations(shared_dir=SHARED_DIR, keep=KEEP_GENERATIONS):
+    """Delete all but the ``keep`` newest generations; mapped files stay valid until unmapped."""
+    bundles_path = os.path.join(shared_dir, BUNDLES_DIR)
+    generations = sorted(name for name in os.listdir(bundles_path) if name.startswith("g"))
+    for name in generations[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(bundles_path, name), ignore_errors=True)
+        print(f"Generation '{name}' retired.")
+
+
+def watch(artifacts_path="artifacts", shared_dir=SHARED_DIR, keep=KEEP_GENERATIONS, interval=POLL_INTERVAL):
+    """Publish a new generation whenever a new bundle appears in ``artifacts_path`` (runs forever)."""
+    while True:
+        try:
+            if latest_version(artifacts_path) not in (None, current_generation(shared_dir)[1]):
+                version = publish_generation(artifacts_path, shared_dir, keep)
+                print(f"Generation '{version}' published to '{shared_dir}'.", flush=True)
+        except (OSError, ValueError, KeyError) as error:  # bundle en cours d'écriture ou corrompu
+            print(f"Publication failed, retrying: {error!r}", flush=True)
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish artifact generations into shared memory.")
+    parser.add_argument("--artifacts", default="artifacts", help="Directory train.py publishes bundles to.")
+    parser.add_argument("--shared-dir", default=SHARED_DIR, help=f"tmpfs directory (env {SHARED_DIR_ENV}).")
+    parser.add_argument("--keep", type=int, default=KEEP_GENERATIONS, help="Generations kept for lagging workers.")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Seconds between checks.")
+    parser.add_argument("--once", action="store_true", help="Publish the latest bundle and exit.")
+    args = parser.parse_args()
+
+    if args.once:
+        version = publish_generation(args.artifacts, args.shared_dir, args.keep)
+        print(f"Generation '{version}' published to '{args.shared_dir}'." if version else "Already up to date.")
+        return
+    print(f"Watching '{args.artifacts}', publishing to '{args.shared_dir}' "
+          f"(export {SHARED_DIR_ENV}={args.shared_dir} for the workers).", flush=True)
+    watch(args.artifacts, args.shared_dir, args.keep, args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+""" On-disk cache of training stage outputs, keyed by a hash of their inputs and parameters. """
+
+import hashlib
+import json
+import os
+import pickle
+import resource
+import time
+from concurrent.futures import Future
+
+STAGE_CACHE_DIR = ".stage_cache"
+CACHE_FORMAT = 2
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size in MB (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def timed_call(func, args):
+    """Run a stage in a worker process; also return its duration and peak RSS."""
+    start = time.perf_counter()
+    value = func(*args)
+    return value, time.perf_counter() - start, peak_rss_mb()
+
+
+class StageCache:
+    """Memoizes pipeline stages in memory and as pickles under ``cache_dir``.
+
+    A stage key hashes its upstream keys and parameters, so changing e.g. the
+    SVD hyperparameters only invalidates the SVD stage. Keys do not cover the
+    code itself: use ``clear()`` after editing a stage function.
+    """
+
+    def __init__(self, cache_dir, enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.timings = []
+        self.started = time.perf_counter()
+        self._values = {}
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, name, *parts):
+        """Hash of a stage name and its inputs (upstream keys, parameters)."""
+        payload = json.dumps([CACHE_FORMAT, name, *parts], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+    def _path(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}-{key}.pkl")
+
+    def _load(self, name, key):
+        """(hit, value) from memory, then from disk."""
+        if key in self._values:
+            return True, self._values[key]
+        if self.enabled and os.path.exists(self._path(name, key)):
+            start = time.perf_counter()
+            with open(self._path(name, key), "rb") as f:
+                value = pickle.load(f)
+            self._values[key] = value
+            self._record(name, "cached", time.perf_counter() - start, peak_rss_mb())
+            print(f"\n[{name}] cached output reused ({key}).")
+            return True, value
+        return False, None
+
+    def _save(self, name, key, value):
+        self._values[key] = value
+        if self.enabled:
+            tmp_path = f"{self._path(name, key)}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(name, key))
+
+    def _record(self, name, status, seconds, rss_mb):
+        self.timings.append({"stage": name, "status": status, "seconds": seconds, "peak_rss_mb": rss_mb})
+
+    def run(self, name, key, compute):
+        """Cached output of a stage, calling ``compute()`` in this process on a miss."""
+        hit, value = self._load(name, key)
+        if hit:
+            return value
+        start = time.perf_counter()
+        value = compute()
+        self._record(name, "ran", time.perf_counter() - start, peak_rss_mb())
+        self._save(name, key, value)
+        return value
+
+    def submit(self, executor, name, key, func, make_args):
+        """Run a stage in ``executor`` on a miss; return a future of its output.
+
+        ``make_args()`` is only called on a miss, so the inputs of a cached stage
+        (and the stages producing them) are never loaded.
+        """
+        hit, value = self._load(name, key)
+        if hit:
+            future = Future()
+            future.set_result(value)
+            return future
+
+        remote = executor.submit(timed_call, func, make_args())
+        future = Future()
+
+        def done(remote):
+            try:
+                value, seconds, rss_mb = remote.result()
+                self._record(name, "ran (worker)", seconds, rss_mb)
+                self._save(name, key, value)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(value)
+
+        remote.add_done_callback(done)
+        return future
+
+    def clear(self):
+        """Remove every cached stage output."""
+        self._values.clear()
+        if os.path.isdir(self.cache_dir):
+            for file_name in os.listdir(self.cache_dir):
+                if file_name.endswith(".pkl"):
+                    os.remove(os.path.join(self.cache_dir, file_name))
+
+    def report(self):
+        """Print the duration and peak memory of every stage of the run."""
+        print(f"\n{'stage':<14}{'status':<14}{'time (s)':>10}{'peak RSS (MB)':>16}")
+        for timing in self.timings:
+            print(f"{timing['stage']:<14}{timing['status']:<14}{timing['seconds']:>10.2f}"
+                  f"{timing['peak_rss_mb']:>16.1f}")
+        # Les étapes en parallèle se chevauchent : le total est le temps écoulé.
+        wall = time.perf_counter() - self.started
+        print(f"{'total (wall)':<28}{wall:>10.2f}{max(peak_rss_mb(), peak_rss_mb(resource.RUSAGE_CHILDREN)):>16.1f}")
@@ -1,12 +1,18 @@
 # tabs/tab0.py
 import streamlit as st
+from metrics import timed
+from utils import picker_options
 
-def show_login(books_df):
+@timed("tab.login")
+def show_login(user_lookup):
     if "history" not in st.session_state:
         st.session_state["history"] = []
 
     st.subheader("Login")
-    user_ids = ["Guest user"] + list(books_df["User-ID"].unique())
+    # Seule une page d'identifiants filtrés côté serveur est envoyée au navigateur.
+    user_ids = picker_options(
+        user_lookup, "login", "Search a user ID:", pinned=["Guest user", st.session_state.user_id]
+    )
 
     st.selectbox(
         "Choose a user:", 
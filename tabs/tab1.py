@@ -1,9 +1,12 @@
 # tabs/tab1.py
 import streamlit as st
-from utils import recommend_book_svd, render_aligned_image
+from metrics import timed
+from utils import picker_options, recommend_book_hybrid, recommend_book_svd, render_aligned_image
 
 @st.fragment
-def show_user_recommendations(books_df, svd_model):
+@timed("tab.user_recommendations")
+def show_user_recommendations(catalog, svd_scorer, leaderboard, result_cache=None, recommendation_table=None,
+                              X_final=None, als_scorer=None):
     if "history" not in st.session_state:
         st.session_state["history"] = []
         
@@ -18,10 +21,50 @@ def show_user_recommendations(books_df, svd_model):
 
     # Case à cocher pour activer/désactiver l'affichage des descriptions
     show_descriptions = st.checkbox("Show book descriptions", value=False)
-        
+
+    # Mode hybride : candidats SVD reclassés par similarité de contenu et diversifiés par cluster.
+    modes = ["SVD", "Hybrid (SVD + similar content, diversified)"] if X_final is not None else ["SVD"]
+    # Moteur ALS (retours implicites) : proposé quand les artefacts contiennent ses facteurs.
+    if als_scorer is not None:
+        modes.insert(1, "ALS (implicit feedback)")
+    mode = st.radio("Recommendation mode:", modes, horizontal=True, key="recommendation_mode")
+    hybrid = mode.startswith("Hybrid")
+    als = mode.startswith("ALS")
+
+    # Notes données pendant la session : intégrées au SVD sans réentraînement.
+    session_ratings = st.session_state.setdefault("session_ratings", {}).setdefault(selected_user, {})
+    with st.expander("⭐ Rate a few books to refine your recommendations"):
+        if mode != "SVD":
+            st.caption("Session ratings are used by the SVD mode only.")
+        titles = picker_options(catalog.title_lookup, "session_rating", "Search a book title:")
+        rated_book = st.selectbox("Book:", options=titles, index=None,
+                                  placeholder="Choose a book", key="session_rating_book")
+        low, high = svd_scorer.rating_scale
+        rating = st.slider("Your rating:", min_value=int(low), max_value=int(high), value=int(high),
+                           key="session_rating_value")
+        if st.button("Add rating", key="session_rating_add") and rated_book is not None:
+            session_ratings[rated_book] = rating
+        if session_ratings and st.button("Clear my ratings", key="session_rating_clear"):
+            session_ratings.clear()
+        for book_name, value in session_ratings.items():
+            st.write(f"- {book_name} → **{value}**")
+
     if st.button("Show Recommendations", key="recommendations_svd"):
         with st.spinner("Loading recommendations..."):
-            recommendations = recommend_book_svd(selected_user, books_df, svd_model)
+            if hybrid:
+                recommendations = recommend_book_hybrid(
+                    selected_user, catalog, svd_scorer, leaderboard, X_final, result_cache=result_cache,
+                    recommendation_table=recommendation_table,
+                )
+            elif als:
+                recommendations = recommend_book_svd(
+                    selected_user, catalog, als_scorer, leaderboard, result_cache=result_cache, engine="als",
+                )
+            else:
+                recommendations = recommend_book_svd(
+                    selected_user, catalog, svd_scorer, leaderboard, result_cache=result_cache,
+                    session_ratings=session_ratings, recommendation_table=recommendation_table,
+                )
 
         if recommendations:
             st.session_state[selected_user].append({
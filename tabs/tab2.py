@@ -1,21 +1,26 @@
 # tabs/tab2.py
 import streamlit as st
-from utils import recommend_book_knn, render_aligned_image
+from metrics import timed
+from utils import picker_options, recommend_book_knn, render_aligned_image
 
 @st.fragment
-def show_book_recommendations(books_df, book_titles, books_df_knn, knn_model, X_final):
+@timed("tab.book_recommendations")
+def show_book_recommendations(catalog, book_neighbors, result_cache=None):
     """Display recommendations by books tab."""
     if "history" not in st.session_state:
         st.session_state["history"] = []
 
     st.subheader("📚 Find a Book and Get Recommendations!")
-    selected_book = st.selectbox("Write or find a Book:", book_titles)
+    titles = picker_options(catalog.title_lookup, "knn_book", "Search a book title:")
+    selected_book = st.selectbox("Write or find a Book:", titles)
 
     show_descriptions = st.checkbox("Show book descriptions", value=False, key="show_descriptions_tab2")
 
     if st.button("Display recommendations (KNN)", key="recommendations_knn"):
         with st.spinner("Loading recommendations..."):
-            book_list, poster_list, description_list = recommend_book_knn(books_df, selected_book, books_df_knn, knn_model, X_final)
+            book_list, poster_list, description_list = recommend_book_knn(
+                catalog, selected_book, book_neighbors, result_cache
+            )
 
         if book_list:
             st.session_state["history"].append({
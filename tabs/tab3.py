@@ -1,18 +1,17 @@
 # tabs/tab3.py
 import streamlit as st
-from utils import render_aligned_image
+from metrics import timed
+from utils import cover_src, render_aligned_image
 
 @st.fragment
-def show_search_tab(books_df):
+@timed("tab.search")
+def show_search_tab(books, search_index, catalog):
     """Display search functionality tab."""
     st.subheader("🔍 Search for a book")
 
     search_query = st.text_input("Search for a book by keyword")
     if search_query:
-        unique_books = books_df.drop_duplicates(subset=["Book-Title"])
-        filtered_books = unique_books[
-            unique_books["Book-Title"].str.contains(search_query, case=False, na=False)
-        ][["Book-Title", "Book-Author", "Book-Rating", "Rating-Count"]]
+        filtered_books = search_index.results(search_query).drop(columns="Relevance")
 
         if not filtered_books.empty:
             st.write(f"**{len(filtered_books)} books found:**")
@@ -27,7 +26,7 @@ def show_search_tab(books_df):
             )
 
             st.dataframe(
-                filtered_books.sort_values(by="Rating", ascending=False),
+                filtered_books,
                 use_container_width=True,
                 hide_index=True,
                 height=500,
@@ -37,6 +36,7 @@ def show_search_tab(books_df):
 
     st.subheader("🎲 Discover a random book")
     if st.button("Discover a random book"):
-        random_book = books_df.sample(1)
+        random_book = books.sample(1)
         st.write(f"📖 Discover: **{random_book.iloc[0]['Book-Title']}**")
-        st.image(random_book.iloc[0]["Image-URL-L"], use_container_width=True)
\ No newline at end of file
+        book_title = random_book.iloc[0]["Book-Title"]
+        st.markdown(render_aligned_image(cover_src(catalog, book_title), book_title), unsafe_allow_html=True)
\ No newline at end of file
@@ -0,0 +1,65 @@
+# tabs/tab4.py
+import time
+import pandas as pd
+import streamlit as st
+from metrics import METRICS_FILE
+from metrics import REGISTRY
+from utils import load_thumbnail_cache
+
+def show_about(result_cache, artifacts_version):
+    """Display the About tab: live latencies per stage, cache hit rates and artifact load times."""
+    st.subheader("📊 About")
+    st.markdown(
+        "Book recommendations from a collaborative SVD model (your ratings) and a content-based "
+        "KNN model (authors, tags, clusters). The figures below are measured live in this process."
+    )
+    st.button("Refresh", key="about_refresh")
+
+    # Latences : p50 / p95 sur les dernières exécutions de chaque étape.
+    st.markdown("#### ⏱️ Latency per stage")
+    summary = pd.DataFrame(REGISTRY.summary())
+    if summary.empty:
+        st.write("No stage measured yet.")
+    else:
+        st.dataframe(
+            summary.rename(columns={
+                "stage": "Stage", "count": "Calls", "errors": "Errors", "p50_ms": "p50 (ms)",
+                "p95_ms": "p95 (ms)", "p99_ms": "p99 (ms)", "last_ms": "Last (ms)",
+            }).round(3),
+            hide_index=True,
+        )
+
+    st.markdown("#### 🗃️ Caches")
+    cols = st.columns(2)
+    if result_cache is not None:
+        stats = result_cache.stats()
+        cols[0].metric("Result cache hit rate", f"{stats['hit_rate']:.0%}")
+        cols[0].caption(f"{stats['hits']} memory hits, {stats['disk_hits']} shared hits, {stats['misses']} misses, "
+                        f"{stats['size']} entries, {stats['evictions']} evictions.")
+    thumbnails = load_thumbnail_cache().stats()
+    known = thumbnails["keys"] + thumbnails["missing"]
+    cols[1].metric("Cached covers", f"{thumbnails['keys']}", help="Thumbnails stored by `python images.py`.")
+    cols[1].caption(f"{thumbnails['missing']} covers known to be missing out of {known}, "
+                    f"{thumbnails['bytes'] / 2**20:.1f} MB on disk.")
+
+    st.markdown("#### 📦 Artifacts")
+    st.write(f"Version: `{artifacts_version}`")
+    loads = summary[summary["stage"].str.startswith("load_artifacts")] if not summary.empty else summary
+    if loads.empty:
+        st.write("Artifacts loaded before the instrumentation started.")
+    else:
+        for row in loads.itertuples():
+            st.write(f"- `{row.stage}`: {row.last_ms:.1f} ms (last load, {row.count} loads)")
+
+    st.markdown("#### 🔬 Profiling")
+    st.checkbox("Profile my next requests with cProfile", key="profile_requests",
+                help="Also enabled with `?profile=1` in the URL.")
+    for profile in list(REGISTRY.profiles)[:5]:
+        at = time.strftime("%H:%M:%S", time.localtime(profile["at"]))
+        with st.expander(f"{at} · {profile['stage']} · {profile['seconds'] * 1e3:.1f} ms"):
+            st.code(profile["report"])
+
+    st.download_button("Download metrics (Prometheus format)", REGISTRY.prometheus_text(),
+                       file_name="recommender.prom", mime="text/plain")
+    if METRICS_FILE:
+        st.caption(f"Also exported to `{METRICS_FILE}`.")
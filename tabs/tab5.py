@@ -1,21 +1,19 @@
 # tabs/tab5.py
 import streamlit as st
-from utils import render_aligned_image
+from metrics import timed
+from utils import cover_src, render_aligned_image
 
-def show_popular_books(books_df):
+@timed("tab.popular")
+def show_popular_books(catalog, leaderboard):
     """Display popular books tab."""
     st.subheader("📈 Popular books")
     
-    popular_books = (
-        books_df.sort_values(by="Rating-Count", ascending=False)
-        .drop_duplicates(subset="Book-Title")
-        .head(10)
-    )
+    popular_books = leaderboard.popular(10)
 
     cols = st.columns(min(5, len(popular_books)))
     for idx, col in enumerate(cols):
-        book_title = popular_books.iloc[idx]["Book-Title"]
-        book_image = popular_books.iloc[idx]["Image-URL-L"]
+        book_title = catalog.titles[popular_books[idx]]
+        book_image = cover_src(catalog, book_title)
         with col:
             col.markdown(
                 render_aligned_image(book_image, book_title),
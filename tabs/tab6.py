@@ -1,21 +1,24 @@
 # tabs/tab6.py
 import streamlit as st
-from utils import render_aligned_image
+from metrics import timed
+from utils import cover_src, render_aligned_image
 
-def show_top_rated_books(books_df):
+@timed("tab.top_rated")
+def show_top_rated_books(catalog, leaderboard):
     """Display top-rated books tab."""
     st.subheader("⭐ Top-rated books")
-    
-    top_rated_books = (
-        books_df.sort_values(by="Book-Rating", ascending=False)
-        .drop_duplicates(subset="Book-Title")
-        .head(10)
+
+    cluster = st.selectbox(
+        "Book cluster:",
+        options=["All"] + leaderboard.cluster_ids.tolist(),
+        key="top_rated_cluster",
     )
+    top_rated_books = leaderboard.top_rated(10, cluster=None if cluster == "All" else cluster)
     
     cols = st.columns(min(5, len(top_rated_books)))
     for idx, col in enumerate(cols):
-        book_title = top_rated_books.iloc[idx]["Book-Title"]
-        book_image = top_rated_books.iloc[idx]["Image-URL-L"]
+        book_title = catalog.titles[top_rated_books[idx]]
+        book_image = cover_src(catalog, book_title)
         with col:
             col.markdown(
                 render_aligned_image(book_image, book_title),
@@ -1,27 +1,59 @@
 """ Trains a book recommender system using a KNN model. """
 
+import argparse
 import os
-import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 from scipy.sparse import coo_matrix
-from scipy.sparse import issparse
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import NearestNeighbors
-from sklearn.preprocessing import normalize
 from surprise import Dataset
 from surprise import Reader
 from surprise import SVD
-#from surprise.model_selection import GridSearchCV
 from surprise.model_selection import train_test_split
 #from surprise.accuracy import rmse, mae
 from surprise import accuracy
+from als import ALS_ALPHA
+from als import ALS_FACTORS
+from als import ALS_ITERATIONS
+from als import ALS_REG
+from als import train_als
+from artifact_store import file_checksum
+from artifact_store import write_bundle
+from evaluation import SEARCH_SPACES
+from evaluation import load_report
+from evaluation import print_report
+from evaluation import run_search
+from evaluation import write_report
+from incremental import load_delta
+from incremental import update_artifacts
+from ingest import CHUNK_ROWS
+from ingest import ingest_ratings
+from ingest import user_item_matrix
+from leaderboard import compute_title_stats
+from neighbors import KNN_BACKENDS
+from neighbors import build_knn_backend
+from neighbors import compute_neighbor_table
+from neighbors import feature_arrays
+from neighbors import knn_backend_state
+from neighbors import knn_feature_matrix
+from precompute import PRECOMPUTED_N
+from precompute import build_recommendation_table
+from ratings import compact_books
+from ratings import frame_memory_mb
+from scoring import SVDScorer
+from search import build_search_index
+from stage_cache import STAGE_CACHE_DIR
+from stage_cache import StageCache
 
 
 def load_data(file_path):
-    """Loads the dataset from a CSV file."""
+    """Loads the dataset from a CSV file (multi-threaded pyarrow parser when available)."""
     print("Step 1: Loading data...")
-    data = pd.read_csv(file_path)
+    try:
+        data = pd.read_csv(file_path, engine="pyarrow")
+    except (ImportError, ValueError):
+        data = pd.read_csv(file_path)
     print(f"Data loaded with {data.shape[0]} rows and {data.shape[1]} columns.")
     return data
 
@@ -31,18 +63,34 @@ def data_overview(data):
     print("\nStep 2: Data overview...")
     print(data.head())
     print("\nData information:")
-    print(data.info())
+    data.info(memory_usage=False)
+
+
+def load_and_inspect(file_path):
+    """Steps 1-3: the dataset and the catalog titles."""
+    data = load_data(file_path)
+    data_overview(data)
+    _, book_titles = create_user_item_matrix(data)
+    return data, book_titles
 
 
 def create_user_item_matrix(data):
     """Creates a sparse user-item matrix."""
     print("\nStep 3: Creating user-item matrix...")
     users = data["User-ID"].astype("category").cat.codes
-    books = data["Book-Title"].astype("category").cat.codes
-    ratings = data["Book-Rating"]
-    sparse_matrix = coo_matrix((ratings, (users, books)))
+    titles = data["Book-Title"].astype("category")
+    sparse_matrix = coo_matrix((data["Book-Rating"], (users, titles.cat.codes))).tocsr()
     print(f"User-item matrix created with dimensions: {sparse_matrix.shape}.")
-    return sparse_matrix, data["Book-Title"].astype("category").cat.categories
+    return sparse_matrix, titles.cat.categories
+
+def stream_data(file_path, chunk_rows=CHUNK_ROWS):
+    """Steps 1-3 without loading the whole file: codes, per-title and per-ISBN aggregates."""
+    print(f"Step 1: Streaming the ratings by chunks of {chunk_rows} rows...")
+    ingested = ingest_ratings(file_path, chunk_rows)
+    print(f"\nStep 3: {len(ingested.ratings)} ratings, {len(ingested.books)} titles, "
+          f"{len(ingested.books_knn)} ISBNs; user-item matrix created with dimensions: "
+          f"{ingested.user_item.shape} ({ingested.ratings.nbytes / 2**20:.1f} MB of codes).")
+    return ingested
 
 def preprocess_data_for_knn(data):
     """Preprocesses the dataset by grouping books by ISBN for KNN."""
@@ -50,45 +98,108 @@ def preprocess_data_for_knn(data):
     data_grouped = data.groupby("ISBN").agg({
     "Book-Title": "first",
     "Book-Author": "first",
-    "Final_Tags": lambda x: ", ".join(set(x.dropna())),  # Concaténer les tags uniques
     "Book-Rating": "mean",  # Moyenne des notes
     "Cluster_hdbscan": "first"
-}).reset_index()
-    return data_grouped
-
-def train_knn_model_with_metadata(data):
+})
+    # Concaténer les tags uniques (dans l'ordre d'apparition) sans lambda par groupe
+    tags = data[["ISBN", "Final_Tags"]].dropna().drop_duplicates()
+    joined_tags = tags.groupby("ISBN", sort=False)["Final_Tags"].agg(list).str.join(", ")
+    data_grouped.insert(2, "Final_Tags", joined_tags.reindex(data_grouped.index, fill_value=""))
+    data_grouped["Book-Author"] = data_grouped["Book-Author"].fillna("")
+    return data_grouped.reset_index()
+
+def train_knn_model_with_metadata(data, backend="brute", metric="manhattan", author_features=100,
+                                  cluster_weight=1.0, tag_features=200, tag_weight=1.0, **backend_params):
     """Trains a KNN model using metadata (tags + authors)"""
     print("\nStep 4: Initializing and training the enriched KNN model (with tags and authors)...")
-    
-    # Vectorization of tags and authors
-    data["Final_Tags"] = data["Final_Tags"].fillna("")
-    data["Book-Author"] = data["Book-Author"].fillna("")
-
-    tfidf_authors = TfidfVectorizer(stop_words="english", max_features=100)
-    X_authors = tfidf_authors.fit_transform(data["Book-Author"]).toarray()
 
-    X_numeric = data[["Book-Rating"]].fillna(data["Book-Rating"]).to_numpy()
-
-    X_clusters = data[["Cluster_hdbscan"]].to_numpy()
-
-    if issparse(X_authors):  # Vérifie si c'est une matrice sparse
-        X_authors = X_authors.toarray()  # Convertit en array dense
-
-    # Combine all features
-    X_final = np.hstack((X_authors, X_numeric, X_clusters))
-    print(f"Feature matrix created with shape: {X_final.shape}")
-
-    # Normalisation L2 de la matrice X_final
-    X_final_normalized = normalize(X_final, norm='l2')
+    # Vectorization of authors + tags + mean rating + cluster, sparse and L2-normalized
+    X_final_normalized = knn_feature_matrix(
+        data, author_features=author_features, cluster_weight=cluster_weight,
+        tag_features=tag_features, tag_weight=tag_weight,
+    )
+    print(f"Feature matrix created with shape: {X_final_normalized.shape} "
+          f"({X_final_normalized.nnz} non-zeros, {X_final_normalized.data.nbytes / 2**20:.1f} MB).")
 
     # Train the KNN model
-    knn_model = NearestNeighbors(metric="manhattan", algorithm="brute", n_neighbors=10)
-    knn_model.fit(X_final_normalized)
-    print("Enriched KNN model trained successfully.")
+    knn_model = build_knn_backend(
+        X_final_normalized, backend=backend, metric=metric, n_neighbors=10, **backend_params
+    )
+    print(f"Enriched KNN model trained successfully ({backend} backend).")
     return knn_model, X_final_normalized
 
 
-def train_svd_model(data):
+def precompute_knn_neighbors(knn_model, X_final, n_neighbors=10, chunk_size=1024, n_jobs=1):
+    """Precomputes the top-K neighbours of every book for the serving path."""
+    print(f"\nStep 5: Precomputing top-{n_neighbors} neighbours (n_jobs={n_jobs})...")
+    indices, distances = compute_neighbor_table(
+        knn_model, X_final, n_neighbors=n_neighbors, chunk_size=chunk_size, n_jobs=n_jobs
+    )
+    print(f"Neighbour table created with shape: {indices.shape}.")
+    return indices, distances
+
+
+def compact_ratings(data):
+    """Splits the ratings frame into int32 codes and one metadata row per title."""
+    print("\nStep 3.1: Compacting the ratings into codes + per-title metadata...")
+    books, ratings = compact_books(data)
+    compact_mb = frame_memory_mb(books) + ratings.nbytes / 2**20
+    print(f"{len(ratings)} ratings and {len(books)} titles: "
+          f"{frame_memory_mb(data):.1f} MB -> {compact_mb:.1f} MB.")
+    return books, ratings
+
+
+def train_search_index(books):
+    """Builds the inverted full-text index used by the Search tab."""
+    print("\nStep 6.1: Building the search index...")
+    search_index = build_search_index(books)
+    print(f"Search index created with {len(search_index.terms)} terms "
+          f"over {search_index.n_docs} books.")
+    return search_index
+
+
+def compute_leaderboards(books, ratings):
+    """Aggregates the ratings per title for the Popular / Top-rated leaderboards."""
+    print("\nStep 6.2: Computing per-title leaderboards...")
+    title_stats, min_votes = compute_title_stats(books, ratings)
+    print(f"Aggregates computed for {len(title_stats)} titles (min votes: {min_votes:g}).")
+    return title_stats, min_votes
+
+
+def train_knn_stage(data, backend, knn_params, chunk_size, n_jobs):
+    """Steps 4-5: the KNN model, its feature matrix and the neighbour table."""
+    knn_model, X_final_normalized = train_knn_model_with_metadata(data, backend=backend, **knn_params)
+    neighbor_indices, neighbor_distances = precompute_knn_neighbors(
+        knn_model, X_final_normalized, chunk_size=chunk_size, n_jobs=n_jobs
+    )
+    return knn_model, X_final_normalized, neighbor_indices, neighbor_distances
+
+
+def precompute_recommendations(svd_model, books, ratings, n=PRECOMPUTED_N, n_jobs=1):
+    """Top-N recommendations of every known user, served without live scoring."""
+    print(f"\nStep 6.3: Precomputing the top-{n} recommendations of every user (n_jobs={n_jobs})...")
+    svd_scorer = SVDScorer.from_model(svd_model, books["Book-Title"])
+    recommendation_table = build_recommendation_table(svd_scorer, ratings, n=n, n_jobs=n_jobs)
+    print(f"Recommendation table created with shape: {recommendation_table.top.shape}.")
+    return recommendation_table
+
+
+def train_als_model(books, ratings, factors=ALS_FACTORS, reg=ALS_REG, alpha=ALS_ALPHA,
+                    iterations=ALS_ITERATIONS, n_jobs=1):
+    """Trains the implicit-feedback ALS model on the users x catalog titles matrix."""
+    print(f"\nStep 6.4: Training the implicit-feedback ALS model (n_jobs={n_jobs})...")
+    start = time.perf_counter()
+    user_factors, item_factors = train_als(
+        user_item_matrix(ratings, len(books)), factors=factors, reg=reg, alpha=alpha,
+        iterations=iterations, n_jobs=n_jobs,
+    )
+    seconds = time.perf_counter() - start
+    print(f"ALS factors computed for {len(user_factors)} users and {len(item_factors)} titles "
+          f"in {seconds:.1f} s.")
+    return user_factors, item_factors, seconds
+
+
+def train_svd_model(data, n_factors=50, lr_all=0.005, reg_all=0.02):
     """Trains on SVD model using surprise library"""
     print("\nStep 6: Training the SVD model ... ")
     reader = Reader(rating_scale=(data['Book-Rating'].min(), data['Book-Rating'].max()))
@@ -96,7 +207,7 @@ def train_svd_model(data):
     
     trainset, testset = train_test_split(data, test_size=0.2, random_state=42)
 
-    svd = SVD(n_factors=50, lr_all=0.005, reg_all=0.02)  # Paramètres optimisés
+    svd = SVD(n_factors=n_factors, lr_all=lr_all, reg_all=reg_all)  # Paramètres optimisés : 50 / 0.005 / 0.02
     svd.fit(trainset)
 
     # Évaluer sur l'ensemble d'entraînement
@@ -116,53 +227,302 @@ def train_svd_model(data):
         "MAE": [train_mae, test_mae]
     })
 
-    comparison_results
+    print(comparison_results.to_string(index=False))
 
     return svd
 
-def save_artifacts(artifacts_path, **artifacts):
-    """Saves artifacts to the specified directory."""
+def save_artifacts(artifacts_path, knn_model, svd_model, book_titles, X_final, books, ratings,
+                   book_df_knn, neighbor_indices, neighbor_distances, search_index,
+                   title_stats, min_votes, recommendation_table=None, als_model=None, als_params=None):
+    """Saves artifacts as a versioned, pickle-free bundle in the specified directory."""
     print("\nStep 7: Saving artifacts...")
     os.makedirs(artifacts_path, exist_ok=True)
-    for name, artifact in artifacts.items():
-        file_path = os.path.join(artifacts_path, f"{name}.pkl")
-        with open(file_path, "wb") as f:
-            pickle.dump(artifact, f)
-            print(f"{name} saved to '{file_path}'.")
+    trainset = svd_model.trainset
+    knn_params, knn_arrays = knn_backend_state(knn_model)
+    # X_final creux : stocké en trois tableaux CSR (data, indices, indptr).
+    X_arrays = feature_arrays(X_final)
+    recs_arrays = recommendation_table.arrays() if recommendation_table is not None else {}
+    als_arrays, als_frames, als_meta = {}, {}, {}
+    if als_model is not None:
+        # Mêmes conventions que le SVD : facteurs en float64, lignes nommées par als_users / als_items.
+        user_factors, item_factors, als_seconds = als_model
+        als_arrays = {"als_pu": user_factors.astype(np.float64), "als_qi": item_factors.astype(np.float64)}
+        als_frames = {
+            "als_users": pd.DataFrame({"User-ID": ratings.user_ids}),
+            "als_items": pd.DataFrame({"Book-Title": books["Book-Title"]}),
+        }
+        als_meta = {"als": {**als_params, "seconds": als_seconds}}
+
+    # Le modèle KNN n'est qu'une copie de X_final (+ les listes IVF) : on ne garde
+    # que ses paramètres. Le SVD est réduit à ses matrices de facteurs.
+    return write_bundle(
+        artifacts_path,
+        arrays={
+            **X_arrays,
+            "knn_neighbor_indices": neighbor_indices,
+            "knn_neighbor_distances": neighbor_distances,
+            **knn_arrays,
+            **ratings.arrays(),
+            **recs_arrays,
+            "svd_pu": svd_model.pu,
+            "svd_qi": svd_model.qi,
+            "svd_bu": svd_model.bu,
+            "svd_bi": svd_model.bi,
+            **als_arrays,
+            "search_offsets": search_index.offsets,
+            "search_doc_ids": search_index.doc_ids,
+            "search_weights": search_index.weights,
+            "search_doc_len": search_index.doc_len,
+        },
+        frames={
+            "books": books,
+            "users": pd.DataFrame({"User-ID": ratings.user_ids}),
+            "book_df_knn": book_df_knn,
+            "book_titles": pd.DataFrame({"Book-Title": book_titles}),
+            "svd_users": pd.DataFrame(
+                {"User-ID": [trainset.to_raw_uid(u) for u in trainset.all_users()]}
+            ),
+            "svd_items": pd.DataFrame(
+                {"Book-Title": [trainset.to_raw_iid(i) for i in trainset.all_items()]}
+            ),
+            "search_terms": pd.DataFrame({"term": search_index.terms}),
+            "search_docs": search_index.docs,
+            "title_stats": title_stats,
+            **als_frames,
+        },
+        meta={
+            "knn_params": knn_params,
+            "features": {"shape": [int(size) for size in X_final.shape]},
+            "svd": {
+                "global_mean": float(trainset.global_mean),
+                "rating_scale": [float(bound) for bound in trainset.rating_scale],
+                "biased": bool(svd_model.biased),
+                "n_factors": int(svd_model.n_factors),
+            },
+            "search": {"k1": search_index.k1, "b": search_index.b},
+            "leaderboard": {"min_votes": min_votes},
+            **als_meta,
+        },
+    )
 
 
-def main():
+def parse_args():
+    """Parses the command line options of the training script."""
+    parser = argparse.ArgumentParser(description="Train the book recommender models.")
+    parser.add_argument("--data", default="./data/dataset_final3.csv",
+                        help="Ratings dump (CSV, or Parquet with --stream).")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read the ratings by chunks instead of loading the whole file "
+                             "(for dumps larger than memory).")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="Rows per chunk of a --stream run.")
+    parser.add_argument("--n-jobs", type=int, default=1,
+                        help="Worker processes for the neighbour / recommendation tables "
+                             "and the evaluation (-1 = all CPUs).")
+    parser.add_argument("--chunk-size", type=int, default=1024,
+                        help="Books queried per chunk when building the neighbour table.")
+    parser.add_argument("--knn-backend", choices=KNN_BACKENDS, default="brute",
+                        help="Neighbour search backend (ivf = approximate, sparse = cosine / euclidean "
+                             "on the sparse features).")
+    parser.add_argument("--ivf-lists", type=int, default=None,
+                        help="Number of IVF cells (default: sqrt of the number of books).")
+    parser.add_argument("--ivf-probe", type=int, default=8,
+                        help="IVF cells scanned per query.")
+    parser.add_argument("--knn-metric", choices=SEARCH_SPACES["knn"]["metric"], default="manhattan")
+    parser.add_argument("--author-features", type=int, default=100,
+                        help="Size of the author TF-IDF vocabulary of the KNN features.")
+    parser.add_argument("--cluster-weight", type=float, default=1.0,
+                        help="Weight of the HDBSCAN cluster column of the KNN features.")
+    parser.add_argument("--tag-features", type=int, default=200,
+                        help="Size of the tag TF-IDF vocabulary of the KNN features.")
+    parser.add_argument("--tag-weight", type=float, default=1.0,
+                        help="Weight of the tag TF-IDF block of the KNN features (0 = no tags).")
+    parser.add_argument("--svd-factors", type=int, default=50)
+    parser.add_argument("--svd-lr", type=float, default=0.005)
+    parser.add_argument("--svd-reg", type=float, default=0.02)
+    parser.add_argument("--als-factors", type=int, default=ALS_FACTORS,
+                        help="Factors of the implicit-feedback ALS engine (0 = no ALS model).")
+    parser.add_argument("--als-reg", type=float, default=ALS_REG)
+    parser.add_argument("--als-alpha", type=float, default=ALS_ALPHA,
+                        help="Confidence given to an interaction with the highest rating.")
+    parser.add_argument("--als-iterations", type=int, default=ALS_ITERATIONS)
+    parser.add_argument("--precompute-n", type=int, default=PRECOMPUTED_N,
+                        help="Recommendations precomputed per user (0 = score every request live).")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Recompute every stage instead of reusing cached outputs.")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="Delete the cached stage outputs before training.")
+    parser.add_argument("--update", metavar="DELTA_CSV",
+                        help="Fold the new ratings of DELTA_CSV into the latest artifacts "
+                             "instead of retraining from scratch.")
+    parser.add_argument("--epochs", type=int, default=3,
+                        help="Warm-started SGD epochs of an --update run.")
+    parser.add_argument("--evaluate", action="store_true",
+                        help="Run the hyperparameter search and write artifacts/evaluation.json "
+                             "instead of training (parallel over --n-jobs processes).")
+    parser.add_argument("--search", choices=("grid", "random"), default="grid")
+    parser.add_argument("--n-iter", type=int, default=10,
+                        help="Configurations per model of a random search.")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--top-k", type=int, default=10,
+                        help="Length of the lists scored by the ranking metrics.")
+    parser.add_argument("--models", nargs="+", choices=tuple(SEARCH_SPACES), default=list(SEARCH_SPACES))
+    parser.add_argument("--tuned", action="store_true",
+                        help="Train with the best parameters of artifacts/evaluation.json.")
+    return parser.parse_args()
+
+
+def update_main(args, artifacts_path):
+    """Publishes a new artifact version from a delta of ratings, without a full retrain."""
+    print(f"\nStep 1: Loading the new ratings from {args.update}...")
+    delta = load_delta(args.update)
+    print(f"\nStep 2: Folding in new users / titles and running {args.epochs} SGD epochs...")
+    version = update_artifacts(artifacts_path, delta, n_epochs=args.epochs)
+    print(f"\nIncremental update completed: version {version}.")
+
+
+def evaluate_main(args, artifacts_path, book_df, book_df_knn):
+    """Cross-validated search over the SVD / KNN settings; the report goes next to the artifacts."""
+    print(f"\nStep 8: {args.search.capitalize()} search over {', '.join(args.models)} "
+          f"({args.folds} folds, n_jobs={args.n_jobs})...")
+    report = run_search(
+        book_df, book_df_knn, models=args.models, search=args.search, n_iter=args.n_iter,
+        n_folds=args.folds, k=args.top_k, n_jobs=args.n_jobs,
+    )
+    print_report(report)
+    path = write_report(artifacts_path, report)
+    print(f"\nEvaluation report written to {path} ({report['seconds']:.1f} s).")
+
+
+def apply_tuned_params(args, artifacts_path):
+    """Overrides the SVD / KNN options with the best parameters of the evaluation report."""
+    report = load_report(artifacts_path)
+    if report is None:
+        raise SystemExit("No evaluation report: run `python train.py --evaluate` first.")
+    best = report["best"]
+    if "svd" in best:
+        params = best["svd"]["params"]
+        args.svd_factors, args.svd_lr, args.svd_reg = params["n_factors"], params["lr_all"], params["reg_all"]
+    if "als" in best:
+        params = best["als"]["params"]
+        args.als_factors, args.als_reg, args.als_alpha = params["factors"], params["reg"], params["alpha"]
+    if "knn" in best:
+        params = best["knn"]["params"]
+        args.knn_metric, args.author_features = params["metric"], params["author_features"]
+        args.cluster_weight = params["cluster_weight"]
+        args.tag_weight = params.get("tag_weight", args.tag_weight)
+    print(f"Using the tuned parameters of {report['created']}: "
+          f"{ {model: entry['params'] for model, entry in best.items()} }")
+
+
+def main(args):
     """Main function to train the book recommender system."""
     # File paths
-    data_file_path = "./data/dataset_final3.csv"   # cleaned_data.csv
+    data_file_path = args.data   # ./data/dataset_final3.csv
     artifacts_path = "artifacts/"
 
-    # Load and inspect data
-    book_df = load_data(data_file_path)
-    data_overview(book_df)
-    book_df_knn = preprocess_data_for_knn(book_df)
-
-
-    _ , book_titles = create_user_item_matrix(book_df)
-
-    # Train KNN model & SVD model
-    # Train KNN model with metadata
-    knn_model, X_final_normalized = train_knn_model_with_metadata(book_df_knn)
-    svd_model = train_svd_model(book_df)
+    if args.update:
+        update_main(args, artifacts_path)
+        return
+    if args.tuned:
+        apply_tuned_params(args, artifacts_path)
+
+    stages = StageCache(os.path.join(artifacts_path, STAGE_CACHE_DIR), enabled=not args.no_cache)
+    if args.clear_cache:
+        stages.clear()
+
+    # Clés des étapes : hash des données puis des paramètres de chaque étape.
+    knn_params = {
+        "metric": args.knn_metric, "author_features": args.author_features, "cluster_weight": args.cluster_weight,
+        "tag_features": args.tag_features, "tag_weight": args.tag_weight,
+    }
+    if args.knn_backend == "ivf":
+        knn_params.update(n_lists=args.ivf_lists, n_probe=args.ivf_probe)
+    svd_params = {"n_factors": args.svd_factors, "lr_all": args.svd_lr, "reg_all": args.svd_reg}
+    data_key = stages.key("load", file_checksum(data_file_path))
+    knn_data_key = stages.key("knn_data", data_key)
+    knn_key = stages.key("knn", knn_data_key, args.knn_backend, knn_params)
+    svd_key = stages.key("svd", data_key, svd_params)
+    als_params = {
+        "factors": args.als_factors, "reg": args.als_reg, "alpha": args.als_alpha, "iterations": args.als_iterations,
+    }
+
+    # Load and inspect data (seulement si une étape en aval n'est pas en cache)
+    if args.stream:
+        # Lecture par blocs : le DataFrame complet n'est jamais construit ; le SVD et
+        # l'évaluation ne reçoivent que les trois colonnes User-ID / Book-Title / Book-Rating.
+        ingested = lambda: stages.run("ingest", stages.key("ingest", data_key),
+                                      lambda: stream_data(data_file_path, args.chunk_rows))
+        book_titles = lambda: ingested().book_titles
+        compact = lambda: (ingested().books, ingested().ratings)
+        book_df = lambda: ingested().ratings.to_frame(ingested().books["Book-Title"])
+        book_df_knn = lambda: ingested().books_knn
+    else:
+        loaded = lambda: stages.run("load", data_key, lambda: load_and_inspect(data_file_path))
+        book_titles = lambda: loaded()[1]
+        book_df = lambda: loaded()[0]
+        book_df_knn = lambda: stages.run("knn_data", knn_data_key, lambda: preprocess_data_for_knn(book_df()))
+        compact = lambda: stages.run("compact", stages.key("compact", data_key), lambda: compact_ratings(book_df()))
+
+    if args.evaluate:
+        evaluate_main(args, artifacts_path, book_df(), book_df_knn())
+        return
+
+    # Train KNN model & SVD model in parallel processes
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        knn_future = stages.submit(
+            executor, "knn", knn_key, train_knn_stage,
+            lambda: (book_df_knn(), args.knn_backend, knn_params, args.chunk_size, args.n_jobs),
+        )
+        svd_future = stages.submit(
+            executor, "svd", svd_key, train_svd_model, lambda: (book_df(), *svd_params.values())
+        )
+        search_index = stages.run(
+            "search", stages.key("search", data_key), lambda: train_search_index(compact()[0])
+        )
+        title_stats, min_votes = stages.run(
+            "leaderboard", stages.key("leaderboard", data_key), lambda: compute_leaderboards(*compact())
+        )
+        # ALS dans le processus principal (threads) pendant que le KNN et le SVD tournent.
+        als_model = None
+        if args.als_factors > 0:
+            als_model = stages.run(
+                "als", stages.key("als", data_key, als_params),
+                lambda: train_als_model(*compact(), **als_params, n_jobs=args.n_jobs),
+            )
+        knn_model, X_final_normalized, neighbor_indices, neighbor_distances = knn_future.result()
+        svd_model = svd_future.result()
+
+    recommendation_table = None
+    if args.precompute_n > 0:
+        recommendation_table = stages.run(
+            "recs", stages.key("recs", svd_key, args.precompute_n),
+            lambda: precompute_recommendations(svd_model, *compact(), n=args.precompute_n, n_jobs=args.n_jobs),
+        )
 
     # Save artifacts
     save_artifacts(
         artifacts_path,
         knn_model=knn_model,
         svd_model=svd_model,
-        book_titles=book_titles,
+        book_titles=book_titles(),
         X_final=X_final_normalized,
-        book_df=book_df,
-        book_df_knn=book_df_knn
+        books=compact()[0],
+        ratings=compact()[1],
+        book_df_knn=book_df_knn(),
+        neighbor_indices=neighbor_indices,
+        neighbor_distances=neighbor_distances,
+        search_index=search_index,
+        title_stats=title_stats,
+        min_votes=min_votes,
+        recommendation_table=recommendation_table,
+        als_model=als_model,
+        als_params=als_params,
     )
 
+    stages.report()
     print("\nScript completed successfully.")
 
 
 if __name__ == "__main__":
-    main()
+    main(parse_args())
@@ -1,97 +1,172 @@
-import pickle
-import pandas as pd
+import os
 import streamlit as st
+from artifact_store import artifacts_version
+from artifact_store import lazy_artifacts
+from cache import cache_from_env
+from images import MISSING
+from images import ThumbnailCache
+from images import data_uri
+from images import placeholder_data_uri
+from metrics import REGISTRY
+from metrics import timed
+from recommender import hybrid_recommendations
+from recommender import session_recommendations
+from recommender import similar_books
+from recommender import user_recommendations
+from shared_state import serving_path
 
-@st.cache_resource
+# Générations en mémoire partagée (shared_state.py) quand RECOMMENDER_SHARED_DIR est défini.
+ARTIFACTS_PATH = serving_path("artifacts")
+PICKER_PAGE_SIZE = 50
+# Tant qu'une couverture n'est pas en cache, l'URL distante est utilisée (0 = placeholder local).
+REMOTE_COVERS = os.environ.get("RECOMMENDER_REMOTE_COVERS", "1") == "1"
+# Chargement en arrière-plan des artefacts que l'onglet ouvert n'a pas demandés.
+WARM_UP = os.environ.get("RECOMMENDER_WARM_UP", "1") == "1"
+
+@st.cache_resource(max_entries=1)
+def load_versioned_artifacts(version):
+    """Lazy handle (artifact_store.LazyArtifacts) of one artifact version, shared by the sessions."""
+    return lazy_artifacts(ARTIFACTS_PATH, version)
+
+@timed("load_artifact_handle")
+def load_artifact_handle():
+    """Artifacts of the latest version, each built the first time a tab reads it."""
+    return load_versioned_artifacts(artifacts_version(ARTIFACTS_PATH))
+
+@timed("load_model_and_data")
 def load_model_and_data():
-    """Load the pre-trained model and data."""
-    knn_model = pickle.load(open("artifacts/knn_model.pkl", "rb"))
-    book_titles = pickle.load(open("artifacts/book_titles.pkl", "rb"))
-    books_df = pickle.load(open("artifacts/book_df.pkl", "rb"))
-    svd_model = pickle.load(open('artifacts/svd_model.pkl', 'rb'))
-    X_final = pickle.load(open('artifacts/X_final.pkl', 'rb'))
-    books_df_knn = pickle.load(open('artifacts/book_df_knn.pkl', 'rb'))
+    """Load the pre-trained model and data, reloading them once train.py publishes a new version."""
+    return load_artifact_handle().materialize()
+
+@st.cache_resource(max_entries=1)
+def load_result_cache(version):
+    """Recommendation result cache of one artifact version."""
+    return cache_from_env(version)
+
+@st.cache_resource
+def load_thumbnail_cache():
+    """On-disk cover thumbnail cache filled by ``python images.py``."""
+    return ThumbnailCache()
+
+@st.cache_data
+def placeholder_src():
+    return placeholder_data_uri()
+
+def cover_src(catalog, title):
+    """<img> source of a title's cover: the cached thumbnail, inlined.
+
+    Covers not prefetched yet use the remote URL (unless RECOMMENDER_REMOTE_COVERS=0);
+    missing covers use the local placeholder.
+    """
+    pos = catalog.title_to_pos.get(title)
+    if pos is None:
+        return placeholder_src()
+    thumbnail = load_thumbnail_cache().get(catalog.cover_keys[pos])
+    if thumbnail is not None and thumbnail != MISSING:
+        return data_uri(thumbnail)
+    if thumbnail is None and REMOTE_COVERS and catalog.image_urls[pos] is not None:
+        return catalog.image_urls[pos]
+    return placeholder_src()
 
-    return knn_model, book_titles, books_df, svd_model, X_final, books_df_knn
+def picker_options(lookup, key, label, pinned=()):
+    """Options of a selectbox: one page of the prefix matches of a search box.
 
-def fetch_poster(books_df, book_list):
+    Filtering runs server-side on a catalog.PrefixIndex; only ``pinned``
+    values (e.g. the current selection) and PICKER_PAGE_SIZE matches are
+    sent to the browser.
+    """
+    page_key = f"{key}_page"
+    query = st.text_input(label, key=f"{key}_query", placeholder="Type the first characters...",
+                          on_change=lambda: st.session_state.update({page_key: 1}))
+    total = lookup.count(query)
+    n_pages = max(1, -(-total // PICKER_PAGE_SIZE))
+    page = 1
+    if n_pages > 1:
+        if st.session_state.get(page_key, 1) > n_pages:
+            st.session_state[page_key] = 1
+        page = st.number_input(f"Page (1-{n_pages})", min_value=1, max_value=n_pages, step=1, key=page_key)
+    st.caption(f"{total} match{'es' if total != 1 else ''}.")
+    matches = lookup.search(query, (page - 1) * PICKER_PAGE_SIZE, PICKER_PAGE_SIZE)
+    return list(dict.fromkeys([*pinned, *matches]))
+
+@timed("fetch_poster")
+def fetch_poster(catalog, book_list):
     """Fetch the poster URLs for the given list of books."""
-    book_names = []
+    book_names = list(book_list)
     poster_urls = []
     book_descriptions = []
-    default_image = "https://via.placeholder.com/150"
-
-    for book in book_list:
-        if book in books_df["Book-Title"].values:
-            book_names.append(book)
-            idx = books_df[books_df["Book-Title"] == book].index
-            if len(idx) > 0:
-                img_url = books_df.loc[idx[0], "Image-URL-L"]
-                poster_urls.append(
-                    img_url
-                    if pd.notna(img_url) and img_url.startswith("http")
-                    else default_image
-                )
-                # Récupération de la description du livre
-                description = books_df.loc[idx[0], "Description"]
-                book_descriptions.append(
-                    description if pd.notna(description) else "Description non disponible"
-                    )
-            else:
-                poster_urls.append(default_image)
-                book_descriptions.append("Description non disponible")
-        else:
-            book_names.append(book)
-            poster_urls.append(default_image)
-            book_descriptions.append("Description non disponible")
+
+    for book in book_names:
+        _, description = catalog.metadata(book)
+        poster_urls.append(cover_src(catalog, book))
+        book_descriptions.append(description)
 
     return book_names, poster_urls, book_descriptions
 
-def recommend_book_knn(books_df, book_name, books_df_knn, knn_model, X_final):
+@timed("recommend_book_knn")
+def recommend_book_knn(catalog, book_name, book_neighbors, result_cache=None):
     """Recommends books based on the enriched KNN model."""
     try:
-        if book_name not in books_df_knn["Book-Title"].values:
-            st.error("Selected book doesn't exist.")
-            return [], []
-
-        book_idx = books_df_knn[books_df_knn["Book-Title"] == book_name].index[0]
-        distances, suggestions = knn_model.kneighbors([X_final[book_idx]], n_neighbors=10)
-        books_list = [books_df_knn.iloc[suggestion_id]["Book-Title"] for suggestion_id in suggestions[0]]
-        books_list = [book for book in books_list if book != book_name]
-        
-        book_names, poster_urls, book_descriptions = fetch_poster(books_df, books_list[:10])
+        compute = lambda: similar_books(book_name, catalog, book_neighbors, n_neighbors=10)
+        books_list = result_cache.get_or_compute("book", book_name, 10, compute) if result_cache else compute()
+        book_names, poster_urls, book_descriptions = fetch_poster(catalog, books_list[:10])
         return book_names, poster_urls, book_descriptions
+    except KeyError:
+        REGISTRY.record_error("recommend_book_knn")
+        st.error("Selected book doesn't exist.")
+        return [], [], []
     except Exception as e:
+        REGISTRY.record_error("recommend_book_knn")
         st.error("Recommendation display error (KNN): " + str(e))
-        return [], []
-
-def recommend_book_svd(user_id, books_df, svd_model, n_recommendations=10):
-    """Recommend books for a given user using the SVD model."""
-    if user_id not in books_df["User-ID"].unique():
-        popular_books = (
-            books_df.groupby("Book-Title")["Book-Rating"]
-            .mean()
-            .sort_values(ascending=False)
-            .head(n_recommendations)
+        return [], [], []
+
+@timed("recommend_book_svd")
+def recommend_book_svd(user_id, catalog, svd_scorer, leaderboard, n_recommendations=10, result_cache=None,
+                       session_ratings=None, recommendation_table=None, engine="svd"):
+    """Recommend books for a given user using the SVD model (and their in-session ratings).
+
+    With ``engine="als"``, ``svd_scorer`` is the implicit ALS scorer; its
+    results are cached apart and session ratings are not folded in.
+    """
+    compute = lambda: user_recommendations(
+        user_id, catalog, svd_scorer, leaderboard, n_recommendations, recommendation_table
+    )
+    if session_ratings and engine == "svd":
+        # Fold-in en quelques millisecondes : pas de mise en cache par combinaison de notes.
+        titles, ratings, personalized = session_recommendations(
+            session_ratings, catalog, svd_scorer, leaderboard, n_recommendations, user_id=user_id
         )
-        book_name, poster_url, book_descriptions = fetch_poster(books_df, popular_books.index.tolist())
-        return list(zip(book_name, popular_books.values, poster_url, book_descriptions))
-
-    all_books = books_df["Book-Title"].unique()
-    user_books = books_df[books_df["User-ID"] == user_id]["Book-Title"].unique()
-    books_to_predict = [book for book in all_books if book not in user_books]
-    
-    if not books_to_predict:
+    elif result_cache is not None:
+        kind = "user" if engine == "svd" else f"user-{engine}"
+        titles, ratings, personalized = result_cache.get_or_compute(kind, user_id, n_recommendations, compute)
+    else:
+        titles, ratings, personalized = compute()
+
+    if personalized and not titles:
         st.warning("No books to find for this user.")
         return []
 
-    predictions = [
-        (book, svd_model.predict(user_id, book).est) for book in books_to_predict
-    ]
-    predictions = sorted(predictions, key=lambda x: x[1], reverse=True)[:n_recommendations]
+    book_name, poster_url, book_descriptions = fetch_poster(catalog, titles)
+    return list(zip(book_name, ratings, poster_url, book_descriptions))
+
+@timed("recommend_book_hybrid")
+def recommend_book_hybrid(user_id, catalog, svd_scorer, leaderboard, X_final, n_recommendations=10,
+                          result_cache=None, recommendation_table=None):
+    """Recommend books for a user: SVD candidates re-ranked by content similarity and diversified."""
+    compute = lambda: hybrid_recommendations(
+        user_id, catalog, svd_scorer, leaderboard, X_final, n_recommendations, recommendation_table
+    )
+    if result_cache is not None:
+        titles, ratings, personalized = result_cache.get_or_compute("hybrid", user_id, n_recommendations, compute)
+    else:
+        titles, ratings, personalized = compute()
+
+    if personalized and not titles:
+        st.warning("No books to find for this user.")
+        return []
 
-    book_name, poster_url, book_descriptions = fetch_poster(books_df, [book for book, _ in predictions])
-    return list(zip(book_name, [rating for _, rating in predictions], poster_url, book_descriptions))
+    book_name, poster_url, book_descriptions = fetch_poster(catalog, titles)
+    return list(zip(book_name, ratings, poster_url, book_descriptions))
 
 def render_aligned_image(image_url, title, height=500):
     """Render an image with the given title and height."""